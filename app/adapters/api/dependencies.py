@@ -1,10 +1,22 @@
 from typing import Optional
 
+from fastapi import Depends
+
+from app.adapters.db.event_buffer import TransferEventBuffer
+from app.adapters.idempotency.memory_store import InMemoryIdempotencyStore
+from app.adapters.idempotency.redis_store import RedisIdempotencyStore
 from app.adapters.db.memory_transfer_repository import InMemoryTransferRepository
+from app.adapters.db.payload_store import PayloadStore, build_payload_store
+from app.adapters.db.repository_transfer_export import RepositoryTransferExportSource
+from app.adapters.db.transfer_cache import TransferCache, build_transfer_cache
 from app.core.connectors.banco_comercio import BancoComercioConnector
 from app.core.connectors.interface import ConnectorIntegration
-from app.core.connectors.mock_banco_comercio import MockBancoComercioConnector
+from app.core.connectors.mock_banco_comercio import MockBancoComercioBehaviour, MockBancoComercioConnector
+from app.core.connectors.resilient import build_resilient_connector
+from app.core.payments.idempotency import IdempotencyGuard
 from app.core.payments.operation import PaymentOperation
+from app.ports.idempotency_store import IdempotencyStore
+from app.ports.transfer_export import TransferExportSource
 from app.services.payment_service import PaymentService
 from config.settings import settings
 
@@ -20,24 +32,108 @@ _transfer_repository = InMemoryTransferRepository()
 def get_payment_operation() -> PaymentOperation:
     return PaymentOperation(transfer_repository=_transfer_repository)
 
+
+# Read-only variants for GET endpoints. By default they resolve to the regular
+# tokens (and their overrides); main.py points them at the replica when configured.
+async def get_payment_read_service(
+    service: PaymentService = Depends(get_payment_service),
+) -> PaymentService:
+    return service
+
+
+def get_payment_read_operation(
+    operation: PaymentOperation = Depends(get_payment_operation),
+) -> PaymentOperation:
+    return operation
+
+
+def get_transfer_export_source(
+    operation: PaymentOperation = Depends(get_payment_read_operation),
+) -> TransferExportSource:
+    # Database mode replaces this with a server-side cursor source (see main.py)
+    return RepositoryTransferExportSource(operation.transfer_repository)
+
 _connector_instance: Optional[ConnectorIntegration] = None
 
 
-def _build_connector() -> ConnectorIntegration:
+def build_transfer_connector() -> ConnectorIntegration:
     mode = settings.transfer_connector_mode.lower()
     if mode == "mock":
-        return MockBancoComercioConnector()
+        return build_resilient_connector(MockBancoComercioConnector(MockBancoComercioBehaviour.from_settings()))
     if mode in {"banco_comercio", "live", "prod"}:
-        return BancoComercioConnector()
+        return build_resilient_connector(BancoComercioConnector())
     raise ValueError(f"Unsupported transfer connector mode: {settings.transfer_connector_mode}")
 
 
 def get_transfer_connector() -> ConnectorIntegration:
     global _connector_instance
     if _connector_instance is None:
-        _connector_instance = _build_connector()
+        _connector_instance = build_transfer_connector()
     return _connector_instance
 
 
 def get_banco_comercio_connector() -> ConnectorIntegration:
     return get_transfer_connector()
+
+
+_event_buffer: Optional[TransferEventBuffer] = None
+
+
+def get_transfer_event_buffer() -> Optional[TransferEventBuffer]:
+    global _event_buffer
+    if not settings.transfer_events_write_behind:
+        return None
+    if _event_buffer is None:
+        _event_buffer = TransferEventBuffer()
+    return _event_buffer
+
+
+_transfer_cache: Optional[TransferCache] = None
+
+
+def get_transfer_cache() -> Optional[TransferCache]:
+    global _transfer_cache
+    if _transfer_cache is None:
+        _transfer_cache = build_transfer_cache()
+    return _transfer_cache
+
+
+_payload_store: Optional[PayloadStore] = None
+
+
+def get_payload_store() -> Optional[PayloadStore]:
+    global _payload_store
+    if not settings.payload_store_enabled:
+        return None
+    if _payload_store is None:
+        _payload_store = build_payload_store()
+    return _payload_store
+
+
+_idempotency_guard: Optional[IdempotencyGuard] = None
+
+
+def _build_idempotency_store() -> Optional[IdempotencyStore]:
+    backend = settings.idempotency_backend.lower()
+    if backend in {"", "none"}:
+        return None
+    if backend == "memory":
+        return InMemoryIdempotencyStore()
+    if backend == "redis":
+        return RedisIdempotencyStore(settings.REDIS_URL)
+    raise ValueError(f"Unsupported idempotency backend: {settings.idempotency_backend}")
+
+
+def get_idempotency_guard() -> Optional[IdempotencyGuard]:
+    global _idempotency_guard
+    if _idempotency_guard is None:
+        store = _build_idempotency_store()
+        if store is None:
+            return None
+        _idempotency_guard = IdempotencyGuard(
+            store,
+            ttl=settings.idempotency_ttl,
+            lock_ttl=settings.idempotency_lock_ttl,
+            wait_timeout=settings.idempotency_wait_timeout,
+        )
+    return _idempotency_guard
@@ -0,0 +1,39 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from app.db.query_stats import track_queries
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Query-Time-Ms"
+
+
+class QueryStatsMiddleware:
+    """Counts the SQL statements and DB time of each HTTP request and reports them as headers.
+
+    Headers go out with the response start, so statements run while a streaming
+    body is produced are not included.
+    """
+
+    def __init__(self, app: Callable[[Scope, Receive, Send], Awaitable[None]]) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+
+            async def send_with_stats(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((QUERY_COUNT_HEADER.lower().encode(), str(stats.count).encode()))
+                    headers.append((QUERY_TIME_HEADER.lower().encode(), f"{stats.seconds * 1000:.1f}".encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_stats)
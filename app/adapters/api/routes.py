@@ -1,20 +1,52 @@
+import math
+from datetime import datetime
+from typing import List, Optional, Union
 from uuid import UUID
 
 import httpx
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from app.domain.models import Payment
 from app.services.payment_service import PaymentService
 from app.adapters.api.dependencies import (
+    get_idempotency_guard,
     get_payment_operation,
+    get_payment_read_operation,
+    get_payment_read_service,
     get_payment_service,
     get_transfer_connector,
+    get_transfer_export_source,
+)
+from app.core.payments.frozen import freeze
+from app.core.payments.export import EXPORT_FORMATS, encode_export
+from app.core.payments.idempotency import (
+    IdempotencyGuard,
+    IdempotencyInProgress,
+    IdempotencyKeyReused,
+    request_fingerprint,
 )
 from app.core.payments.operation import PaymentOperation
-from app.core.payments.types import PaymentData, TransferRequest, TransferInitResponse
-from app.core.connectors.interface import ConnectorIntegration
+from app.core.payments.pagination import InvalidCursor, TransferCursor
+from app.core.payments.retry import default_retry_policy, describe_failure, is_retryable
+from app.core.payments.types import (
+    PaymentData,
+    PaymentState,
+    TransferBatchItem,
+    TransferBatchResponse,
+    TransferInitResponse,
+    TransferListFilters,
+    TransferPage,
+    TransferRequest,
+)
+from app.core.connectors.interface import ConnectorIntegration, ConnectorUnavailable
+from app.db.session import get_current_tenant
+from app.ports.transfer_export import TransferExportSource
+from app.ports.transfer_repository import DuplicateOriginId
+from config.settings import settings
 
 router = APIRouter()
+retry_policy = default_retry_policy()
 
 class CreatePaymentRequest(BaseModel):
     amount: float
@@ -42,36 +74,261 @@ async def process_payment(
 @router.post("/transfers", response_model=TransferInitResponse)
 async def register_transfer(
     request: TransferRequest,
+    http_request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", max_length=255),
+    prefer: Optional[str] = Header(default=None),
+    operation: PaymentOperation = Depends(get_payment_operation),
+    connector: ConnectorIntegration = Depends(get_transfer_connector),
+    idempotency: Optional[IdempotencyGuard] = Depends(get_idempotency_guard),
+):
+    can_defer = _has_outbox_worker(operation)
+    # Without a worker nothing would ever send an accepted transfer, so the preference is ignored
+    respond_async = can_defer and (settings.transfer_async_acceptance or _prefers_async(prefer))
+
+    async def execute():
+        payment_data = _payment_data(request)
+
+        try:
+            if respond_async:
+                # Persisted as CREATED with an outbox row; the worker calls the bank
+                processed = await operation.accept(payment_data)
+            else:
+                processed = await operation.process(payment_data, connector)
+        except DuplicateOriginId as exc:
+            raise HTTPException(status_code=409, detail=str(exc)) from exc
+        except ConnectorUnavailable as exc:
+            # Refused before reaching the bank: nothing was sent, so the transfer is not kept pending
+            await operation.fail(payment_data, describe_failure(exc))
+            # Committed here: the 503 makes the request's session roll back
+            await _commit(operation)
+            raise HTTPException(
+                status_code=503,
+                detail=f"Bank connector unavailable: {exc}",
+                headers={"Retry-After": str(math.ceil(exc.retry_after))},
+            ) from exc
+        except httpx.HTTPError as exc:
+            if not is_retryable(exc) or not can_defer:
+                raise HTTPException(status_code=502, detail=f"Bank request failed: {exc}") from exc
+            # Transient failure: the worker retries it, so the client gets 202 instead of losing it
+            processed = await operation.defer(payment_data, describe_failure(exc), retry_policy.delay(1))
+
+        result = TransferInitResponse(
+            paymentId=processed.payment_id,
+            originId=processed.origin_id,
+            status=processed.status.value,
+            echoed_request=request,
+            bankResponse=processed.metadata.get("connector_response"),
+        )
+        # Committed before the idempotency record stores the result: a replay never
+        # reports a transfer that a failed commit rolled back
+        await _commit(operation)
+        return result.model_dump(by_alias=True, mode="json")
+
+    key = idempotency_key or request.origin_id
+    if idempotency is None or not key:
+        result, replayed = await execute(), False
+    else:
+        try:
+            result, replayed = await idempotency.run(
+                f"{get_current_tenant()}:transfers:{key}",
+                request_fingerprint(request.model_dump(by_alias=True, mode="json")),
+                execute,
+            )
+        except IdempotencyKeyReused as exc:
+            raise HTTPException(status_code=422, detail="Idempotency key already used with a different request") from exc
+        except IdempotencyInProgress as exc:
+            raise HTTPException(status_code=409, detail="A request with this idempotency key is still in progress") from exc
+
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    if result["status"] == PaymentState.CREATED.value:
+        # Accepted, not yet sent to the bank: poll the transfer for the outcome
+        response.status_code = 202
+        response.headers["Location"] = str(http_request.url_for("get_transfer_by_origin", origin_id=result["originId"]))
+    return result
+
+
+@router.post("/transfers/batch", response_model=TransferBatchResponse)
+async def register_transfer_batch(
+    requests: List[TransferRequest],
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", max_length=255),
+    prefer: Optional[str] = Header(default=None),
     operation: PaymentOperation = Depends(get_payment_operation),
     connector: ConnectorIntegration = Depends(get_transfer_connector),
+    idempotency: Optional[IdempotencyGuard] = Depends(get_idempotency_guard),
 ):
-    payment_data = PaymentData(
+    if not requests:
+        raise HTTPException(status_code=422, detail="The batch is empty")
+    if len(requests) > settings.transfer_batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.transfer_batch_max_items} transfers per batch",
+        )
+    can_defer = _has_outbox_worker(operation)
+    respond_async = can_defer and (settings.transfer_async_acceptance or _prefers_async(prefer))
+
+    async def execute():
+        items = [_payment_data(request) for request in requests]
+        try:
+            if respond_async:
+                outcomes = await operation.accept_many(items)
+            else:
+                outcomes = await operation.process_many(
+                    items,
+                    connector,
+                    concurrency=settings.transfer_batch_concurrency,
+                    retry_policy=retry_policy if can_defer else None,
+                )
+        except DuplicateOriginId as exc:
+            # Taken by a concurrent request after the per-item check; the whole batch is rolled back
+            raise HTTPException(status_code=409, detail=str(exc)) from exc
+        results = [_batch_item(index, outcome) for index, outcome in enumerate(outcomes)]
+        # Rejected items were never saved; FAILED ones were, with the bank's or the call's error
+        rejected = sum(1 for item in results if item.payment_id is None)
+        batch = TransferBatchResponse(accepted=len(results) - rejected, rejected=rejected, items=results)
+        await _commit(operation)
+        return batch.model_dump(by_alias=True, mode="json")
+
+    if idempotency is None or not idempotency_key:
+        result, replayed = await execute(), False
+    else:
+        try:
+            result, replayed = await idempotency.run(
+                f"{get_current_tenant()}:transfers-batch:{idempotency_key}",
+                request_fingerprint([request.model_dump(by_alias=True, mode="json") for request in requests]),
+                execute,
+            )
+        except IdempotencyKeyReused as exc:
+            raise HTTPException(status_code=422, detail="Idempotency key already used with a different request") from exc
+        except IdempotencyInProgress as exc:
+            raise HTTPException(status_code=409, detail="A request with this idempotency key is still in progress") from exc
+
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    if respond_async:
+        response.status_code = 202
+    return result
+
+
+async def _commit(operation: PaymentOperation) -> None:
+    if operation.transfer_repository is not None:
+        await operation.transfer_repository.commit()
+
+
+def _payment_data(request: TransferRequest) -> PaymentData:
+    return PaymentData(
+        origin_id=request.origin_id,
         source=request.source,
         destination=request.destination,
         transfer_body=request.body,
         description=request.body.description,
-        metadata={"client_request": request.model_dump(by_alias=True)},
+        metadata={"client_request": freeze(request.model_dump(by_alias=True))},
+    )
+
+
+def _batch_item(index: int, outcome: Union[PaymentData, Exception]) -> TransferBatchItem:
+    if isinstance(outcome, Exception):
+        return TransferBatchItem(index=index, error=str(outcome))
+    return TransferBatchItem(
+        index=index,
+        paymentId=outcome.payment_id,
+        originId=outcome.origin_id,
+        status=outcome.status.value,
+        bankResponse=outcome.metadata.get("connector_response"),
+        error=outcome.metadata.get("error_message") if outcome.status == PaymentState.FAILED else None,
     )
 
+
+def _has_outbox_worker(operation: PaymentOperation) -> bool:
+    repository = operation.transfer_repository
+    return repository is not None and repository.has_outbox_worker
+
+
+def _prefers_async(prefer: Optional[str]) -> bool:
+    # RFC 7240: "Prefer: respond-async" (possibly among other preferences)
+    if not prefer:
+        return False
+    return any(token.strip().lower() == "respond-async" for token in prefer.split(","))
+
+
+@router.get("/transfers", response_model=TransferPage)
+async def list_transfers(
+    status: Optional[PaymentState] = None,
+    currency: Optional[str] = None,
+    created_from: Optional[datetime] = Query(default=None, alias="createdFrom"),
+    created_to: Optional[datetime] = Query(default=None, alias="createdTo"),
+    connector_id: Optional[str] = Query(default=None, alias="connectorId"),
+    source_address: Optional[str] = Query(default=None, alias="sourceAddress"),
+    destination_address: Optional[str] = Query(default=None, alias="destinationAddress"),
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    operation: PaymentOperation = Depends(get_payment_read_operation),
+):
+    repository = operation.transfer_repository
+    if repository is None:
+        raise HTTPException(status_code=500, detail="Transfer repository not configured")
+
     try:
-        processed = await operation.process(payment_data, connector)
-    except httpx.HTTPError as exc:
-        raise HTTPException(status_code=502, detail=f"Bank request failed: {exc}") from exc
-
-    response = TransferInitResponse(
-        paymentId=processed.payment_id,
-        originId=processed.origin_id,
-        status=processed.status.value,
-        echoed_request=request,
-        bankResponse=processed.metadata.get("connector_response"),
+        position = TransferCursor.decode(cursor) if cursor else None
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    filters = TransferListFilters(
+        status=status,
+        currency=currency,
+        created_from=created_from,
+        created_to=created_to,
+        connector_id=connector_id,
+        source_address=source_address,
+        destination_address=destination_address,
+    )
+    return await repository.list_transfers(filters, limit=limit, cursor=position)
+
+
+@router.get("/transfers/export")
+async def export_transfers(
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    dataset: str = Query(default="transfers", pattern="^(transfers|transfer_events)$"),
+    status: Optional[PaymentState] = None,
+    currency: Optional[str] = None,
+    created_from: Optional[datetime] = Query(default=None, alias="createdFrom"),
+    created_to: Optional[datetime] = Query(default=None, alias="createdTo"),
+    connector_id: Optional[str] = Query(default=None, alias="connectorId"),
+    source_address: Optional[str] = Query(default=None, alias="sourceAddress"),
+    destination_address: Optional[str] = Query(default=None, alias="destinationAddress"),
+    source: TransferExportSource = Depends(get_transfer_export_source),
+):
+    try:
+        columns = source.columns(dataset)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    filters = TransferListFilters(
+        status=status,
+        currency=currency,
+        created_from=created_from,
+        created_to=created_to,
+        connector_id=connector_id,
+        source_address=source_address,
+        destination_address=destination_address,
+    )
+    body = encode_export(source.batches(dataset, filters, settings.export_batch_size), format, columns, gzip=gzip)
+
+    filename = f"{dataset}-{get_current_tenant()}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        body,
+        media_type="application/gzip" if gzip else EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
-    return response
 
 
 @router.get("/transfers/{origin_id}", response_model=PaymentData)
 async def get_transfer_by_origin(
     origin_id: str,
-    operation: PaymentOperation = Depends(get_payment_operation),
+    operation: PaymentOperation = Depends(get_payment_read_operation),
 ):
     repository = operation.transfer_repository
     if repository is None:
@@ -86,7 +343,7 @@ async def get_transfer_by_origin(
 @router.get("/payments/{payment_id}", response_model=Payment)
 async def get_payment(
     payment_id: UUID,
-    service: PaymentService = Depends(get_payment_service),
+    service: PaymentService = Depends(get_payment_read_service),
 ):
     payment = await service.get_payment(payment_id)
     if not payment:
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import groupby
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.payments.types import PaymentState
+from app.db.models import TransferEventRecord
+from app.db.session import tenant_session
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_COPY_COLUMNS = ["transfer_id", "status", "message", "payload", "created_at"]
+
+
+@dataclass(frozen=True)
+class TransferEventRow:
+    tenant: str
+    transfer_id: int
+    status: PaymentState
+    message: Optional[str]
+    payload: Dict[str, Any]
+    created_at: datetime
+
+
+class TransferEventBuffer:
+    """Write-behind buffer for transfer_events.
+
+    Rows are handed over only after the owning transaction committed and are
+    written in bulk (executemany INSERT or COPY) when `batch_size` rows are
+    pending or every `flush_interval` seconds. Once `max_buffered` rows are
+    pending, `add` waits for a flush instead of growing further; if the flush
+    fails too, the row is inserted directly, and dropped (counted and logged)
+    when that fails as well, so the buffer never holds more than `max_buffered`.
+    """
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_buffered: Optional[int] = None,
+        use_copy: Optional[bool] = None,
+        flush_on_shutdown: Optional[bool] = None,
+    ) -> None:
+        self.batch_size = batch_size or settings.transfer_events_batch_size
+        self.flush_interval = flush_interval or settings.transfer_events_flush_interval
+        self.max_buffered = max_buffered or settings.transfer_events_max_buffered
+        self.use_copy = settings.transfer_events_use_copy if use_copy is None else use_copy
+        self.flush_on_shutdown = (
+            settings.transfer_events_flush_on_shutdown if flush_on_shutdown is None else flush_on_shutdown
+        )
+        self._rows: List[TransferEventRow] = []
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task[None]] = None
+        self._flushed = 0
+        self._flushes = 0
+        self._failures = 0
+        self._dropped = 0
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self.flush_on_shutdown:
+            await self.flush()
+        elif self._rows:
+            logger.warning("Discarding %d buffered transfer events on shutdown", len(self._rows))
+            self._rows.clear()
+
+    async def add(self, row: TransferEventRow) -> None:
+        if len(self._rows) >= self.max_buffered:
+            # Backpressure: the committing request pays for one bulk write
+            await self.flush()
+            if len(self._rows) >= self.max_buffered:
+                await self._write_direct(row)
+                return
+        self._rows.append(row)
+        if len(self._rows) >= self.batch_size:
+            self._wake.set()
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            rows, self._rows = self._rows, []
+            written = 0
+            try:
+                rows.sort(key=lambda row: row.tenant)
+                for tenant, tenant_rows in groupby(rows, key=lambda row: row.tenant):
+                    batch = list(tenant_rows)
+                    for start in range(0, len(batch), self.batch_size):
+                        chunk = batch[start:start + self.batch_size]
+                        async with tenant_session(tenant) as session:
+                            await self._write(session, chunk)
+                        written += len(chunk)
+            except Exception:
+                # Keep what was not written; it is retried on the next flush
+                self._failures += 1
+                self._rows[:0] = [row for row in rows[written:]]
+                logger.exception("Failed to flush %d transfer events", len(rows) - written)
+                # Rows added while this flush ran may push the buffer over its bound
+                overflow = len(self._rows) - self.max_buffered
+                if overflow > 0:
+                    del self._rows[:overflow]
+                    self._dropped += overflow
+                    logger.error("Dropped %d transfer events: buffer full while the database is failing", overflow)
+            self._flushed += written
+            self._flushes += 1
+            return written
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._rows),
+            "flushed": self._flushed,
+            "flushes": self._flushes,
+            "failures": self._failures,
+            "dropped": self._dropped,
+            "mode": "copy" if self.use_copy else "insert",
+        }
+
+    async def _write_direct(self, row: TransferEventRow) -> None:
+        try:
+            async with tenant_session(row.tenant) as session:
+                await self._write(session, [row])
+            self._flushed += 1
+        except Exception:
+            self._dropped += 1
+            logger.exception(
+                "Dropped event for transfer %s: buffer full (%d rows) and direct insert failed",
+                row.transfer_id,
+                len(self._rows),
+            )
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._rows:
+                await self.flush()
+
+    async def _write(self, session: AsyncSession, rows: List[TransferEventRow]) -> None:
+        if self.use_copy:
+            connection = await session.connection()
+            raw = await connection.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                TransferEventRecord.__tablename__,
+                columns=_COPY_COLUMNS,
+                records=[
+                    (row.transfer_id, row.status.value, row.message, json.dumps(row.payload), row.created_at)
+                    for row in rows
+                ],
+            )
+            return
+
+        await session.execute(
+            insert(TransferEventRecord.__table__),
+            [
+                {
+                    "transfer_id": row.transfer_id,
+                    "status": row.status,
+                    "message": row.message,
+                    "payload": row.payload,
+                    "created_at": row.created_at,
+                }
+                for row in rows
+            ],
+        )
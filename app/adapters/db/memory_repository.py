@@ -1,7 +1,7 @@
 from typing import Dict, Optional
 from uuid import UUID
 
-from app.domain.models import Payment
+from app.domain.models import Payment, PaymentStatus, StalePaymentError
 from app.ports.repository import PaymentRepository
 
 class InMemoryPaymentRepository(PaymentRepository):
@@ -9,12 +9,33 @@ class InMemoryPaymentRepository(PaymentRepository):
         self.payments: Dict[UUID, Payment] = {}
 
     async def create(self, payment: Payment) -> Payment:
-        self.payments[payment.id] = payment
-        return payment
+        self.payments[payment.id] = payment.model_copy()
+        return payment.model_copy()
 
     async def get_by_id(self, payment_id: UUID) -> Optional[Payment]:
-        return self.payments.get(payment_id)
+        stored = self.payments.get(payment_id)
+        return stored.model_copy() if stored else None
 
     async def update(self, payment: Payment) -> Payment:
-        self.payments[payment.id] = payment
-        return payment
+        stored = self.payments.get(payment.id)
+        if stored is None:
+            raise ValueError("Payment not found")
+        if stored.version != payment.version:
+            raise StalePaymentError(str(payment.id))
+        updated = payment.model_copy(update={"version": stored.version + 1})
+        self.payments[payment.id] = updated
+        return updated.model_copy()
+
+    async def transition(
+        self,
+        payment_id: UUID,
+        expected: PaymentStatus,
+        new: PaymentStatus,
+    ) -> Optional[Payment]:
+        # No await between the check and the write, so this is atomic on the event loop
+        stored = self.payments.get(payment_id)
+        if stored is None or stored.status != expected:
+            return None
+        updated = stored.model_copy(update={"status": new, "version": stored.version + 1})
+        self.payments[payment_id] = updated
+        return updated.model_copy()
@@ -1,25 +1,131 @@
-from typing import Dict, Optional
+import time
+from datetime import timezone
+from itertools import count
+from typing import Dict, List, Optional, Sequence, Tuple
 from uuid import UUID
 
-from app.core.payments.types import PaymentData
-from app.ports.transfer_repository import TransferRepository
+from app.core.payments.frozen import freeze
+from app.core.payments.pagination import TransferCursor
+from app.core.payments.types import PaymentData, TransferListFilters, TransferPage, TransferSummary
+from app.ports.transfer_repository import DuplicateOriginId, TransferRepository
 
 
 class InMemoryTransferRepository(TransferRepository):
+    # No worker reads `outbox` or `retries`; they only record what would be dispatched
+    has_outbox_worker = False
+
     def __init__(self):
         self._by_origin: Dict[str, PaymentData] = {}
         self._by_payment: Dict[UUID, PaymentData] = {}
+        # Stand-in for the transfers.id sequence, used as the cursor tie-breaker
+        self._ids: Dict[UUID, int] = {}
+        self._next_id = count(1)
+        # Payment ids accepted for asynchronous dispatch and not settled yet, in acceptance order
+        self.outbox: List[UUID] = []
+        # payment_id -> (attempts, monotonic due time, last error)
+        self.retries: Dict[UUID, Tuple[int, float, str]] = {}
 
-    async def save(self, data: PaymentData) -> PaymentData:
-        copy = data.model_copy(deep=True)
-        self._by_origin[copy.origin_id] = copy
-        self._by_payment[copy.payment_id] = copy
-        return copy
+    async def save(self, data: PaymentData, dispatch: bool = False) -> PaymentData:
+        existing = self._by_origin.get(data.origin_id)
+        if existing is not None and existing.payment_id != data.payment_id:
+            raise DuplicateOriginId(data.origin_id)
+        stored = self._copy(data, metadata=freeze(data.metadata))
+        self._by_origin[stored.origin_id] = stored
+        self._by_payment[stored.payment_id] = stored
+        if stored.payment_id not in self._ids:
+            self._ids[stored.payment_id] = next(self._next_id)
+        if dispatch and stored.payment_id not in self.outbox:
+            self.outbox.append(stored.payment_id)
+        return self._detach(stored)
 
     async def get_by_origin_id(self, origin_id: str) -> Optional[PaymentData]:
         stored = self._by_origin.get(origin_id)
-        return stored.model_copy(deep=True) if stored else None
+        return self._detach(stored) if stored else None
+
+    async def get_payment_ids_by_origin_ids(self, origin_ids: Sequence[str]) -> Dict[str, UUID]:
+        return {
+            origin_id: self._by_origin[origin_id].payment_id for origin_id in origin_ids if origin_id in self._by_origin
+        }
 
     async def get_by_payment_id(self, payment_id: UUID) -> Optional[PaymentData]:
         stored = self._by_payment.get(payment_id)
-        return stored.model_copy(deep=True) if stored else None
+        return self._detach(stored) if stored else None
+
+    async def schedule_retry(self, payment_id: UUID, delay: float, error: str, count_attempt: bool = True) -> None:
+        attempts = self.retries.get(payment_id, (0, 0.0, ""))[0] + (1 if count_attempt else 0)
+        self.retries[payment_id] = (attempts, time.monotonic() + delay, error)
+
+    async def mark_dispatched(self, payment_id: UUID) -> None:
+        if payment_id in self.outbox:
+            self.outbox.remove(payment_id)
+        self.retries.pop(payment_id, None)
+
+    async def list_transfers(
+        self,
+        filters: TransferListFilters,
+        limit: int,
+        cursor: Optional[TransferCursor] = None,
+    ) -> TransferPage:
+        matches = sorted(
+            (
+                (stored.created_at, self._ids[stored.payment_id], stored)
+                for stored in self._by_payment.values()
+                if _matches(stored, filters)
+            ),
+            key=lambda item: item[:2],
+            reverse=True,
+        )
+        if cursor is not None:
+            matches = [item for item in matches if item[:2] < (cursor.created_at, cursor.id)]
+
+        page = matches[:limit]
+        next_cursor = None
+        if len(matches) > limit:
+            created_at, transfer_id, _ = page[-1]
+            next_cursor = TransferCursor(created_at=created_at, id=transfer_id).encode()
+        return TransferPage(items=[_summary(stored) for _, _, stored in page], next_cursor=next_cursor)
+
+    def _detach(self, stored: PaymentData) -> PaymentData:
+        # Callers get their own top-level metadata dict; nested values stay shared and frozen
+        return self._copy(stored, metadata=dict(stored.metadata))
+
+    def _copy(self, data: PaymentData, metadata) -> PaymentData:
+        return data.model_copy(
+            update={
+                "metadata": metadata,
+                "source": data.source.model_copy(deep=True) if data.source else None,
+                "destination": data.destination.model_copy(deep=True) if data.destination else None,
+                "transfer_body": data.transfer_body.model_copy() if data.transfer_body else None,
+            }
+        )
+
+
+def _matches(data: PaymentData, filters: TransferListFilters) -> bool:
+    # PaymentData.created_at defaults to naive UTC; the filter bounds are aware UTC
+    created_at = data.created_at if data.created_at.tzinfo else data.created_at.replace(tzinfo=timezone.utc)
+    return (
+        (filters.status is None or data.status == filters.status)
+        and (filters.currency is None or data.currency == filters.currency)
+        and (filters.created_from is None or created_at >= filters.created_from)
+        and (filters.created_to is None or created_at < filters.created_to)
+        and (filters.connector_id is None or data.connector_id == filters.connector_id)
+        and (filters.source_address is None or (data.source and data.source.address == filters.source_address))
+        and (
+            filters.destination_address is None
+            or (data.destination and data.destination.address == filters.destination_address)
+        )
+    )
+
+
+def _summary(data: PaymentData) -> TransferSummary:
+    return TransferSummary(
+        payment_id=data.payment_id,
+        origin_id=data.origin_id,
+        status=data.status,
+        amount=data.amount,
+        currency=data.currency,
+        connector_id=data.connector_id,
+        source_address=data.source.address if data.source else "",
+        destination_address=data.destination.address if data.destination else "",
+        created_at=data.created_at,
+    )
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy import CTE, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.payments.payload_codec import PayloadEncoder, collect_refs, decode_blobs, rehydrate
+from app.db.models import PayloadBlobRecord
+from config.settings import settings
+
+_BLOBS = PayloadBlobRecord.__table__
+
+
+class PayloadStore:
+    """Writes payloads once into payload_blobs and resolves references on demand."""
+
+    def __init__(self, codec: str = "gzip", min_compress_bytes: int = 256, min_blob_bytes: int = 64) -> None:
+        self.codec = codec
+        self.min_compress_bytes = min_compress_bytes
+        self.min_blob_bytes = min_blob_bytes
+
+    def encode(
+        self,
+        metadata: Mapping[str, Any],
+        connector_response: Mapping[str, Any],
+    ) -> Tuple[Any, Any, Optional[CTE]]:
+        """Referenced metadata/connector_response plus the CTE that inserts their blobs."""
+        [(stored_metadata, stored_response)], blob_insert = self.encode_many([(metadata, connector_response)])
+        return stored_metadata, stored_response, blob_insert
+
+    def encode_many(
+        self,
+        payloads: Sequence[Tuple[Mapping[str, Any], Mapping[str, Any]]],
+    ) -> Tuple[List[Tuple[Any, Any]], Optional[CTE]]:
+        """Batch variant of encode; content shared by several transfers is inserted once."""
+        encoder = PayloadEncoder(self.codec, self.min_compress_bytes, self.min_blob_bytes)
+        stored = [encoder.encode(metadata, connector_response) for metadata, connector_response in payloads]
+        if not encoder.blobs:
+            return stored, None
+
+        now = datetime.now(timezone.utc)
+        # Already-stored content conflicts on the hash and is skipped
+        blob_insert = (
+            pg_insert(_BLOBS)
+            .values(
+                [
+                    {"hash": blob.hash, "encoding": blob.encoding, "size": blob.size, "data": blob.data, "created_at": now}
+                    for blob in encoder.blobs.values()
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=[_BLOBS.c.hash])
+            .returning(_BLOBS.c.hash)
+            .cte("payload_blob_insert")
+        )
+        return stored, blob_insert
+
+    async def load(self, session: AsyncSession, hashes: Iterable[str]) -> Dict[str, Any]:
+        documents: Dict[str, Any] = {}
+        pending = set(hashes)
+        # Blobs can reference other blobs (a response and the request it echoes)
+        while pending:
+            stmt = select(_BLOBS.c.hash, _BLOBS.c.encoding, _BLOBS.c.data).where(_BLOBS.c.hash.in_(sorted(pending)))
+            loaded = decode_blobs((await session.execute(stmt)).all())
+            documents.update(loaded)
+            pending = collect_refs(tuple(loaded.values())) - documents.keys()
+        return documents
+
+    async def rehydrate(self, session: AsyncSession, *values: Any) -> Tuple[Any, ...]:
+        """Resolve every blob reference in `values` with as few round trips as possible."""
+        hashes = collect_refs(values)
+        if not hashes:
+            return values
+        documents = await self.load(session, hashes)
+        return tuple(rehydrate(value, documents) for value in values)
+
+
+def build_payload_store() -> Optional[PayloadStore]:
+    if not settings.payload_store_enabled:
+        return None
+    return PayloadStore(
+        codec=settings.payload_store_compression,
+        min_compress_bytes=settings.payload_store_min_compress_bytes,
+        min_blob_bytes=settings.payload_store_min_blob_bytes,
+    )
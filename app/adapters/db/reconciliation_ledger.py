@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+
+from sqlalchemy import BigInteger, cast, select
+
+from app.core.reconciliation.engine import LedgerEntry
+from app.db.models import TransferRecord
+from app.db.session import read_session
+
+_TRANSFERS = TransferRecord.__table__
+
+
+async def stream_ledger(
+    tenant: str,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    batch_size: int = 10000,
+) -> AsyncIterator[List[LedgerEntry]]:
+    """Transfers as LedgerEntry batches through a server-side cursor.
+
+    Only the join keys, cents and status leave the database: the reference is
+    extracted from metadata and the amount converted to cents in SQL.
+    """
+    stmt = select(
+        _TRANSFERS.c.origin_id,
+        _TRANSFERS.c.metadata["provider_reference_id"].astext,
+        cast(_TRANSFERS.c.amount * 100, BigInteger),
+        _TRANSFERS.c.currency,
+        _TRANSFERS.c.status,
+    )
+    if created_from is not None:
+        stmt = stmt.where(_TRANSFERS.c.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(_TRANSFERS.c.created_at < created_to)
+
+    async with read_session(tenant) as session:
+        result = await session.stream(stmt.execution_options(yield_per=batch_size))
+        async for partition in result.partitions(batch_size):
+            yield [LedgerEntry(*row) for row in partition]
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from typing import Any, AsyncIterator, Dict, List, Sequence
+
+from app.core.payments.pagination import TransferCursor
+from app.core.payments.types import TransferListFilters, TransferSummary
+from app.ports.transfer_export import TransferExportSource
+from app.ports.transfer_repository import TransferRepository
+
+SUMMARY_EXPORT_COLUMNS = tuple(TransferSummary.model_fields)
+
+
+class RepositoryTransferExportSource(TransferExportSource):
+    """Export through any TransferRepository by walking its keyset listing page by page.
+
+    Used with the in-memory backend; only the transfers dataset (summary columns) is available.
+    """
+
+    def __init__(self, repository: TransferRepository) -> None:
+        self.repository = repository
+
+    def columns(self, dataset: str) -> Sequence[str]:
+        if dataset != "transfers":
+            raise ValueError(f"Dataset {dataset} is not available with this persistence backend")
+        return SUMMARY_EXPORT_COLUMNS
+
+    async def batches(
+        self,
+        dataset: str,
+        filters: TransferListFilters,
+        batch_size: int,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        self.columns(dataset)
+        cursor = None
+        while True:
+            page = await self.repository.list_transfers(filters, limit=batch_size, cursor=cursor)
+            if page.items:
+                yield [item.model_dump() for item in page.items]
+            if page.next_cursor is None:
+                return
+            cursor = TransferCursor.decode(page.next_cursor)
@@ -2,66 +2,115 @@ from __future__ import annotations
 
 from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Optional
+from typing import Any, Optional
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models import PaymentRecord
-from app.domain.models import Payment, PaymentStatus
+from app.domain.models import Payment, PaymentStatus, StalePaymentError
 from app.ports.repository import PaymentRepository
 
+_PAYMENT_COLUMNS = (
+    PaymentRecord.id,
+    PaymentRecord.amount,
+    PaymentRecord.currency,
+    PaymentRecord.status,
+    PaymentRecord.version,
+    PaymentRecord.created_at,
+    PaymentRecord.updated_at,
+)
+
 
 class SqlAlchemyPaymentRepository(PaymentRepository):
+    """Writes are single Core statements with RETURNING; no select-then-flush round trips."""
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
     async def create(self, payment: Payment) -> Payment:
-        record = PaymentRecord(
-            id=payment.id,
-            amount=Decimal(str(payment.amount)),
-            currency=payment.currency,
-            status=payment.status,
-            description=None,
-            metadata={},
+        now = datetime.now(timezone.utc)
+        stmt = (
+            insert(PaymentRecord)
+            .values(
+                id=payment.id,
+                amount=Decimal(str(payment.amount)),
+                currency=payment.currency,
+                status=payment.status,
+                description=None,
+                metadata={},
+                version=1,
+                created_at=now,
+                updated_at=now,
+            )
+            .returning(*_PAYMENT_COLUMNS)
         )
-        self.session.add(record)
-        await self.session.flush()
-        await self.session.refresh(record)
-        return self._to_domain(record)
+        result = await self.session.execute(stmt)
+        return self._to_domain(result.one())
 
     async def get_by_id(self, payment_id: UUID) -> Optional[Payment]:
-        stmt = select(PaymentRecord).where(PaymentRecord.id == payment_id)
+        stmt = select(*_PAYMENT_COLUMNS).where(PaymentRecord.id == payment_id)
         result = await self.session.execute(stmt)
-        record = result.scalar_one_or_none()
-        if record is None:
+        row = result.one_or_none()
+        if row is None:
             return None
-        return self._to_domain(record)
+        return self._to_domain(row)
 
     async def update(self, payment: Payment) -> Payment:
-        stmt = select(PaymentRecord).where(PaymentRecord.id == payment.id)
+        stmt = (
+            update(PaymentRecord)
+            .where(PaymentRecord.id == payment.id, PaymentRecord.version == payment.version)
+            .values(
+                status=PaymentStatus(payment.status),
+                amount=Decimal(str(payment.amount)),
+                currency=payment.currency,
+                version=PaymentRecord.version + 1,
+                updated_at=datetime.now(timezone.utc),
+            )
+            .returning(*_PAYMENT_COLUMNS)
+            .execution_options(synchronize_session=False)
+        )
         result = await self.session.execute(stmt)
-        record = result.scalar_one_or_none()
-        if record is None:
-            raise ValueError("Payment not found in database")
-
-        record.status = PaymentStatus(payment.status)
-        record.amount = Decimal(str(payment.amount))
-        record.currency = payment.currency
-        record.updated_at = datetime.now(timezone.utc)
+        row = result.one_or_none()
+        if row is None:
+            if await self.get_by_id(payment.id) is None:
+                raise ValueError("Payment not found in database")
+            raise StalePaymentError(str(payment.id))
+        return self._to_domain(row)
 
-        await self.session.flush()
-        await self.session.refresh(record)
-        return self._to_domain(record)
+    async def transition(
+        self,
+        payment_id: UUID,
+        expected: PaymentStatus,
+        new: PaymentStatus,
+    ) -> Optional[Payment]:
+        # Concurrent callers queue on the row lock; once the winner commits the
+        # others re-check the WHERE clause, match nothing and get no row back.
+        stmt = (
+            update(PaymentRecord)
+            .where(PaymentRecord.id == payment_id, PaymentRecord.status == expected)
+            .values(
+                status=new,
+                version=PaymentRecord.version + 1,
+                updated_at=datetime.now(timezone.utc),
+            )
+            .returning(*_PAYMENT_COLUMNS)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.session.execute(stmt)
+        row = result.one_or_none()
+        if row is None:
+            return None
+        return self._to_domain(row)
 
-    def _to_domain(self, record: PaymentRecord) -> Payment:
+    def _to_domain(self, row: Any) -> Payment:
         return Payment(
-            id=record.id,
-            amount=float(record.amount),
-            currency=record.currency,
-            status=PaymentStatus(record.status),
-            created_at=record.created_at,
-            updated_at=record.updated_at,
+            id=row.id,
+            amount=float(row.amount),
+            currency=row.currency,
+            status=PaymentStatus(row.status),
+            version=row.version,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
         )
-
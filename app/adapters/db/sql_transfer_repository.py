@@ -1,160 +1,575 @@
 from __future__ import annotations
 
-from copy import deepcopy
+import re
 from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Optional
+from functools import partial
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import CTE, Select, and_, func, insert, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from app.adapters.db import transfer_outbox
+from app.adapters.db.event_buffer import TransferEventBuffer, TransferEventRow
+from app.adapters.db.payload_store import PayloadStore
+from app.adapters.db.transfer_cache import TransferCache
+from app.core.payments.frozen import EMPTY, FrozenDict, freeze
+from app.core.payments.pagination import TransferCursor
 from app.core.payments.types import (
     PaymentData,
     TransferBody,
+    TransferListFilters,
+    TransferPage,
     TransferParty,
     TransferPartyOwner,
+    TransferSummary,
 )
-from app.db.models import PaymentRecord, TransferEventRecord, TransferRecord
+from app.db.models import (
+    PaymentRecord,
+    TransferEventRecord,
+    TransferLookupRecord,
+    TransferOutboxRecord,
+    TransferRecord,
+)
+from app.db.session import get_current_tenant, mark_write, on_commit
 from app.domain.models import PaymentStatus
-from app.ports.transfer_repository import TransferRepository
+from app.ports.transfer_repository import DuplicateOriginId, TransferRepository
+
+
+# Columns an upsert must never overwrite on an existing transfer
+_IMMUTABLE_TRANSFER_COLUMNS = frozenset({"payment_id", "origin_id", "created_at"})
+# Large JSON columns the caller already holds; not sent back through RETURNING
+_PAYLOAD_COLUMNS = frozenset({"metadata", "connector_response"})
+# Resolves blob references on reads when no store is configured
+_REFERENCE_READER = PayloadStore()
+# Listing projection; served from the (created_at, id) covering index where possible
+_SUMMARY_COLUMNS = (
+    "id",
+    "payment_id",
+    "origin_id",
+    "status",
+    "amount",
+    "currency",
+    "connector_id",
+    "source_address",
+    "destination_address",
+    "created_at",
+)
+
+# transfer_lookup's primary key is what keeps origin_id unique across partitions
+_LOOKUP_PKEY = "transfer_lookup_pkey"
+_DUPLICATE_ORIGIN = re.compile(r"\(origin_id\)=\((.*?)\)")
+# Rows per bulk statement; keeps each one well under the 32767 bind parameters asyncpg allows
+_BULK_CHUNK_SIZE = 250
+
+
+def _require_transfer_fields(data: PaymentData) -> None:
+    if data.transfer_body is None:
+        raise ValueError("Transfer body is required to persist transfer data")
+    if data.source is None or data.destination is None:
+        raise ValueError("Transfer source and destination are required")
 
 
 class SqlAlchemyTransferRepository(TransferRepository):
-    def __init__(self, session: AsyncSession):
+    def __init__(
+        self,
+        session: AsyncSession,
+        event_buffer: Optional[TransferEventBuffer] = None,
+        cache: Optional[TransferCache] = None,
+        payload_store: Optional[PayloadStore] = None,
+    ):
         self.session = session
+        # With a buffer, transfer_events rows are written in bulk after commit
+        self.event_buffer = event_buffer
+        self.cache = cache
+        # With a store, JSONB payload columns hold blob references instead of documents
+        self.payload_store = payload_store
 
-    async def save(self, data: PaymentData) -> PaymentData:
-        payment_record = await self._ensure_payment_record(data)
-        record = await self._get_transfer_by_payment_id(data.payment_id)
+    async def save(self, data: PaymentData, dispatch: bool = False) -> PaymentData:
+        _require_transfer_fields(data)
 
-        transfer_body = data.transfer_body
-        if transfer_body is None:
-            raise ValueError("Transfer body is required to persist transfer data")
-        if data.source is None or data.destination is None:
-            raise ValueError("Transfer source and destination are required")
+        # Frozen snapshots are shared with the statement and the returned PaymentData
+        metadata = freeze(data.metadata or EMPTY)
+        connector_response = metadata.get("connector_response", EMPTY)
 
-        metadata_copy = deepcopy(data.metadata or {})
-        connector_response = deepcopy(metadata_copy.get("connector_response", {}))
+        stored_metadata, stored_response, blob_insert = metadata, connector_response, None
+        if self.payload_store is not None:
+            stored_metadata, stored_response, blob_insert = self.payload_store.encode(metadata, connector_response)
 
-        if record is None:
-            record = TransferRecord(
-                payment=payment_record,
-                payment_id=payment_record.id,
-                origin_id=data.origin_id,
-                status=data.status,
-                amount=Decimal(str(data.amount)),
-                currency=data.currency,
-                concept=transfer_body.concept,
-                description=data.description or transfer_body.description,
-                connector_id=data.connector_id,
-                source_address=data.source.address,
-                source_address_type=data.source.address_type,
-                source_owner_id_type=data.source.owner.person_id_type,
-                source_owner_id=data.source.owner.person_id,
-                source_owner_name=data.source.owner.person_name,
-                destination_address=data.destination.address,
-                destination_address_type=data.destination.address_type,
-                destination_owner_id_type=data.destination.owner.person_id_type,
-                destination_owner_id=data.destination.owner.person_id,
-                destination_owner_name=data.destination.owner.person_name,
-                metadata=metadata_copy,
-                connector_response=connector_response,
-            )
-            self.session.add(record)
-        else:
-            record.status = data.status
-            record.amount = Decimal(str(data.amount))
-            record.currency = data.currency
-            record.concept = transfer_body.concept
-            record.description = data.description or transfer_body.description
-            record.connector_id = data.connector_id
-            record.source_address = data.source.address
-            record.source_address_type = data.source.address_type
-            record.source_owner_id_type = data.source.owner.person_id_type
-            record.source_owner_id = data.source.owner.person_id
-            record.source_owner_name = data.source.owner.person_name
-            record.destination_address = data.destination.address
-            record.destination_address_type = data.destination.address_type
-            record.destination_owner_id_type = data.destination.owner.person_id_type
-            record.destination_owner_id = data.destination.owner.person_id
-            record.destination_owner_name = data.destination.owner.person_name
-            record.metadata = metadata_copy
-            record.connector_response = connector_response
-            record.updated_at = datetime.now(timezone.utc)
-
-        event = TransferEventRecord(
-            transfer=record,
-            status=data.status,
-            message=metadata_copy.get("error_message"),
-            payload={
-                "status": data.status.value,
-                "metadata": metadata_copy,
-                "connector_response": connector_response,
-            },
+        now = datetime.now(timezone.utc)
+        event = self._event_values(data, stored_metadata, stored_response, now)
+
+        # Payment, transfer, payload blobs and (unless buffered) event are written by one statement
+        stmt = self._build_upsert_statement(
+            data,
+            stored_metadata,
+            stored_response,
+            now,
+            event=None if self.event_buffer is not None else event,
+            dispatch=dispatch,
         )
-        self.session.add(event)
+        if blob_insert is not None:
+            stmt = stmt.add_cte(blob_insert)
+        result = await self._execute_upsert(stmt, data.origin_id)
+        mark_write(self.session)
+        row = result.one_or_none()
+        if row is None:
+            raise RuntimeError("Failed to persist transfer data")
 
-        await self.session.flush()
-        # Reload to ensure relationships are present and defaults applied
-        record = await self._get_transfer_by_payment_id(data.payment_id)
-        if record is None:
+        tenant = get_current_tenant()
+        if self.event_buffer is not None:
+            buffered = TransferEventRow(tenant=tenant, transfer_id=row.id, **event)
+            on_commit(self.session, partial(self.event_buffer.add, buffered))
+
+        saved = self._to_payment_data(
+            row,
+            payment_description=row.payment_description,
+            metadata=metadata,
+            connector_response=connector_response,
+        )
+        if self.cache is not None:
+            # Readers only see the new state once it is committed
+            on_commit(self.session, partial(self.cache.set, tenant, saved))
+        return saved
+
+    async def save_many(self, items: Sequence[PaymentData], dispatch: bool = False) -> List[PaymentData]:
+        saved: List[PaymentData] = []
+        for start in range(0, len(items), _BULK_CHUNK_SIZE):
+            saved.extend(await self._save_chunk(items[start : start + _BULK_CHUNK_SIZE], dispatch))
+        return saved
+
+    async def _save_chunk(self, items: Sequence[PaymentData], dispatch: bool) -> List[PaymentData]:
+        """Payments, transfers, lookups and blobs in one statement, events in a second one."""
+        for data in items:
+            _require_transfer_fields(data)
+
+        metadatas = [freeze(data.metadata or EMPTY) for data in items]
+        payloads = [(metadata, metadata.get("connector_response", EMPTY)) for metadata in metadatas]
+        stored, blob_insert = payloads, None
+        if self.payload_store is not None:
+            stored, blob_insert = self.payload_store.encode_many(payloads)
+
+        now = datetime.now(timezone.utc)
+        stmt = self._build_bulk_upsert_statement(items, stored, now, dispatch=dispatch)
+        if blob_insert is not None:
+            stmt = stmt.add_cte(blob_insert)
+        result = await self._execute_upsert(stmt, ", ".join(data.origin_id for data in items))
+        rows = {row.payment_id: row for row in result.all()}
+        mark_write(self.session)
+        if len(rows) != len(items):
             raise RuntimeError("Failed to persist transfer data")
 
-        return self._to_payment_data(record)
+        tenant = get_current_tenant()
+        events = [
+            {"transfer_id": rows[data.payment_id].id, **self._event_values(data, metadata, response, now)}
+            for data, (metadata, response) in zip(items, stored)
+        ]
+        if self.event_buffer is not None:
+            for event in events:
+                on_commit(self.session, partial(self.event_buffer.add, TransferEventRow(tenant=tenant, **event)))
+        else:
+            await self.session.execute(insert(TransferEventRecord.__table__).values(events))
+
+        saved = [
+            self._to_payment_data(
+                rows[data.payment_id],
+                payment_description=rows[data.payment_id].payment_description,
+                metadata=metadata,
+                connector_response=connector_response,
+            )
+            for data, (metadata, connector_response) in zip(items, payloads)
+        ]
+        if self.cache is not None:
+            for data in saved:
+                on_commit(self.session, partial(self.cache.set, tenant, data))
+        return saved
+
+    async def commit(self) -> None:
+        # on_commit callbacks still run when the request's session closes
+        await self.session.commit()
 
     async def get_by_origin_id(self, origin_id: str) -> Optional[PaymentData]:
+        tenant = get_current_tenant()
+        if self.cache is not None:
+            cached = await self.cache.get(tenant, origin_id)
+            if cached is not None:
+                return cached
+
         record = await self._get_transfer_by_origin(origin_id)
         if record is None:
             return None
-        return self._to_payment_data(record)
+        data = await self._record_to_payment_data(record)
+        if self.cache is not None:
+            await self.cache.set(tenant, data)
+        return data
+
+    async def get_payment_ids_by_origin_ids(self, origin_ids: Sequence[str]) -> Dict[str, UUID]:
+        if not origin_ids:
+            return {}
+        lookup = TransferLookupRecord.__table__
+        stmt = select(lookup.c.origin_id, lookup.c.payment_id).where(lookup.c.origin_id.in_(origin_ids))
+        return {origin_id: payment_id for origin_id, payment_id in (await self.session.execute(stmt)).all()}
 
     async def get_by_payment_id(self, payment_id: UUID) -> Optional[PaymentData]:
         record = await self._get_transfer_by_payment_id(payment_id)
         if record is None:
             return None
-        return self._to_payment_data(record)
+        return await self._record_to_payment_data(record)
 
-    async def _ensure_payment_record(self, data: PaymentData) -> PaymentRecord:
-        payment_record = await self.session.get(PaymentRecord, data.payment_id)
-        if payment_record is None:
-            payment_record = PaymentRecord(
-                id=data.payment_id,
-                amount=Decimal(str(data.amount)),
-                currency=data.currency,
-                status=PaymentStatus.PENDING,
-                description=data.description,
-                metadata=deepcopy(data.metadata or {}),
+    async def get_by_payment_ids(self, payment_ids: Sequence[UUID]) -> List[PaymentData]:
+        """Batch variant of get_by_payment_id for workers; missing ids are skipped."""
+        if not payment_ids:
+            return []
+        lookup = TransferLookupRecord.__table__
+        stmt = (
+            select(TransferRecord)
+            .join(
+                lookup,
+                and_(lookup.c.payment_id == TransferRecord.payment_id, lookup.c.created_at == TransferRecord.created_at),
+            )
+            .options(selectinload(TransferRecord.payment))
+            .where(lookup.c.payment_id.in_(payment_ids))
+            .execution_options(populate_existing=True)
+        )
+        records = (await self.session.execute(stmt)).scalars().all()
+        return [await self._record_to_payment_data(record) for record in records]
+
+    async def schedule_retry(self, payment_id: UUID, delay: float, error: str, count_attempt: bool = True) -> None:
+        await transfer_outbox.schedule_retry(self.session, payment_id, delay, error, count_attempt=count_attempt)
+
+    async def mark_dispatched(self, payment_id: UUID) -> None:
+        await transfer_outbox.mark_dispatched(self.session, payment_id)
+
+    async def list_transfers(
+        self,
+        filters: TransferListFilters,
+        limit: int,
+        cursor: Optional[TransferCursor] = None,
+    ) -> TransferPage:
+        transfers = TransferRecord.__table__
+        stmt = select(*[transfers.c[name] for name in _SUMMARY_COLUMNS])
+
+        equals = {
+            "status": filters.status,
+            "currency": filters.currency,
+            "connector_id": filters.connector_id,
+            "source_address": filters.source_address,
+            "destination_address": filters.destination_address,
+        }
+        for name, value in equals.items():
+            if value is not None:
+                stmt = stmt.where(transfers.c[name] == value)
+        # created_at bounds also prune partitions
+        if filters.created_from is not None:
+            stmt = stmt.where(transfers.c.created_at >= filters.created_from)
+        if filters.created_to is not None:
+            stmt = stmt.where(transfers.c.created_at < filters.created_to)
+        if cursor is not None:
+            stmt = stmt.where(
+                tuple_(transfers.c.created_at, transfers.c.id) < tuple_(cursor.created_at, cursor.id)
             )
-            self.session.add(payment_record)
-            await self.session.flush()
-            await self.session.refresh(payment_record)
-        return payment_record
+
+        # One extra row tells whether another page exists
+        stmt = stmt.order_by(transfers.c.created_at.desc(), transfers.c.id.desc()).limit(limit + 1)
+        rows = (await self.session.execute(stmt)).all()
+
+        page = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = TransferCursor(created_at=page[-1].created_at, id=page[-1].id).encode()
+        return TransferPage(
+            items=[
+                TransferSummary(
+                    payment_id=row.payment_id,
+                    origin_id=row.origin_id,
+                    status=row.status,
+                    amount=row.amount,
+                    currency=row.currency,
+                    connector_id=row.connector_id,
+                    source_address=row.source_address,
+                    destination_address=row.destination_address,
+                    created_at=row.created_at,
+                )
+                for row in page
+            ],
+            next_cursor=next_cursor,
+        )
+
+    def _build_upsert_statement(
+        self,
+        data: PaymentData,
+        metadata: FrozenDict,
+        connector_response: FrozenDict,
+        now: datetime,
+        event: Optional[Dict[str, Any]] = None,
+        dispatch: bool = False,
+    ) -> Select:
+        """INSERT ... ON CONFLICT ... RETURNING for payment, transfer and event as one CTE.
+
+        transfers is partitioned by created_at, so uniqueness is (payment_id, created_at):
+        an existing transfer keeps the created_at recorded in transfer_lookup, which makes
+        the re-save hit the same partition and conflict target.
+        """
+        payments = PaymentRecord.__table__
+        events = TransferEventRecord.__table__
+
+        payment_upsert = (
+            pg_insert(payments)
+            .values(**self._payment_values(data, metadata, now))
+            .on_conflict_do_nothing(index_elements=[payments.c.id])
+            .returning(payments.c.description)
+            .cte("payment_upsert")
+        )
+        transfer_upsert = self._transfer_upsert([self._transfer_values(data, metadata, connector_response, now)])
+
+        # The payment row is only visible through RETURNING when this statement created it
+        payment_description = func.coalesce(
+            select(payment_upsert.c.description).scalar_subquery(),
+            select(payments.c.description).where(payments.c.id == data.payment_id).scalar_subquery(),
+        )
+        stmt = select(
+            transfer_upsert,
+            payment_description.label("payment_description"),
+        ).add_cte(payment_upsert, self._lookup_insert(transfer_upsert))
+
+        if event is not None:
+            event_insert = (
+                insert(events)
+                .values(transfer_id=select(transfer_upsert.c.id).scalar_subquery(), **event)
+                .returning(events.c.id)
+                .cte("event_insert")
+            )
+            stmt = stmt.add_cte(event_insert)
+
+        if dispatch:
+            stmt = stmt.add_cte(self._outbox_insert(transfer_upsert, now))
+        return stmt
+
+    def _build_bulk_upsert_statement(
+        self,
+        items: Sequence[PaymentData],
+        stored: Sequence[Tuple[FrozenDict, FrozenDict]],
+        now: datetime,
+        dispatch: bool = False,
+    ) -> Select:
+        """Multi-row variant of _build_upsert_statement; events are written separately."""
+        payments = PaymentRecord.__table__
+
+        payment_upsert = (
+            pg_insert(payments)
+            .values([self._payment_values(data, metadata, now) for data, (metadata, _) in zip(items, stored)])
+            .on_conflict_do_nothing(index_elements=[payments.c.id])
+            .returning(payments.c.id, payments.c.description)
+            .cte("payment_upsert")
+        )
+        transfer_upsert = self._transfer_upsert(
+            [
+                self._transfer_values(data, metadata, connector_response, now)
+                for data, (metadata, connector_response) in zip(items, stored)
+            ]
+        )
+
+        # New payments come from RETURNING, existing ones from the table snapshot
+        payment_description = func.coalesce(payment_upsert.c.description, payments.c.description)
+        stmt = (
+            select(transfer_upsert, payment_description.label("payment_description"))
+            .select_from(
+                transfer_upsert.outerjoin(
+                    payment_upsert, payment_upsert.c.id == transfer_upsert.c.payment_id
+                ).outerjoin(payments, payments.c.id == transfer_upsert.c.payment_id)
+            )
+            .add_cte(self._lookup_insert(transfer_upsert))
+        )
+        if dispatch:
+            stmt = stmt.add_cte(self._outbox_insert(transfer_upsert, now))
+        return stmt
+
+    async def _execute_upsert(self, stmt: Select, origin_id: str) -> Any:
+        try:
+            return await self.session.execute(stmt)
+        except IntegrityError as exc:
+            if _LOOKUP_PKEY not in str(exc.orig):
+                raise
+            match = _DUPLICATE_ORIGIN.search(str(exc.orig))
+            raise DuplicateOriginId(match.group(1) if match else origin_id) from exc
+
+    def _payment_values(self, data: PaymentData, metadata: FrozenDict, now: datetime) -> Dict[str, Any]:
+        return {
+            "id": data.payment_id,
+            "amount": Decimal(str(data.amount)),
+            "currency": data.currency,
+            "status": PaymentStatus.PENDING,
+            "description": data.description,
+            "metadata": metadata,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    def _transfer_values(
+        self,
+        data: PaymentData,
+        metadata: FrozenDict,
+        connector_response: FrozenDict,
+        now: datetime,
+    ) -> Dict[str, Any]:
+        lookup = TransferLookupRecord.__table__
+        transfer_body = data.transfer_body
+        return {
+            "payment_id": data.payment_id,
+            "origin_id": data.origin_id,
+            "status": data.status,
+            "amount": Decimal(str(data.amount)),
+            "currency": data.currency,
+            "concept": transfer_body.concept,
+            "description": data.description or transfer_body.description,
+            "connector_id": data.connector_id,
+            "source_address": data.source.address,
+            "source_address_type": data.source.address_type,
+            "source_owner_id_type": data.source.owner.person_id_type,
+            "source_owner_id": data.source.owner.person_id,
+            "source_owner_name": data.source.owner.person_name,
+            "destination_address": data.destination.address,
+            "destination_address_type": data.destination.address_type,
+            "destination_owner_id_type": data.destination.owner.person_id_type,
+            "destination_owner_id": data.destination.owner.person_id,
+            "destination_owner_name": data.destination.owner.person_name,
+            "metadata": metadata,
+            "connector_response": connector_response,
+            "created_at": func.coalesce(
+                select(lookup.c.created_at).where(lookup.c.payment_id == data.payment_id).scalar_subquery(),
+                now,
+            ),
+            "updated_at": now,
+        }
+
+    def _transfer_upsert(self, rows: List[Dict[str, Any]]) -> CTE:
+        transfers = TransferRecord.__table__
+        transfer_insert = pg_insert(transfers).values(rows)
+        return (
+            transfer_insert.on_conflict_do_update(
+                index_elements=[transfers.c.payment_id, transfers.c.created_at],
+                set_={
+                    name: transfer_insert.excluded[name]
+                    for name in rows[0]
+                    if name not in _IMMUTABLE_TRANSFER_COLUMNS
+                },
+            )
+            .returning(*[column for column in transfers.c if column.name not in _PAYLOAD_COLUMNS])
+            .cte("transfer_upsert")
+        )
+
+    def _lookup_insert(self, transfer_upsert: CTE) -> CTE:
+        lookup = TransferLookupRecord.__table__
+        return (
+            pg_insert(lookup)
+            .from_select(
+                ["origin_id", "payment_id", "transfer_id", "created_at"],
+                select(
+                    transfer_upsert.c.origin_id,
+                    transfer_upsert.c.payment_id,
+                    transfer_upsert.c.id,
+                    transfer_upsert.c.created_at,
+                ),
+            )
+            # A re-save of the same payment keeps its row; an origin_id taken by another
+            # payment violates the primary key and fails the whole statement
+            .on_conflict_do_nothing(index_elements=[lookup.c.payment_id])
+            .returning(lookup.c.origin_id)
+            .cte("lookup_insert")
+        )
+
+    def _outbox_insert(self, transfer_upsert: CTE, now: datetime) -> CTE:
+        outbox = TransferOutboxRecord.__table__
+        return (
+            pg_insert(outbox)
+            .from_select(
+                ["payment_id", "origin_id", "created_at"],
+                select(
+                    transfer_upsert.c.payment_id,
+                    transfer_upsert.c.origin_id,
+                    literal(now, outbox.c.created_at.type),
+                ),
+            )
+            # A re-save of an accepted transfer keeps its original outbox row
+            .on_conflict_do_nothing(index_elements=[outbox.c.payment_id])
+            .returning(outbox.c.id)
+            .cte("outbox_insert")
+        )
+
+    def _event_values(
+        self,
+        data: PaymentData,
+        metadata: FrozenDict,
+        connector_response: FrozenDict,
+        now: datetime,
+    ) -> Dict[str, Any]:
+        return {
+            "status": data.status,
+            "message": metadata.get("error_message"),
+            "payload": {
+                "status": data.status.value,
+                "metadata": metadata,
+                "connector_response": connector_response,
+            },
+            "created_at": now,
+        }
 
     async def _get_transfer_by_origin(self, origin_id: str) -> Optional[TransferRecord]:
+        lookup = TransferLookupRecord.__table__
+        # Pinning created_at through transfer_lookup lets the planner prune to one partition
+        created_at = select(lookup.c.created_at).where(lookup.c.origin_id == origin_id).scalar_subquery()
         stmt = (
             select(TransferRecord)
             .options(selectinload(TransferRecord.payment))
-            .where(TransferRecord.origin_id == origin_id)
+            .where(TransferRecord.origin_id == origin_id, TransferRecord.created_at == created_at)
+            .execution_options(populate_existing=True)
         )
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
     async def _get_transfer_by_payment_id(self, payment_id: UUID) -> Optional[TransferRecord]:
+        lookup = TransferLookupRecord.__table__
+        created_at = select(lookup.c.created_at).where(lookup.c.payment_id == payment_id).scalar_subquery()
         stmt = (
             select(TransferRecord)
             .options(selectinload(TransferRecord.payment))
-            .where(TransferRecord.payment_id == payment_id)
+            .where(TransferRecord.payment_id == payment_id, TransferRecord.created_at == created_at)
+            .execution_options(populate_existing=True)
         )
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
-    def _to_payment_data(self, record: TransferRecord) -> PaymentData:
+    async def _record_to_payment_data(self, record: TransferRecord) -> PaymentData:
         payment_record = record.payment
         if payment_record is None:
             raise ValueError("Transfer record is missing related payment")
 
+        metadata = freeze(record.metadata or EMPTY)
+        connector_response = freeze(record.connector_response or EMPTY)
+        # Inline rows (store disabled, or written before it was enabled) cost no extra query;
+        # references are resolved even when the store has since been switched off
+        store = self.payload_store or _REFERENCE_READER
+        metadata, connector_response = await store.rehydrate(self.session, metadata, connector_response)
+
+        return self._to_payment_data(
+            record,
+            payment_description=payment_record.description,
+            metadata=metadata,
+            connector_response=connector_response,
+        )
+
+    def _to_payment_data(
+        self,
+        record: Any,
+        payment_description: Optional[str],
+        metadata: Dict[str, Any],
+        connector_response: Dict[str, Any],
+    ) -> PaymentData:
+        """Build PaymentData from a TransferRecord or a RETURNING row of the same columns."""
         source_owner = TransferPartyOwner(
             personIdType=record.source_owner_id_type,
             personId=record.source_owner_id,
@@ -184,15 +599,16 @@ class SqlAlchemyTransferRepository(TransferRepository):
             concept=record.concept,
         )
 
-        metadata_copy = deepcopy(record.metadata or {})
-        metadata_copy["connector_response"] = deepcopy(record.connector_response or {})
+        # Only the top level is copied; nested values are immutable snapshots
+        metadata_copy = dict(metadata)
+        metadata_copy["connector_response"] = connector_response
 
         return PaymentData(
-            payment_id=payment_record.id,
+            payment_id=record.payment_id,
             origin_id=record.origin_id,
             amount=Decimal(record.amount),
             currency=record.currency,
-            description=payment_record.description or record.description,
+            description=payment_description or record.description,
             status=record.status,
             connector_id=record.connector_id,
             metadata=metadata_copy,
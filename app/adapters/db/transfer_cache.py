@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.payments.frozen import freeze
+from app.core.payments.types import PaymentData, PaymentState
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# States a transfer never leaves; these entries can live much longer
+TERMINAL_STATES = frozenset(
+    {PaymentState.AUTHORIZED, PaymentState.CAPTURED, PaymentState.FAILED, PaymentState.CANCELLED}
+)
+
+
+class TransferCache:
+    """Read-through cache for transfers by (tenant, origin_id).
+
+    The first tier is an in-process LRU with per-entry TTL; the optional second
+    tier is Redis, shared by every worker. Entries are written when a read misses
+    and refreshed after `SqlAlchemyTransferRepository.save` commits.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        terminal_ttl: Optional[float] = None,
+        redis_url: Optional[str] = None,
+    ) -> None:
+        self.max_entries = max_entries or settings.transfer_cache_max_entries
+        self.ttl = settings.transfer_cache_ttl if ttl is None else ttl
+        self.terminal_ttl = settings.transfer_cache_terminal_ttl if terminal_ttl is None else terminal_ttl
+        self._entries: "OrderedDict[str, Tuple[float, PaymentData]]" = OrderedDict()
+        self._redis = None
+        if redis_url:
+            import redis.asyncio as aioredis
+
+            self._redis = aioredis.Redis.from_url(redis_url)
+        self._hits = 0
+        self._shared_hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._evictions = 0
+        self._errors = 0
+
+    async def get(self, tenant: str, origin_id: str) -> Optional[PaymentData]:
+        key = self._key(tenant, origin_id)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, data = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return _detach(data)
+            del self._entries[key]
+
+        if self._redis is not None:
+            try:
+                raw = await self._redis.get(key)
+            except Exception:
+                self._errors += 1
+                logger.warning("Transfer cache lookup failed for %s", key, exc_info=True)
+                raw = None
+            if raw:
+                data = PaymentData.model_validate_json(raw)
+                data = data.model_copy(update={"metadata": freeze(data.metadata)})
+                self._store_local(key, data)
+                self._shared_hits += 1
+                return _detach(data)
+
+        self._misses += 1
+        return None
+
+    async def set(self, tenant: str, data: PaymentData) -> None:
+        if not data.origin_id:
+            return
+        key = self._key(tenant, data.origin_id)
+        current = self._entries.get(key)
+        if current is not None and current[1].status in TERMINAL_STATES and data.status not in TERMINAL_STATES:
+            # A late write of an older in-flight state must not replace the final one
+            return
+        data = data.model_copy(update={"metadata": freeze(data.metadata)})
+        self._store_local(key, data)
+        self._stores += 1
+
+        if self._redis is not None:
+            try:
+                await self._redis.set(key, data.model_dump_json(by_alias=True), px=int(self._ttl_for(data) * 1000))
+            except Exception:
+                self._errors += 1
+                logger.warning("Transfer cache store failed for %s", key, exc_info=True)
+
+    async def invalidate(self, tenant: str, origin_id: str) -> None:
+        key = self._key(tenant, origin_id)
+        self._entries.pop(key, None)
+        if self._redis is not None:
+            try:
+                await self._redis.delete(key)
+            except Exception:
+                self._errors += 1
+                logger.warning("Transfer cache invalidation failed for %s", key, exc_info=True)
+
+    async def close(self) -> None:
+        self._entries.clear()
+        if self._redis is not None:
+            await self._redis.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._shared_hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "hits": self._hits,
+            "shared_hits": self._shared_hits,
+            "misses": self._misses,
+            "hit_ratio": round((self._hits + self._shared_hits) / lookups, 4) if lookups else None,
+            "stores": self._stores,
+            "evictions": self._evictions,
+            "errors": self._errors,
+            "shared_store": self._redis is not None,
+        }
+
+    def _store_local(self, key: str, data: PaymentData) -> None:
+        self._entries[key] = (time.monotonic() + self._ttl_for(data), data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def _ttl_for(self, data: PaymentData) -> float:
+        return self.terminal_ttl if data.status in TERMINAL_STATES else self.ttl
+
+    @staticmethod
+    def _key(tenant: str, origin_id: str) -> str:
+        return f"transfer:{tenant}:{origin_id}"
+
+
+def _detach(data: PaymentData) -> PaymentData:
+    # Same contract as the repositories: a private top-level copy over shared frozen values
+    return data.model_copy(
+        update={
+            "metadata": dict(data.metadata),
+            "source": data.source.model_copy(deep=True) if data.source else None,
+            "destination": data.destination.model_copy(deep=True) if data.destination else None,
+            "transfer_body": data.transfer_body.model_copy() if data.transfer_body else None,
+        }
+    )
+
+
+def build_transfer_cache(backend: Optional[str] = None) -> Optional[TransferCache]:
+    backend = (backend or settings.transfer_cache_backend).lower()
+    if backend in {"", "none"}:
+        return None
+    if backend == "memory":
+        return TransferCache()
+    if backend == "redis":
+        return TransferCache(redis_url=settings.REDIS_URL)
+    raise ValueError(f"Unsupported transfer cache backend: {backend}")
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Sequence
+from uuid import UUID
+
+from sqlalchemy import Row, exists, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import TransferOutboxRecord
+
+_OUTBOX = TransferOutboxRecord.__table__
+
+
+async def claim_unpublished(session: AsyncSession, limit: int) -> Sequence[Row]:
+    """Mark up to `limit` unpublished rows as published and return (id, payment_id).
+
+    SKIP LOCKED lets several relays run at once without handing out the same rows;
+    the marks only stick if the caller publishes and commits.
+    """
+    pending = (
+        select(_OUTBOX.c.id)
+        .where(_OUTBOX.c.published_at.is_(None))
+        .order_by(_OUTBOX.c.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(_OUTBOX)
+        .where(_OUTBOX.c.id.in_(pending.scalar_subquery()))
+        .values(published_at=func.now())
+        .returning(_OUTBOX.c.id, _OUTBOX.c.payment_id)
+    )
+    return (await session.execute(stmt)).all()
+
+
+async def claim_pending(session: AsyncSession, limit: int, lease: float) -> Sequence[Row]:
+    """Lease up to `limit` due rows (new, waiting for a retry or with an expired lease); returns (payment_id, attempts).
+
+    The claim only pushes next_attempt_at `lease` seconds ahead: a worker that dies
+    before calling mark_dispatched leaves the row due again once the lease runs out.
+    Each claim counts as an attempt, so a transfer that keeps killing its worker still
+    reaches the retry limit. Workers claim with SKIP LOCKED, so concurrent workers
+    split the queue instead of waiting on each other.
+    """
+    due = (
+        select(_OUTBOX.c.id)
+        .where(_OUTBOX.c.dispatched_at.is_(None), _OUTBOX.c.next_attempt_at <= func.now())
+        .order_by(_OUTBOX.c.next_attempt_at, _OUTBOX.c.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(_OUTBOX)
+        .where(_OUTBOX.c.id.in_(due.scalar_subquery()))
+        .values(attempts=_OUTBOX.c.attempts + 1, next_attempt_at=func.now() + timedelta(seconds=lease))
+        .returning(_OUTBOX.c.payment_id, _OUTBOX.c.attempts)
+    )
+    return (await session.execute(stmt)).all()
+
+
+async def mark_dispatched(session: AsyncSession, payment_id: UUID) -> None:
+    """The transfer is settled; its row is never claimed again."""
+    stmt = update(_OUTBOX).where(_OUTBOX.c.payment_id == payment_id).values(dispatched_at=func.now())
+    await session.execute(stmt)
+
+
+async def has_due(session: AsyncSession) -> bool:
+    stmt = select(
+        exists().where(_OUTBOX.c.dispatched_at.is_(None), _OUTBOX.c.next_attempt_at <= func.now())
+    )
+    return bool(await session.scalar(stmt))
+
+
+async def schedule_retry(
+    session: AsyncSession,
+    payment_id: UUID,
+    delay: float,
+    error: str,
+    count_attempt: bool = True,
+) -> None:
+    """Replace the lease on `payment_id` with a retry due in `delay` seconds.
+
+    Without `count_attempt` the failed attempt is not added: claim_pending counted it.
+    """
+    values = {"next_attempt_at": func.now() + timedelta(seconds=delay), "last_error": error[:255]}
+    if count_attempt:
+        values["attempts"] = _OUTBOX.c.attempts + 1
+    await session.execute(update(_OUTBOX).where(_OUTBOX.c.payment_id == payment_id).values(**values))
@@ -0,0 +1,50 @@
+import time
+from typing import Dict, Optional, Tuple
+
+from app.ports.idempotency_store import IN_PROGRESS, IdempotencyRecord, IdempotencyStore
+
+
+class InMemoryIdempotencyStore(IdempotencyStore):
+    """Single-process store (tests, development, one uvicorn worker)."""
+
+    def __init__(self, max_entries: int = 100_000) -> None:
+        self.max_entries = max_entries
+        self._records: Dict[str, Tuple[IdempotencyRecord, float]] = {}
+
+    async def get(self, key: str) -> Optional[IdempotencyRecord]:
+        entry = self._records.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._records[key]
+            return None
+        return entry[0]
+
+    async def claim(self, key: str, record: IdempotencyRecord, ttl: float) -> bool:
+        if await self.get(key) is not None:
+            return False
+        self._store(key, record, ttl)
+        return True
+
+    async def complete(self, key: str, record: IdempotencyRecord, ttl: float) -> None:
+        self._store(key, record, ttl)
+
+    async def release(self, key: str, owner: str) -> None:
+        entry = self._records.get(key)
+        if entry is not None and entry[0].state == IN_PROGRESS and entry[0].owner == owner:
+            del self._records[key]
+
+    def _store(self, key: str, record: IdempotencyRecord, ttl: float) -> None:
+        self._records.pop(key, None)
+        if len(self._records) >= self.max_entries:
+            self._evict()
+        self._records[key] = (record, time.monotonic() + ttl)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        expired = [key for key, (_, expires_at) in self._records.items() if expires_at <= now]
+        for key in expired:
+            del self._records[key]
+        # Still full: drop the oldest insertions
+        while len(self._records) >= self.max_entries:
+            del self._records[next(iter(self._records))]
@@ -0,0 +1,36 @@
+from typing import Optional
+
+from app.ports.idempotency_store import IdempotencyRecord, IdempotencyStore
+
+
+class RedisIdempotencyStore(IdempotencyStore):
+    """Works against Redis or any server speaking its protocol (KeyDB, Dragonfly, Valkey)."""
+
+    # Only the worker that holds the in-progress claim may drop it
+    _RELEASE = (
+        "local raw = redis.call('get', KEYS[1]) "
+        "if raw and cjson.decode(raw)['state'] == 'in_progress' and cjson.decode(raw)['owner'] == ARGV[1] "
+        "then return redis.call('del', KEYS[1]) end return 0"
+    )
+
+    def __init__(self, url: str, prefix: str = "idempotency:") -> None:
+        import redis.asyncio as aioredis
+
+        self._redis = aioredis.Redis.from_url(url)
+        self._prefix = prefix
+
+    async def get(self, key: str) -> Optional[IdempotencyRecord]:
+        raw = await self._redis.get(self._prefix + key)
+        return IdempotencyRecord.from_json(raw) if raw else None
+
+    async def claim(self, key: str, record: IdempotencyRecord, ttl: float) -> bool:
+        return bool(await self._redis.set(self._prefix + key, record.to_json(), nx=True, px=int(ttl * 1000)))
+
+    async def complete(self, key: str, record: IdempotencyRecord, ttl: float) -> None:
+        await self._redis.set(self._prefix + key, record.to_json(), px=int(ttl * 1000))
+
+    async def release(self, key: str, owner: str) -> None:
+        await self._redis.eval(self._RELEASE, 1, self._prefix + key, owner)
+
+    async def close(self) -> None:
+        await self._redis.aclose()
@@ -0,0 +1,76 @@
+"""Stream transfers (or transfer_events) to a file or stdout as NDJSON/CSV.
+
+    python -m app.cli.export_transfers --tenant acme --format csv --gzip \\
+        --created-from 2026-01-01 --created-to 2026-02-01 --output transfers-2026-01.csv.gz
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+
+from app.adapters.db.sql_transfer_export import SqlTransferExportSource
+from app.core.payments.export import EXPORT_FORMATS, encode_export
+from app.core.payments.types import PaymentState, TransferListFilters
+from app.db.session import DEFAULT_TENANT, dispose_engines
+from app.ports.transfer_export import EXPORT_DATASETS
+from config.settings import settings
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenant", default=DEFAULT_TENANT)
+    parser.add_argument("--dataset", choices=EXPORT_DATASETS, default="transfers")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--output", help="Destination file (stdout when omitted)")
+    parser.add_argument("--batch-size", type=int, default=settings.export_batch_size)
+    parser.add_argument("--status", type=PaymentState)
+    parser.add_argument("--currency")
+    parser.add_argument("--created-from", type=datetime.fromisoformat)
+    parser.add_argument("--created-to", type=datetime.fromisoformat)
+    parser.add_argument("--connector-id")
+    parser.add_argument("--source-address")
+    parser.add_argument("--destination-address")
+    return parser
+
+
+async def _run(args: argparse.Namespace) -> int:
+    source = SqlTransferExportSource(args.tenant)
+    filters = TransferListFilters(
+        status=args.status,
+        currency=args.currency,
+        created_from=args.created_from,
+        created_to=args.created_to,
+        connector_id=args.connector_id,
+        source_address=args.source_address,
+        destination_address=args.destination_address,
+    )
+    chunks = encode_export(
+        source.batches(args.dataset, filters, args.batch_size),
+        args.format,
+        source.columns(args.dataset),
+        gzip=args.gzip,
+    )
+
+    written = 0
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        async for chunk in chunks:
+            output.write(chunk)
+            written += len(chunk)
+    finally:
+        if args.output:
+            output.close()
+        await dispose_engines()
+    return written
+
+
+def main() -> None:
+    args = _parser().parse_args()
+    written = asyncio.run(_run(args))
+    print(f"{written} bytes written", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Partition maintenance for transfers and transfer_events.
+
+    python -m app.cli.partitions ensure --months-ahead 3
+    python -m app.cli.partitions retention --keep-months 13 --drop
+    python -m app.cli.partitions maintain --tenant acme --tenant public
+"""
+
+import argparse
+import asyncio
+import json
+
+from app.db.partitions import apply_retention, configured_tenants, ensure_partitions, maintain_partitions
+from app.db.session import dispose_engines, tenant_session
+from config.settings import settings
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["ensure", "retention", "maintain"])
+    parser.add_argument("--tenant", action="append", dest="tenants", help="Tenant schema (repeatable)")
+    parser.add_argument("--months-ahead", type=int, default=settings.partition_months_ahead)
+    parser.add_argument("--keep-months", type=int, default=settings.partition_retention_months)
+    parser.add_argument("--drop", action="store_true", default=settings.partition_retention_drop,
+                        help="Drop detached partitions instead of leaving them for archiving")
+    return parser
+
+
+async def _run(args: argparse.Namespace) -> dict:
+    tenants = args.tenants or configured_tenants()
+    try:
+        if args.command == "maintain":
+            return await maintain_partitions(tenants, args.months_ahead, args.keep_months, args.drop)
+
+        if args.command == "retention" and args.keep_months <= 0:
+            raise SystemExit("--keep-months must be positive for retention")
+
+        report = {}
+        for tenant in tenants:
+            async with tenant_session(tenant) as session:
+                if args.command == "ensure":
+                    report[tenant] = {"created": await ensure_partitions(session, args.months_ahead)}
+                else:
+                    report[tenant] = {"removed": await apply_retention(session, args.keep_months, drop=args.drop)}
+        return report
+    finally:
+        await dispose_engines()
+
+
+def main() -> None:
+    args = _parser().parse_args()
+    print(json.dumps(asyncio.run(_run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Reconcile a Banco Comercio statement against the transfers of a tenant.
+
+    python -m app.cli.reconcile docs/samples/bdc_statement_sample.csv --tenant acme \\
+        --created-from 2026-01-15 --created-to 2026-01-16 --output discrepancies.ndjson
+
+Statement formats: CSV with a header (see docs/samples/bdc_statement_sample.csv),
+a JSON array / {"movements": [...]} or NDJSON. Prints the summary as JSON and
+writes one NDJSON row per discrepancy to --output.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime
+
+from app.adapters.db.reconciliation_ledger import stream_ledger
+from app.core.reconciliation.engine import reconcile_batches, report_rows
+from app.core.reconciliation.statement import load_statement
+from app.db.session import DEFAULT_TENANT, dispose_engines
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("statement", help="Statement file (.csv, .json, .ndjson)")
+    parser.add_argument("--format", choices=["csv", "json", "ndjson"], help="Override the format guessed from the extension")
+    parser.add_argument("--tenant", default=DEFAULT_TENANT)
+    parser.add_argument("--created-from", type=datetime.fromisoformat)
+    parser.add_argument("--created-to", type=datetime.fromisoformat)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--output", help="NDJSON file for the discrepancy rows")
+    return parser
+
+
+async def _run(args: argparse.Namespace) -> dict:
+    started = time.perf_counter()
+    statement = load_statement(args.statement, args.format)
+    loaded = time.perf_counter()
+    try:
+        report = await reconcile_batches(
+            statement,
+            stream_ledger(args.tenant, args.created_from, args.created_to, args.batch_size),
+        )
+    finally:
+        await dispose_engines()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            for row in report_rows(report):
+                output.write(json.dumps(row) + "\n")
+
+    return {
+        "statement_lines": len(statement) + len(statement.duplicates),
+        **report.summary(),
+        "load_seconds": round(loaded - started, 3),
+        "total_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def main() -> None:
+    args = _parser().parse_args()
+    summary = asyncio.run(_run(args))
+    json.dump(summary, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,20 @@
-from typing import Any, Dict
+import hashlib
+import hmac
+import importlib.util
+import json
+import logging
+from typing import Any, Dict, Optional
 from uuid import uuid4
 
 import httpx
 
 from app.core.connectors.interface import ConnectorIntegration
+from app.core.connectors.token_cache import (
+    AccessToken,
+    TokenCache,
+    build_token_store,
+    parse_token_expiry,
+)
 from app.core.payments.types import (
     ConnectorResponse,
     PaymentData,
@@ -12,13 +23,62 @@ from app.core.payments.types import (
 )
 from config.settings import settings
 
+logger = logging.getLogger(__name__)
+
+
+def http2_enabled() -> bool:
+    """BDC_HTTP2, unless the `h2` package (httpx[http2]) is missing: then HTTP/1.1 with a warning."""
+    if not settings.bdc_http2:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("BDC_HTTP2 is set but the h2 package is not installed; using HTTP/1.1")
+        return False
+    return True
+
+
+def calculate_signature(path: str, body: bytes, secret: str) -> str:
+    """X-SIGNATURE: hex HMAC-SHA256 of `[path]` followed by the exact request body."""
+    message = f"[{path.strip('/')}]".encode() + body
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
 
 class BancoComercioConnector(ConnectorIntegration):
     """Connector for Banco de Comercio transfer API."""
 
+    name = "banco_comercio"
     auth_path = "/auth"
     transfer_path = "/movements/transfer-request"
 
+    def __init__(
+        self,
+        client: Optional[httpx.AsyncClient] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        token_cache: Optional[TokenCache] = None,
+    ) -> None:
+        self._client = client
+        self._owns_client = client is None
+        self._transport = transport
+        self._in_flight = 0
+        self._http2 = False
+        self._requests_total = 0
+        self._token_cache = token_cache or TokenCache(
+            self._fetch_token,
+            store=build_token_store(),
+            key=f"bdc:access_token:{settings.bdc_client_id}",
+        )
+
+    async def startup(self) -> None:
+        self._get_client()
+
+    async def shutdown(self) -> None:
+        await self._token_cache.close()
+        client, self._client = self._client, None
+        if client is not None and self._owns_client:
+            await client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"http_pool": self._pool_stats(), "token": self._token_cache.stats()}
+
     async def build_request(self, data: PaymentData) -> Dict[str, Any]:
         if not data.source or not data.destination or not data.transfer_body:
             raise ValueError("Transfer data incomplete; source, destination and body are required")
@@ -38,19 +98,29 @@ class BancoComercioConnector(ConnectorIntegration):
         return request
 
     async def execute_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        token = await self._get_token()
         payload = {k: v for k, v in request.items() if v is not None}
-        signature = self._calculate_signature(self.transfer_path, payload)
+        # Serialized once: the bank checks the signature against the bytes it receives
+        body = self._encode_payload(payload)
+        signature = calculate_signature(self.transfer_path, body, settings.bdc_secret_key)
+
+        token = await self._get_token()
+        response = await self._post_transfer(body, signature, token)
+        if response.status_code == httpx.codes.UNAUTHORIZED:
+            # Token revoked or expired early: drop it and retry once with a fresh one
+            await self._token_cache.invalidate(token)
+            token = await self._get_token()
+            response = await self._post_transfer(body, signature, token)
+
+        response.raise_for_status()
+        return response.json()
 
+    async def _post_transfer(self, body: bytes, signature: str, token: str) -> httpx.Response:
         headers = {
             "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
             "X-SIGNATURE": signature,
         }
-
-        async with httpx.AsyncClient(base_url=settings.bdc_base_url, timeout=30) as client:
-            response = await client.post(self.transfer_path, json=payload, headers=headers)
-            response.raise_for_status()
-            return response.json()
+        return await self._post(self.transfer_path, content=body, headers=headers)
 
     async def handle_response(self, response: Dict[str, Any]) -> ConnectorResponse:
         status_code = response.get("statusCode")
@@ -69,27 +139,81 @@ class BancoComercioConnector(ConnectorIntegration):
         )
 
     async def _get_token(self) -> str:
+        return await self._token_cache.get_token()
+
+    async def _fetch_token(self) -> AccessToken:
         payload = {
             "clientId": settings.bdc_client_id,
             "clientSecret": settings.bdc_client_secret,
         }
-        async with httpx.AsyncClient(base_url=settings.bdc_base_url, timeout=10) as client:
-            response = await client.post(self.auth_path, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            return data["data"]["accessToken"]
+        response = await self._post(self.auth_path, json=payload, timeout=settings.bdc_auth_timeout)
+        response.raise_for_status()
+        data = response.json()["data"]
+        value = data["accessToken"]
+        return AccessToken(value=value, expires_at=parse_token_expiry(value, data.get("expiresIn")))
+
+    async def _post(self, path: str, **kwargs: Any) -> httpx.Response:
+        client = self._get_client()
+        self._in_flight += 1
+        self._requests_total += 1
+        try:
+            return await client.post(path, **kwargs)
+        finally:
+            self._in_flight -= 1
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created lazily so the connector also works outside the app lifespan
+        # (scripts, tests); the lifespan only moves creation to startup.
+        if self._client is None or self._client.is_closed:
+            self._http2 = http2_enabled()
+            self._client = httpx.AsyncClient(
+                base_url=settings.bdc_base_url,
+                http2=self._http2,
+                limits=httpx.Limits(
+                    max_connections=settings.bdc_pool_max_connections,
+                    max_keepalive_connections=settings.bdc_pool_max_keepalive,
+                    keepalive_expiry=settings.bdc_keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(
+                    connect=settings.bdc_connect_timeout,
+                    read=settings.bdc_read_timeout,
+                    write=settings.bdc_write_timeout,
+                    pool=settings.bdc_pool_timeout,
+                ),
+                transport=self._transport,
+            )
+            self._owns_client = True
+        return self._client
+
+    def _pool_stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            "open": self._client is not None and not self._client.is_closed,
+            "http2": self._http2,
+            "max_connections": settings.bdc_pool_max_connections,
+            "max_keepalive_connections": settings.bdc_pool_max_keepalive,
+            "in_flight": self._in_flight,
+            "requests_total": self._requests_total,
+            "connections": 0,
+            "idle": 0,
+            "active": 0,
+        }
+        # httpcore keeps the pool behind private attributes; read it defensively
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        idle = sum(1 for conn in connections if conn.is_idle())
+        stats["connections"] = len(connections)
+        stats["idle"] = idle
+        stats["active"] = len(connections) - idle
+        stats["utilization"] = round(stats["active"] / max(settings.bdc_pool_max_connections, 1), 4)
+        return stats
 
     def _calculate_signature(self, path: str, payload: Dict[str, Any]) -> str:
-        import json
-        import hmac
-        import hashlib
-
-        compact_body = json.dumps(payload, separators=(",", ":"))
-        uri = f"[{path.strip('/')}]"
-        message = f"{uri}{compact_body}".encode()
-        secret = settings.bdc_secret_key.encode()
-        signature = hmac.new(secret, message, hashlib.sha256).hexdigest()
-        return signature
+        return calculate_signature(path, self._encode_payload(payload), settings.bdc_secret_key)
+
+    @staticmethod
+    def _encode_payload(payload: Dict[str, Any]) -> bytes:
+        # Compact and ASCII-only; httpx's own json= encoding keeps non-ASCII characters
+        return json.dumps(payload, separators=(",", ":")).encode()
 
     def _map_currency(self, currency_alpha: str) -> str:
         mapping = {
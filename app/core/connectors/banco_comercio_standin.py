@@ -0,0 +1,122 @@
+"""Local stand-in for the Banco de Comercio API, for wire-level tests and benchmarks.
+
+A plain ASGI app serving `/auth` and `/movements/transfer-request`. Transfers
+must carry an X-SIGNATURE matching `calculate_signature` over the raw body, or
+they get 403. Everything else (tokens, latency, injected failures, quota)
+comes from a SimulatedBank with the chosen MockBancoComercioBehaviour. The
+real BancoComercioConnector is pointed at it through BDC_BASE_URL:
+
+    python -m app.core.connectors.banco_comercio_standin --port 9100 --profile typical --secret-key s3cret
+    BDC_BASE_URL=http://127.0.0.1:9100 BDC_SECRET_KEY=s3cret TRANSFER_CONNECTOR_MODE=banco_comercio uvicorn app.main:app
+
+A simulated timeout answers 504 after `timeout_ms` instead of leaving the
+connection hanging.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hmac
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.core.connectors.banco_comercio import BancoComercioConnector, calculate_signature
+from app.core.connectors.mock_banco_comercio import (
+    BEHAVIOUR_PROFILES,
+    MockBancoComercioBehaviour,
+    SimulatedBank,
+)
+from config.settings import settings
+
+
+class BancoComercioStandIn:
+    def __init__(
+        self,
+        behaviour: Optional[MockBancoComercioBehaviour] = None,
+        secret_key: Optional[str] = None,
+        bank: Optional[SimulatedBank] = None,
+    ) -> None:
+        self.bank = bank or SimulatedBank(behaviour or MockBancoComercioBehaviour())
+        self.secret_key = settings.bdc_secret_key if secret_key is None else secret_key
+        self.invalid_signatures = 0
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        body = await self._read_body(receive)
+        headers = [(name.decode("latin-1"), value.decode("latin-1")) for name, value in scope["headers"]]
+        request = httpx.Request(scope["method"], f"http://standin{scope['path']}", headers=headers, content=body)
+        if scope["path"].endswith(BancoComercioConnector.transfer_path) and not self._signature_ok(request):
+            self.invalid_signatures += 1
+            response = httpx.Response(403, json={"message": "Invalid signature"})
+        else:
+            try:
+                response = await self.bank(request)
+            except httpx.TimeoutException:
+                response = httpx.Response(504, json={"message": "Simulated bank timeout"})
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": self._raw_headers(response),
+            }
+        )
+        await send({"type": "http.response.body", "body": response.content})
+
+    def _signature_ok(self, request: httpx.Request) -> bool:
+        expected = calculate_signature(BancoComercioConnector.transfer_path, request.content, self.secret_key)
+        return hmac.compare_digest(request.headers.get("X-SIGNATURE", ""), expected)
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.bank.counters, "invalid_signatures": self.invalid_signatures}
+
+    @staticmethod
+    async def _read_body(receive: Callable) -> bytes:
+        chunks: List[bytes] = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    @staticmethod
+    def _raw_headers(response: httpx.Response) -> List[Tuple[bytes, bytes]]:
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in response.headers.items()]
+        if "content-length" not in response.headers:
+            headers.append((b"content-length", str(len(response.content)).encode()))
+        return headers
+
+    @staticmethod
+    async def _lifespan(receive: Callable, send: Callable) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def create_app() -> BancoComercioStandIn:
+    """Factory for `uvicorn --factory`, configured from MOCK_BANK_PROFILE/MOCK_BANK_SEED/BDC_SECRET_KEY."""
+    return BancoComercioStandIn(MockBancoComercioBehaviour.from_settings())
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--profile", choices=sorted(BEHAVIOUR_PROFILES), default=settings.mock_bank_profile)
+    parser.add_argument("--seed", type=int, default=settings.mock_bank_seed)
+    parser.add_argument("--secret-key", default=settings.bdc_secret_key)
+    args = parser.parse_args()
+    standin = BancoComercioStandIn(MockBancoComercioBehaviour.from_profile(args.profile, args.seed), args.secret_key)
+    uvicorn.run(standin, host=args.host, port=args.port, log_level="warning", access_log=False)
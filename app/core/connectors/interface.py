@@ -2,7 +2,19 @@ from abc import ABC, abstractmethod
 from typing import Any, Dict
 from app.core.payments.types import PaymentData, ConnectorResponse
 
+
+class ConnectorUnavailable(Exception):
+    """The call was refused locally, without reaching the provider; retry after `retry_after` seconds."""
+
+    def __init__(self, message: str, retry_after: float = 1.0) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
 class ConnectorIntegration(ABC):
+    # Key for per-connector settings such as WORKER_CONNECTOR_LIMITS
+    name: str = "default"
+
     @abstractmethod
     async def build_request(self, data: PaymentData) -> Dict[str, Any]:
         """Convert domain data to provider specific request format"""
@@ -17,3 +29,15 @@ class ConnectorIntegration(ABC):
     async def handle_response(self, response: Dict[str, Any]) -> ConnectorResponse:
         """Convert provider response back to domain format"""
         pass
+
+    async def startup(self) -> None:
+        """Acquire long-lived resources (HTTP pools, caches). Called from the app lifespan."""
+        pass
+
+    async def shutdown(self) -> None:
+        """Release resources acquired in startup()."""
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Runtime statistics for monitoring endpoints."""
+        return {}
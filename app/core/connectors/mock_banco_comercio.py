@@ -1,12 +1,24 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import asyncio
+import json
+import math
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
 from decimal import Decimal
-from typing import Any, Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, Optional
 from uuid import uuid4
 
+import httpx
+
 from app.core.connectors.banco_comercio import BancoComercioConnector
+from app.core.connectors.token_cache import TokenCache
 from app.core.payments.types import ConnectorResponse, PaymentData, PaymentState
+from config.settings import settings
+
+LATENCY_DISTRIBUTIONS = ("none", "fixed", "normal", "pareto")
 
 
 @dataclass
@@ -15,42 +27,176 @@ class MockBancoComercioBehaviour:
     failure_amount_threshold: Optional[Decimal] = None
     success_status_code: int = 0
     failure_status_code: int = 4099
+    # Transfer latency in ms: "fixed" waits latency_ms, "normal" draws around it
+    # with latency_stddev_ms, "pareto" uses it as the minimum of a long tail that
+    # gets heavier as pareto_alpha shrinks. Every draw is capped at latency_max_ms.
+    latency: str = "none"
+    latency_ms: float = 0.0
+    latency_stddev_ms: float = 0.0
+    pareto_alpha: float = 1.5
+    latency_max_ms: float = 60_000.0
+    auth_latency_ms: float = 0.0
+    # Fractions of transfer calls that time out (after timeout_ms) or get an HTTP error
+    timeout_rate: float = 0.0
+    timeout_ms: float = 1000.0
+    error_rate: float = 0.0
+    error_status_codes: tuple[int, ...] = (500, 502, 503)
+    # Lifetime announced by /auth, and fraction of calls where the bank revokes
+    # the presented token (401), forcing the connector to fetch a new one
+    token_ttl_seconds: float = 300.0
+    token_expiry_rate: float = 0.0
+    # Bank quota: token bucket of rate_limit_burst calls refilled at
+    # rate_limit_per_second; calls over it get 429 with Retry-After. 0 disables it.
+    rate_limit_per_second: float = 0.0
+    rate_limit_burst: int = 1
+    seed: int = 0
 
+    def __post_init__(self) -> None:
+        if self.latency not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"Unsupported latency distribution {self.latency!r}; expected one of {', '.join(LATENCY_DISTRIBUTIONS)}"
+            )
+
+    @classmethod
+    def from_profile(cls, name: str, seed: int = 0) -> "MockBancoComercioBehaviour":
+        try:
+            return replace(BEHAVIOUR_PROFILES[name.lower()], seed=seed)
+        except KeyError:
+            raise ValueError(f"Unknown mock bank profile: {name}") from None
+
+    @classmethod
+    def from_settings(cls) -> "MockBancoComercioBehaviour":
+        return cls.from_profile(settings.mock_bank_profile, seed=settings.mock_bank_seed)
 
-class MockBancoComercioConnector(BancoComercioConnector):
-    """Simulates Banco de Comercio connector for local and automated tests."""
+
+BEHAVIOUR_PROFILES: Dict[str, MockBancoComercioBehaviour] = {
+    "instant": MockBancoComercioBehaviour(),
+    "typical": MockBancoComercioBehaviour(latency="normal", latency_ms=120.0, latency_stddev_ms=30.0, auth_latency_ms=80.0),
+    "long_tail": MockBancoComercioBehaviour(
+        latency="pareto", latency_ms=60.0, pareto_alpha=1.5, latency_max_ms=10_000.0, auth_latency_ms=80.0
+    ),
+    "flaky": MockBancoComercioBehaviour(
+        latency="normal",
+        latency_ms=150.0,
+        latency_stddev_ms=50.0,
+        auth_latency_ms=80.0,
+        timeout_rate=0.02,
+        timeout_ms=2000.0,
+        error_rate=0.05,
+        token_expiry_rate=0.01,
+    ),
+    "rate_limited": MockBancoComercioBehaviour(
+        latency="fixed", latency_ms=50.0, rate_limit_per_second=100.0, rate_limit_burst=20
+    ),
+}
+
+
+class SimulatedBank:
+    """In-memory Banco de Comercio answering `/auth` and `/movements/transfer-request`.
+
+    Served through an httpx.MockTransport, so the connector's own request path
+    (signature, token cache, 401 handling, raise_for_status, JSON parsing) runs
+    unchanged. The random draws of a transfer call come from a generator seeded
+    with (seed, originId, attempt), so outcomes do not depend on how concurrent
+    calls interleave; only the quota depends on `clock`. Attempt counts are kept
+    for the `max_tracked_origins` most recently seen originIds; an evicted one
+    starts over at attempt 0.
+    """
 
     def __init__(
         self,
-        behaviour: Optional[MockBancoComercioBehaviour] = None,
+        behaviour: MockBancoComercioBehaviour,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+        max_tracked_origins: int = 100_000,
     ) -> None:
-        self.behaviour = behaviour or MockBancoComercioBehaviour()
+        self.behaviour = behaviour
+        self.clock = clock
+        self.sleep = sleep
+        self.max_tracked_origins = max_tracked_origins
+        self._rng = random.Random(behaviour.seed)
+        self._attempts: OrderedDict[str, int] = OrderedDict()
+        self._tokens: Dict[str, float] = {}
+        self._quota = float(behaviour.rate_limit_burst)
+        self._quota_at = clock()
+        self.counters = {
+            "transfers": 0,
+            "timeouts": 0,
+            "errors": 0,
+            "rate_limited": 0,
+            "unauthorized": 0,
+            "tokens_issued": 0,
+        }
 
-    async def build_request(self, data: PaymentData) -> Dict[str, Any]:
-        request = await super().build_request(data)
-        if not request.get("originId"):
-            request["originId"] = data.origin_id or uuid4().hex
-        return request
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path.endswith(BancoComercioConnector.auth_path):
+            return await self._auth()
+        if path.endswith(BancoComercioConnector.transfer_path):
+            return await self._transfer(request)
+        return httpx.Response(404, json={"message": f"Unknown path {path}"})
+
+    async def _auth(self) -> httpx.Response:
+        await self._wait(self.behaviour.auth_latency_ms)
+        now = self.clock()
+        self._tokens = {value: expires for value, expires in self._tokens.items() if expires > now}
+        self.counters["tokens_issued"] += 1
+        value = f"mock-token-{self.counters['tokens_issued']}"
+        self._tokens[value] = now + self.behaviour.token_ttl_seconds
+        return httpx.Response(
+            200, json={"data": {"accessToken": value, "expiresIn": self.behaviour.token_ttl_seconds}}
+        )
+
+    async def _transfer(self, request: httpx.Request) -> httpx.Response:
+        behaviour = self.behaviour
+        self.counters["transfers"] += 1
+        wait = self._take_quota()
+        if wait:
+            self.counters["rate_limited"] += 1
+            return httpx.Response(
+                429, headers={"Retry-After": str(math.ceil(wait))}, json={"message": "Quota exceeded"}
+            )
+
+        payload = json.loads(request.content)
+        rng = self._rng_for(payload.get("originId"))
+        token = request.headers.get("Authorization", "")[len("Bearer "):]
+        expires = self._tokens.get(token)
+        if expires is None or expires <= self.clock() or rng.random() < behaviour.token_expiry_rate:
+            self._tokens.pop(token, None)
+            self.counters["unauthorized"] += 1
+            return httpx.Response(401, json={"message": "Token expired"})
+
+        draw = rng.random()
+        if draw < behaviour.timeout_rate:
+            self.counters["timeouts"] += 1
+            await self._wait(behaviour.timeout_ms)
+            raise httpx.ReadTimeout("Simulated bank timeout", request=request)
+        await self._wait(self._latency_ms(rng))
+        if draw < behaviour.timeout_rate + behaviour.error_rate:
+            self.counters["errors"] += 1
+            return httpx.Response(rng.choice(behaviour.error_status_codes), json={"message": "Simulated bank error"})
+        return httpx.Response(200, json=self._transfer_result(payload))
 
-    async def execute_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        body = request.get("body", {})
+    def _transfer_result(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        behaviour = self.behaviour
+        body = payload.get("body", {})
         concept = str(body.get("concept", ""))
         amount = Decimal(str(body.get("amount", "0")))
 
-        should_fail = concept.upper() in self.behaviour.failure_concepts
-        if self.behaviour.failure_amount_threshold is not None:
-            should_fail = should_fail or amount > self.behaviour.failure_amount_threshold
+        should_fail = concept.upper() in behaviour.failure_concepts
+        if behaviour.failure_amount_threshold is not None:
+            should_fail = should_fail or amount > behaviour.failure_amount_threshold
 
-        status_code = self.behaviour.failure_status_code if should_fail else self.behaviour.success_status_code
+        status_code = behaviour.failure_status_code if should_fail else behaviour.success_status_code
         message = "Simulated transfer rejected" if should_fail else "Simulated transfer accepted"
 
         simulated_response = {
             "statusCode": status_code,
             "message": message,
-            "dest_ori_trx_id": request.get("originId"),
+            "dest_ori_trx_id": payload.get("originId"),
             "data": {
-                "request": request,
-                "originId": request.get("originId"),
+                "request": payload,
+                "originId": payload.get("originId"),
                 "concept": concept,
             },
         }
@@ -65,6 +211,72 @@ class MockBancoComercioConnector(BancoComercioConnector):
 
         return simulated_response
 
+    def _rng_for(self, origin_id: Optional[str]) -> random.Random:
+        if not origin_id:
+            return self._rng
+        attempt = self._attempts.pop(origin_id, 0)
+        self._attempts[origin_id] = attempt + 1
+        if len(self._attempts) > self.max_tracked_origins:
+            self._attempts.popitem(last=False)
+        return random.Random(f"{self.behaviour.seed}:{origin_id}:{attempt}")
+
+    def _latency_ms(self, rng: random.Random) -> float:
+        behaviour = self.behaviour
+        if behaviour.latency == "fixed":
+            value = behaviour.latency_ms
+        elif behaviour.latency == "normal":
+            value = max(0.0, rng.gauss(behaviour.latency_ms, behaviour.latency_stddev_ms))
+        elif behaviour.latency == "pareto":
+            value = behaviour.latency_ms * rng.paretovariate(behaviour.pareto_alpha)
+        else:
+            return 0.0
+        return min(value, behaviour.latency_max_ms)
+
+    def _take_quota(self) -> float:
+        """0 when the call fits the quota, else seconds until the bucket has room."""
+        rate = self.behaviour.rate_limit_per_second
+        if rate <= 0:
+            return 0.0
+        now = self.clock()
+        self._quota = min(float(self.behaviour.rate_limit_burst), self._quota + (now - self._quota_at) * rate)
+        self._quota_at = now
+        if self._quota >= 1:
+            self._quota -= 1
+            return 0.0
+        return (1 - self._quota) / rate
+
+    async def _wait(self, millis: float) -> None:
+        if millis > 0:
+            await self.sleep(millis / 1000)
+
+
+class MockBancoComercioConnector(BancoComercioConnector):
+    """Simulates Banco de Comercio connector for local and automated tests."""
+
+    name = "mock"
+
+    def __init__(
+        self,
+        behaviour: Optional[MockBancoComercioBehaviour] = None,
+        bank: Optional[SimulatedBank] = None,
+    ) -> None:
+        self.behaviour = behaviour or (bank.behaviour if bank is not None else MockBancoComercioBehaviour())
+        self.bank = bank or SimulatedBank(self.behaviour)
+        # Own token cache: simulated tokens must never reach the shared token store
+        super().__init__(
+            transport=httpx.MockTransport(self.bank),
+            token_cache=TokenCache(self._fetch_token, key="bdc:mock_access_token"),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "bank": dict(self.bank.counters)}
+
+    async def build_request(self, data: PaymentData) -> Dict[str, Any]:
+        request = await super().build_request(data)
+        if not request.get("originId"):
+            request["originId"] = data.origin_id or uuid4().hex
+        return request
+
     async def handle_response(self, response: Dict[str, Any]) -> ConnectorResponse:
         status_code = response.get("statusCode")
         status = PaymentState.AUTHORIZED if status_code == self.behaviour.success_status_code else PaymentState.FAILED
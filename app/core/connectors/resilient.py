@@ -0,0 +1,280 @@
+"""Circuit breaker and adaptive concurrency limit around a provider connector."""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from app.core.connectors.interface import ConnectorIntegration, ConnectorUnavailable
+from app.core.payments.retry import is_retryable
+from app.core.payments.types import ConnectorResponse, PaymentData
+from config.settings import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(ConnectorUnavailable):
+    """The provider is failing or too slow; calls are refused until the breaker half-opens."""
+
+
+class ConnectorOverloaded(ConnectorUnavailable):
+    """Every slot of the adaptive concurrency limit stayed busy for the whole wait."""
+
+
+class CircuitBreaker:
+    """Count-based breaker over the last `window` calls.
+
+    Opens when at least `min_calls` outcomes are recorded and either the failure rate
+    (transient errors only; a 4xx is a healthy answer) or the rate of calls slower than
+    `slow_call_seconds` reaches its threshold. After `open_seconds` it lets
+    `half_open_calls` probes through: all of them succeeding closes it again, any
+    failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        slow_call_rate: float = 0.8,
+        slow_call_seconds: float = 5.0,
+        window: int = 20,
+        min_calls: int = 10,
+        open_seconds: float = 30.0,
+        half_open_calls: int = 3,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_rate = failure_rate
+        self.slow_call_rate = slow_call_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.clock = clock
+        self.state = CLOSED
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        self.rejected = 0
+        self.opened = 0
+
+    def acquire(self) -> None:
+        """Admit a call or raise CircuitOpenError; every admitted call must be released."""
+        if self.state == OPEN:
+            remaining = self._opened_at + self.open_seconds - self.clock()
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError("Connector circuit is open", retry_after=remaining)
+            self.state = HALF_OPEN
+            self._probes = 0
+            self._probe_successes = 0
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_calls:
+                self.rejected += 1
+                raise CircuitOpenError("Connector circuit is half-open", retry_after=1.0)
+            self._probes += 1
+
+    def release(self, failed: Optional[bool], elapsed: float = 0.0) -> None:
+        """Record the outcome of an admitted call; None (cancelled, never sent) only frees the slot."""
+        slow = elapsed > self.slow_call_seconds
+        if self.state == HALF_OPEN:
+            # Calls admitted before the breaker opened may finish during the probe
+            self._probes = max(0, self._probes - 1)
+            if failed is None:
+                return
+            if failed or slow:
+                self._open()
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_calls:
+                self.state = CLOSED
+                self._outcomes.clear()
+            return
+        if failed is None or self.state == OPEN:
+            return
+        self._outcomes.append((failed, slow))
+        if len(self._outcomes) < self.min_calls:
+            return
+        failures = sum(1 for failed, _ in self._outcomes if failed)
+        slow_calls = sum(1 for _, slow in self._outcomes if slow)
+        if failures >= self.failure_rate * len(self._outcomes) or slow_calls >= self.slow_call_rate * len(
+            self._outcomes
+        ):
+            self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self._opened_at = self.clock()
+        self._outcomes.clear()
+        self.opened += 1
+
+    def stats(self) -> Dict[str, Any]:
+        failures = sum(1 for failed, _ in self._outcomes if failed)
+        slow_calls = sum(1 for _, slow in self._outcomes if slow)
+        return {
+            "state": self.state,
+            "window_calls": len(self._outcomes),
+            "window_failures": failures,
+            "window_slow_calls": slow_calls,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit: grows by about one slot per `limit` healthy calls and
+    shrinks by `backoff` on every transient failure or call slower than `latency_target`.
+
+    It only grows while at least half of the slots are in use, so a quiet period does
+    not inflate it. Callers over the limit wait up to `max_wait` seconds for a slot.
+    """
+
+    def __init__(
+        self,
+        initial: int = 20,
+        min_limit: int = 2,
+        max_limit: int = 200,
+        latency_target: float = 5.0,
+        backoff: float = 0.9,
+        max_wait: float = 1.0,
+    ) -> None:
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.rejected = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> None:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.max_wait)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                return
+            self.rejected += 1
+            raise ConnectorOverloaded("Connector concurrency limit reached", retry_after=self.max_wait) from None
+        except BaseException:
+            # Cancelled right after release() handed this waiter a slot
+            if waiter.done() and not waiter.cancelled():
+                self.release(None)
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self, failed: Optional[bool], elapsed: float = 0.0) -> None:
+        self.in_flight -= 1
+        if failed is not None:
+            if failed or elapsed > self.latency_target:
+                self.limit = max(float(self.min_limit), self.limit * self.backoff)
+            elif (self.in_flight + 1) * 2 >= self.limit:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot passes to the waiter directly, so newcomers cannot jump the queue
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": math.floor(self.limit),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "rejected": self.rejected,
+        }
+
+
+class ResilientConnector(ConnectorIntegration):
+    """Wraps a connector so a slow or failing provider makes callers fail fast.
+
+    Only execute_request (the call to the provider) goes through the breaker and the
+    limiter; request building and response mapping are delegated unchanged.
+    """
+
+    def __init__(
+        self,
+        inner: ConnectorIntegration,
+        breaker: Optional[CircuitBreaker] = None,
+        limiter: Optional[AdaptiveLimiter] = None,
+    ) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.breaker = breaker or CircuitBreaker()
+        self.limiter = limiter or AdaptiveLimiter()
+
+    async def build_request(self, data: PaymentData) -> Dict[str, Any]:
+        return await self.inner.build_request(data)
+
+    async def execute_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        self.breaker.acquire()
+        try:
+            await self.limiter.acquire()
+        except BaseException:
+            self.breaker.release(None)
+            raise
+        started = time.monotonic()
+        failed: Optional[bool] = None
+        try:
+            response = await self.inner.execute_request(request)
+            failed = False
+            return response
+        except Exception as exc:
+            failed = is_retryable(exc)
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            self.limiter.release(failed, elapsed)
+            self.breaker.release(failed, elapsed)
+
+    async def handle_response(self, response: Dict[str, Any]) -> ConnectorResponse:
+        return await self.inner.handle_response(response)
+
+    async def startup(self) -> None:
+        await self.inner.startup()
+
+    async def shutdown(self) -> None:
+        await self.inner.shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.inner.stats(),
+            "circuit_breaker": self.breaker.stats(),
+            "concurrency_limit": self.limiter.stats(),
+        }
+
+
+def build_resilient_connector(inner: ConnectorIntegration) -> ConnectorIntegration:
+    if not settings.connector_resilience_enabled:
+        return inner
+    return ResilientConnector(
+        inner,
+        breaker=CircuitBreaker(
+            failure_rate=settings.connector_breaker_failure_rate,
+            slow_call_rate=settings.connector_breaker_slow_call_rate,
+            slow_call_seconds=settings.connector_slow_call_seconds,
+            window=settings.connector_breaker_window,
+            min_calls=settings.connector_breaker_min_calls,
+            open_seconds=settings.connector_breaker_open_seconds,
+            half_open_calls=settings.connector_breaker_half_open_calls,
+        ),
+        limiter=AdaptiveLimiter(
+            initial=settings.connector_limit_initial,
+            min_limit=settings.connector_limit_min,
+            max_limit=settings.connector_limit_max,
+            latency_target=settings.connector_slow_call_seconds,
+            max_wait=settings.connector_limit_max_wait,
+        ),
+    )
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+from uuid import uuid4
+
+from config.settings import settings
+
+
+@dataclass(frozen=True)
+class AccessToken:
+    value: str
+    expires_at: float
+    issued_at: float = field(default_factory=time.time)
+
+    def remaining(self, now: Optional[float] = None) -> float:
+        return self.expires_at - (time.time() if now is None else now)
+
+    def refresh_margin(self, margin: float) -> float:
+        """`margin`, capped at half the token's lifetime so short-lived tokens are still reused."""
+        return min(margin, (self.expires_at - self.issued_at) / 2)
+
+    def to_json(self) -> str:
+        return json.dumps({"value": self.value, "expires_at": self.expires_at, "issued_at": self.issued_at})
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "AccessToken":
+        data = json.loads(raw)
+        issued_at = data.get("issued_at")
+        return cls(
+            value=data["value"],
+            expires_at=float(data["expires_at"]),
+            issued_at=time.time() if issued_at is None else float(issued_at),
+        )
+
+
+def parse_token_expiry(token: str, expires_in: Any = None, default_ttl: Optional[float] = None) -> float:
+    """Absolute expiry (epoch seconds) from an explicit `expiresIn` or the JWT `exp` claim."""
+    if expires_in is not None:
+        try:
+            return time.time() + float(expires_in)
+        except (TypeError, ValueError):
+            pass
+
+    parts = token.split(".")
+    if len(parts) == 3:
+        try:
+            segment = parts[1] + "=" * (-len(parts[1]) % 4)
+            claims = json.loads(base64.urlsafe_b64decode(segment))
+            if "exp" in claims:
+                return float(claims["exp"])
+        except (ValueError, TypeError):
+            pass
+
+    ttl = settings.bdc_token_default_ttl if default_ttl is None else default_ttl
+    return time.time() + ttl
+
+
+class TokenStore(ABC):
+    """Backend shared between workers so only one of them calls the provider's auth endpoint."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[AccessToken]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, token: AccessToken) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, key: str, value: str) -> None:
+        """Delete the stored token only if it still holds `value`."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def acquire_lock(self, key: str, owner: str, ttl: float) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def release_lock(self, key: str, owner: str) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryTokenStore(TokenStore):
+    """Local stand-in for the shared store (single process, tests, development)."""
+
+    def __init__(self) -> None:
+        self._tokens: Dict[str, AccessToken] = {}
+        self._locks: Dict[str, tuple[str, float]] = {}
+
+    async def get(self, key: str) -> Optional[AccessToken]:
+        token = self._tokens.get(key)
+        if token is not None and token.remaining() <= 0:
+            self._tokens.pop(key, None)
+            return None
+        return token
+
+    async def set(self, key: str, token: AccessToken) -> None:
+        self._tokens[key] = token
+
+    async def delete(self, key: str, value: str) -> None:
+        token = self._tokens.get(key)
+        if token is not None and token.value == value:
+            del self._tokens[key]
+
+    async def acquire_lock(self, key: str, owner: str, ttl: float) -> bool:
+        current = self._locks.get(key)
+        now = time.monotonic()
+        if current is not None and current[1] > now:
+            return False
+        self._locks[key] = (owner, now + ttl)
+        return True
+
+    async def release_lock(self, key: str, owner: str) -> None:
+        current = self._locks.get(key)
+        if current is not None and current[0] == owner:
+            del self._locks[key]
+
+
+class RedisTokenStore(TokenStore):
+    _COMPARE_AND_DELETE = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+    )
+
+    def __init__(self, url: str) -> None:
+        import redis.asyncio as aioredis
+
+        self._redis = aioredis.Redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[AccessToken]:
+        raw = await self._redis.get(key)
+        return AccessToken.from_json(raw) if raw else None
+
+    async def set(self, key: str, token: AccessToken) -> None:
+        ttl_ms = int(token.remaining() * 1000)
+        if ttl_ms > 0:
+            await self._redis.set(key, token.to_json(), px=ttl_ms)
+
+    async def delete(self, key: str, value: str) -> None:
+        token = await self.get(key)
+        if token is not None and token.value == value:
+            await self._redis.eval(self._COMPARE_AND_DELETE, 1, key, token.to_json())
+
+    async def acquire_lock(self, key: str, owner: str, ttl: float) -> bool:
+        return bool(await self._redis.set(key, owner, nx=True, px=int(ttl * 1000)))
+
+    async def release_lock(self, key: str, owner: str) -> None:
+        await self._redis.eval(self._COMPARE_AND_DELETE, 1, key, owner)
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+_local_store = InMemoryTokenStore()
+
+
+def build_token_store(backend: Optional[str] = None) -> Optional[TokenStore]:
+    backend = (backend or settings.bdc_token_store).lower()
+    if backend in {"", "none"}:
+        return None
+    if backend == "memory":
+        return _local_store
+    if backend == "redis":
+        return RedisTokenStore(settings.REDIS_URL)
+    raise ValueError(f"Unsupported token store backend: {backend}")
+
+
+class TokenCache:
+    """Caches an access token, refreshing it ahead of expiry with a single in-flight fetch."""
+
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[AccessToken]],
+        store: Optional[TokenStore] = None,
+        key: str = "bdc:access_token",
+        refresh_margin: Optional[float] = None,
+        lock_ttl: float = 10.0,
+    ) -> None:
+        self._fetch = fetch
+        self._store = store
+        self._key = key
+        self._lock_key = f"{key}:refresh"
+        self._refresh_margin = settings.bdc_token_refresh_margin if refresh_margin is None else refresh_margin
+        self._lock_ttl = lock_ttl
+        self._token: Optional[AccessToken] = None
+        self._refresh_task: Optional[asyncio.Task[AccessToken]] = None
+        self._hits = 0
+        self._fetches = 0
+        self._invalidations = 0
+
+    async def get_token(self) -> str:
+        token = self._token
+        if token is not None:
+            remaining = token.remaining()
+            if remaining > token.refresh_margin(self._refresh_margin):
+                self._hits += 1
+                return token.value
+            if remaining > 0:
+                # Still usable: serve it and refresh in the background
+                self._hits += 1
+                self._start_refresh()
+                return token.value
+
+        token = await asyncio.shield(self._start_refresh())
+        return token.value
+
+    async def invalidate(self, value: str) -> None:
+        """Drop `value` after the provider rejected it; a newer token is left untouched."""
+        if self._token is not None and self._token.value == value:
+            self._token = None
+            self._invalidations += 1
+        if self._store is not None:
+            await self._store.delete(self._key, value)
+
+    async def close(self) -> None:
+        task, self._refresh_task = self._refresh_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        if self._store is not None:
+            await self._store.close()
+
+    def stats(self) -> Dict[str, Any]:
+        token = self._token
+        return {
+            "cached": token is not None,
+            "expires_in": round(token.remaining(), 3) if token is not None else None,
+            "refreshing": self._refresh_task is not None and not self._refresh_task.done(),
+            "hits": self._hits,
+            "fetches": self._fetches,
+            "invalidations": self._invalidations,
+            "shared_store": type(self._store).__name__ if self._store is not None else None,
+        }
+
+    def _start_refresh(self) -> "asyncio.Task[AccessToken]":
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh())
+            self._refresh_task.add_done_callback(_consume_exception)
+        return self._refresh_task
+
+    async def _refresh(self) -> AccessToken:
+        token = await self._load_shared()
+        if token is None:
+            token = await self._refresh_shared() if self._store is not None else await self._fetch_new()
+        self._token = token
+        return token
+
+    async def _load_shared(self) -> Optional[AccessToken]:
+        if self._store is None:
+            return None
+        token = await self._store.get(self._key)
+        if (
+            token is not None
+            and token.remaining() > token.refresh_margin(self._refresh_margin)
+            and token != self._token
+        ):
+            return token
+        return None
+
+    async def _refresh_shared(self) -> AccessToken:
+        owner = uuid4().hex
+        if await self._store.acquire_lock(self._lock_key, owner, self._lock_ttl):
+            try:
+                token = await self._fetch_new()
+                await self._store.set(self._key, token)
+                return token
+            finally:
+                await self._store.release_lock(self._lock_key, owner)
+
+        # Another worker is refreshing; wait for it to publish rather than calling auth too
+        deadline = time.monotonic() + self._lock_ttl
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            token = await self._load_shared()
+            if token is not None:
+                return token
+        return await self._fetch_new()
+
+    async def _fetch_new(self) -> AccessToken:
+        self._fetches += 1
+        return await self._fetch()
+
+
+def _consume_exception(task: "asyncio.Task[Any]") -> None:
+    # Background refresh failures are surfaced to the next awaiting caller
+    if not task.cancelled():
+        task.exception()
@@ -0,0 +1,135 @@
+"""In-process latency histograms for payment stages, rendered as Prometheus text.
+
+Histograms are HDR-style: log-linear buckets with 2**SUB_BUCKET_BITS linear
+sub-buckets per power of two, so any recorded value is off by at most ~3% and
+recording is a few integer operations. Values are kept in microseconds.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterable, List, Tuple
+
+SUB_BUCKET_BITS = 5
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# 2**36 us is about 19 hours; anything longer is clamped
+_MAX_VALUE = (1 << 36) - 1
+_BUCKETS = _SUB_BUCKETS + (_MAX_VALUE.bit_length() - SUB_BUCKET_BITS) * _SUB_BUCKETS
+
+# Prometheus `le` boundaries in seconds
+EXPORT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+EXPORT_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+STAGE_METRIC = "gateway_payment_stage_duration_seconds"
+_LABELS = ("stage", "connector", "tenant", "outcome")
+
+
+def _bucket_index(value: int) -> int:
+    if value < _SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return _SUB_BUCKETS + shift * _SUB_BUCKETS + (value >> shift) - _SUB_BUCKETS
+
+
+def _bucket_bounds(index: int) -> Tuple[int, int]:
+    """Lowest and highest value (us) that land in `index`."""
+    if index < _SUB_BUCKETS:
+        return index, index
+    shift, sub = divmod(index - _SUB_BUCKETS, _SUB_BUCKETS)
+    lowest = (sub + _SUB_BUCKETS) << shift
+    return lowest, lowest + (1 << shift) - 1
+
+
+class LatencyHistogram:
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * _BUCKETS
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    def record(self, micros: int) -> None:
+        if micros > _MAX_VALUE:
+            micros = _MAX_VALUE
+        elif micros < 0:
+            micros = 0
+        self.counts[_bucket_index(micros)] += 1
+        self.count += 1
+        self.total_us += micros
+        if micros > self.max_us:
+            self.max_us = micros
+
+    def percentile(self, quantile: float) -> float:
+        """Value in seconds at `quantile` (0-1), reported as its bucket's upper bound."""
+        if not self.count:
+            return 0.0
+        rank = max(1, round(quantile * self.count))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(_bucket_bounds(index)[1], self.max_us) / 1e6
+        return self.max_us / 1e6
+
+    def cumulative(self, boundaries: Iterable[float]) -> List[int]:
+        """Counts of values <= each boundary (seconds), by bucket upper bound."""
+        result: List[int] = []
+        index = seen = 0
+        for boundary in boundaries:
+            limit = boundary * 1e6
+            while index < _BUCKETS and _bucket_bounds(index)[1] <= limit:
+                seen += self.counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+
+class StageMetrics:
+    """Latency per (stage, connector, tenant, outcome).
+
+    `tenant_of` supplies the tenant label; the API and the worker point it at the
+    current-tenant context of the database layer, which core code does not import.
+    """
+
+    def __init__(self, tenant_of: Callable[[], str] = lambda: "public") -> None:
+        self.tenant_of = tenant_of
+        self.histograms: Dict[Tuple[str, str, str, str], LatencyHistogram] = {}
+
+    def observe(self, stage: str, connector: str, outcome: str, nanos: int) -> None:
+        key = (stage, connector, self.tenant_of(), outcome)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram()
+        histogram.record(nanos // 1000)
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {STAGE_METRIC} Time spent in each stage of a payment operation.",
+            f"# TYPE {STAGE_METRIC} histogram",
+        ]
+        quantile_lines = [
+            f"# HELP {STAGE_METRIC}_quantile Stage latency quantiles since process start.",
+            f"# TYPE {STAGE_METRIC}_quantile gauge",
+        ]
+        for key in sorted(self.histograms):
+            histogram = self.histograms[key]
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(_LABELS, key))
+            for boundary, count in zip(EXPORT_BUCKETS, histogram.cumulative(EXPORT_BUCKETS)):
+                lines.append(f'{STAGE_METRIC}_bucket{{{labels},le="{boundary:g}"}} {count}')
+            lines.append(f'{STAGE_METRIC}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"{STAGE_METRIC}_sum{{{labels}}} {histogram.total_us / 1e6:.6f}")
+            lines.append(f"{STAGE_METRIC}_count{{{labels}}} {histogram.count}")
+            for quantile in EXPORT_QUANTILES:
+                quantile_lines.append(
+                    f'{STAGE_METRIC}_quantile{{{labels},quantile="{quantile:g}"}} {histogram.percentile(quantile):.6f}'
+                )
+        return "\n".join(lines + quantile_lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+stage_metrics = StageMetrics()
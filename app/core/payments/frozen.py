@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, NoReturn
+
+
+class FrozenDict(dict):
+    """Read-only dict used for metadata snapshots shared between repositories and requests.
+
+    It stays a `dict` subclass so pydantic, FastAPI and the JSONB serializer handle it
+    unchanged, while copy/deepcopy return the same instance instead of cloning it.
+    """
+
+    __slots__ = ()
+
+    def _immutable(self, *args: Any, **kwargs: Any) -> NoReturn:
+        raise TypeError("FrozenDict is immutable; build a new mapping instead")
+
+    __setitem__ = _immutable
+    __delitem__ = _immutable
+    __ior__ = _immutable
+    clear = _immutable
+    pop = _immutable
+    popitem = _immutable
+    setdefault = _immutable
+    update = _immutable
+
+    def __copy__(self) -> "FrozenDict":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "FrozenDict":
+        return self
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+    def __repr__(self) -> str:
+        return f"FrozenDict({dict.__repr__(self)})"
+
+
+EMPTY = FrozenDict()
+
+
+def freeze(value: Any) -> Any:
+    """Recursively convert dicts/lists to FrozenDict/tuples; frozen input is returned as is."""
+    if isinstance(value, FrozenDict):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        items = tuple(freeze(item) for item in value)
+        if isinstance(value, tuple) and all(new is old for new, old in zip(items, value)):
+            return value
+        return items
+    return value
+
+
+def _frozen_object(pairs: Dict[str, Any]) -> FrozenDict:
+    # Nested objects are already frozen by the time their parent is decoded; only arrays remain
+    return FrozenDict((key, freeze(item) if isinstance(item, list) else item) for key, item in pairs.items())
+
+
+def frozen_json_loads(raw: str | bytes) -> Any:
+    """json.loads that builds frozen containers directly, so decoded JSONB needs no extra copy."""
+    return freeze(json.loads(raw, object_hook=_frozen_object))
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from uuid import uuid4
+
+from app.ports.idempotency_store import COMPLETED, IN_PROGRESS, IdempotencyRecord, IdempotencyStore
+
+
+class IdempotencyError(Exception):
+    pass
+
+
+class IdempotencyKeyReused(IdempotencyError):
+    """The key was already used with a different request body."""
+
+
+class IdempotencyInProgress(IdempotencyError):
+    """Another worker is still executing the key and did not finish in time."""
+
+
+def request_fingerprint(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode()).hexdigest()
+
+
+@dataclass
+class _InFlight:
+    fingerprint: str
+    future: asyncio.Future
+
+
+class IdempotencyGuard:
+    """Runs each idempotency key once and replays its stored result for later duplicates.
+
+    Duplicates inside this process wait on the in-flight execution (single-flight);
+    duplicates in other processes see the store's in-progress claim and poll it
+    until the result is stored. Failed executions release the key so a retry can
+    run again; only successful results are kept, for `ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        store: IdempotencyStore,
+        ttl: float = 86400.0,
+        lock_ttl: float = 60.0,
+        wait_timeout: float = 30.0,
+        poll_interval: float = 0.05,
+    ) -> None:
+        self.store = store
+        self.ttl = ttl
+        # Longer than the slowest execution, or a crashed worker's claim would block retries for too long
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._in_flight: Dict[str, _InFlight] = {}
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        execute: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Return (result, replayed); `execute` runs at most once per key across workers."""
+        while True:
+            in_flight = self._in_flight.get(key)
+            if in_flight is None:
+                break
+            if in_flight.fingerprint != fingerprint:
+                raise IdempotencyKeyReused(key)
+            try:
+                return await asyncio.shield(in_flight.future), True
+            except asyncio.CancelledError:
+                if not in_flight.future.cancelled():
+                    raise
+                # The leading request was cancelled; take over the key
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = _InFlight(fingerprint, future)
+        try:
+            result, replayed = await self._run_claimed(key, fingerprint, execute)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Marks the exception as retrieved when no duplicate was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, replayed
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def _run_claimed(
+        self,
+        key: str,
+        fingerprint: str,
+        execute: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Tuple[Dict[str, Any], bool]:
+        owner = uuid4().hex
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            record = await self.store.get(key)
+            if record is not None:
+                if record.fingerprint != fingerprint:
+                    raise IdempotencyKeyReused(key)
+                if record.state == COMPLETED and record.response is not None:
+                    return record.response, True
+                if time.monotonic() >= deadline:
+                    raise IdempotencyInProgress(key)
+                await asyncio.sleep(self.poll_interval)
+                continue
+            if await self.store.claim(key, IdempotencyRecord(IN_PROGRESS, fingerprint, owner), self.lock_ttl):
+                break
+
+        try:
+            result = await execute()
+        except BaseException:
+            await asyncio.shield(self.store.release(key, owner))
+            raise
+        await self.store.complete(key, IdempotencyRecord(COMPLETED, fingerprint, owner, result), self.ttl)
+        return result, False
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._in_flight)}
@@ -1,16 +1,29 @@
-from uuid import uuid4
+import asyncio
+from time import perf_counter_ns
+from uuid import UUID, uuid4
 
-from typing import Optional
+from typing import Awaitable, Dict, List, Optional, Sequence, Tuple, TypeVar, Union
+from app.core.metrics import StageMetrics, stage_metrics
+from app.core.payments.frozen import freeze
+from app.core.payments.retry import RetryPolicy, describe_failure, is_retryable
 from app.core.payments.types import PaymentData, PaymentState, ConnectorResponse
-from app.core.connectors.interface import ConnectorIntegration
-from app.ports.transfer_repository import TransferRepository
+from app.core.connectors.interface import ConnectorIntegration, ConnectorUnavailable
+from app.ports.transfer_repository import DuplicateOriginId, TransferRepository
 # from app.core.kyc.service import KYCService # TODO: Import when implemented
 
+T = TypeVar("T")
+
 class PaymentOperation:
-    def __init__(self, transfer_repository: Optional[TransferRepository] = None, kyc_service=None): 
+    def __init__(
+        self,
+        transfer_repository: Optional[TransferRepository] = None,
+        kyc_service=None,
+        metrics: Optional[StageMetrics] = None,
+    ):
         # In a real DI scenario, we'd inject repositories and services here
         self.kyc_service = kyc_service
         self.transfer_repository = transfer_repository
+        self.metrics = stage_metrics if metrics is None else metrics
 
     async def validate_request(self, data: PaymentData) -> bool:
         # Basic validation
@@ -35,34 +48,196 @@ class PaymentOperation:
         return data
 
     async def call_connector(self, connector: ConnectorIntegration, data: PaymentData) -> ConnectorResponse:
-        request = await connector.build_request(data)
-        raw_response = await connector.execute_request(request)
-        response = await connector.handle_response(raw_response)
+        request = await self._timed("build_request", connector.name, connector.build_request(data))
+        raw_response = await self._timed("execute_request", connector.name, connector.execute_request(request))
+        response = await self._timed("handle_response", connector.name, connector.handle_response(raw_response))
         return response
 
-    async def update_tracker(self, data: PaymentData, new_state: PaymentState) -> PaymentData:
+    async def update_tracker(self, data: PaymentData, new_state: PaymentState, dispatch: bool = False) -> PaymentData:
         data.status = new_state
         if self.transfer_repository:
-            await self.transfer_repository.save(data)
+            await self.transfer_repository.save(data, dispatch=dispatch)
         return data
 
     async def process(self, data: PaymentData, connector: ConnectorIntegration) -> PaymentData:
-        await self.validate_request(data)
-        
-        data = await self.domain_logic(data)
+        started = perf_counter_ns()
+        outcome = "error"
+        try:
+            data = await self._prepare(data, connector.name)
+            if data.status != PaymentState.REQUIRES_KYC:
+                data = await self.dispatch(data, connector)
+            outcome = data.status.value.lower()
+            return data
+        finally:
+            self.metrics.observe("process", connector.name, outcome, perf_counter_ns() - started)
+
+    async def accept(self, data: PaymentData) -> PaymentData:
+        """Validate and persist as CREATED plus an outbox row; the worker calls the bank later."""
+        data = await self._prepare(data)
+        if data.status == PaymentState.REQUIRES_KYC:
+            return data
+        return await self.update_tracker(data, PaymentState.CREATED, dispatch=True)
+
+    async def defer(self, data: PaymentData, error: str, delay: float) -> PaymentData:
+        """Keep a transfer whose bank call failed transiently; the worker retries it after `delay` seconds.
+
+        The origin_id is already assigned and persisted, so the retry reaches the bank
+        with the same id and the bank can deduplicate it.
+        """
+        data = await self.update_tracker(data, PaymentState.CREATED, dispatch=True)
+        if self.transfer_repository:
+            await self.transfer_repository.schedule_retry(data.payment_id, delay, error)
+        return data
+
+    async def fail(self, data: PaymentData, error: str) -> PaymentData:
+        data.metadata["error_message"] = error
+        return await self.update_tracker(data, PaymentState.FAILED)
+
+    async def _prepare(
+        self,
+        data: PaymentData,
+        connector_name: str = "none",
+        taken: Optional[Dict[str, UUID]] = None,
+    ) -> PaymentData:
+        await self._timed("validate_request", connector_name, self.validate_request(data))
+
+        data = await self._timed("domain_logic", connector_name, self.domain_logic(data))
         if data.status == PaymentState.REQUIRES_KYC:
             return await self.update_tracker(data, PaymentState.REQUIRES_KYC)
 
         if not data.origin_id:
             data.origin_id = uuid4().hex
+        elif self.transfer_repository:
+            # Rejected before the bank call: the bank would otherwise see the originId twice
+            if taken is None:
+                existing = await self.transfer_repository.get_by_origin_id(data.origin_id)
+                payment_id = existing.payment_id if existing is not None else None
+            else:
+                payment_id = taken.get(data.origin_id)
+            if payment_id is not None and payment_id != data.payment_id:
+                raise DuplicateOriginId(data.origin_id)
+        return data
 
+    async def dispatch(self, data: PaymentData, connector: ConnectorIntegration) -> PaymentData:
+        """Call the bank for a validated transfer and record the outcome."""
         response = await self.call_connector(connector, data)
+        self._record_response(data, response)
+        return await self._timed("update_tracker", connector.name, self.update_tracker(data, response.status))
+
+    async def _timed(self, stage: str, connector_name: str, step: Awaitable[T]) -> T:
+        started = perf_counter_ns()
+        outcome = "error"
+        try:
+            result = await step
+            outcome = "ok"
+            return result
+        finally:
+            self.metrics.observe(stage, connector_name, outcome, perf_counter_ns() - started)
 
-        data.metadata["connector_response"] = response.raw_response
+    async def process_many(
+        self,
+        items: Sequence[PaymentData],
+        connector: ConnectorIntegration,
+        concurrency: int,
+        retry_policy: Optional[RetryPolicy] = None,
+    ) -> List[Union[PaymentData, Exception]]:
+        """Batch variant of process: per item, the saved transfer or the error that rejected it.
+
+        Bank calls run concurrently, at most `concurrency` at a time, and the outcomes are
+        written with bulk saves. With a retry policy, transient failures are left CREATED
+        for the worker as in defer(); any other failure is recorded as FAILED.
+        """
+        results = await self._prepare_many(items, connector.name)
+        ready = [data for data in results if isinstance(data, PaymentData) and data.status != PaymentState.REQUIRES_KYC]
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call(data: PaymentData) -> Union[ConnectorResponse, Exception]:
+            async with semaphore:
+                try:
+                    return await self.call_connector(connector, data)
+                except Exception as exc:
+                    return exc
+
+        responses = await asyncio.gather(*(call(data) for data in ready))
+
+        settled: List[PaymentData] = []
+        deferred: List[Tuple[PaymentData, str, float]] = []
+        for data, response in zip(ready, responses):
+            if isinstance(response, ConnectorResponse):
+                self._record_response(data, response)
+                data.status = response.status
+                settled.append(data)
+            elif retry_policy is not None and is_retryable(response):
+                delay = retry_policy.delay(1)
+                if isinstance(response, ConnectorUnavailable):
+                    delay = max(delay, response.retry_after)
+                data.status = PaymentState.CREATED
+                deferred.append((data, describe_failure(response), delay))
+            else:
+                data.metadata["error_message"] = describe_failure(response)
+                data.status = PaymentState.FAILED
+                settled.append(data)
+
+        if not self.transfer_repository:
+            return results
+        saved = await self.transfer_repository.save_many(settled)
+        saved += await self.transfer_repository.save_many([data for data, _, _ in deferred], dispatch=True)
+        for data, error, delay in deferred:
+            await self.transfer_repository.schedule_retry(data.payment_id, delay, error)
+        return self._merge_saved(results, saved)
+
+    async def accept_many(self, items: Sequence[PaymentData]) -> List[Union[PaymentData, Exception]]:
+        """Batch variant of accept: valid items are saved CREATED with their outbox rows in bulk."""
+        results = await self._prepare_many(items)
+        ready = [data for data in results if isinstance(data, PaymentData) and data.status != PaymentState.REQUIRES_KYC]
+        for data in ready:
+            data.status = PaymentState.CREATED
+        if not self.transfer_repository:
+            return results
+        return self._merge_saved(results, await self.transfer_repository.save_many(ready, dispatch=True))
+
+    async def _prepare_many(
+        self,
+        items: Sequence[PaymentData],
+        connector_name: str = "none",
+    ) -> List[Union[PaymentData, Exception]]:
+        # Every item is validated before any of them is saved or sent
+        results: List[Union[PaymentData, Exception]] = []
+        taken = None
+        if self.transfer_repository:
+            # One lookup for the whole batch instead of one per item
+            taken = await self.transfer_repository.get_payment_ids_by_origin_ids(
+                list(dict.fromkeys(data.origin_id for data in items if data.origin_id))
+            )
+        origin_ids = set()
+        for data in items:
+            if data.origin_id and data.origin_id in origin_ids:
+                results.append(ValueError(f"Duplicate originId in batch: {data.origin_id}"))
+                continue
+            try:
+                results.append(await self._prepare(data, connector_name, taken))
+            except ValueError as exc:
+                results.append(exc)
+                continue
+            origin_ids.add(data.origin_id)
+        return results
+
+    def _merge_saved(
+        self,
+        results: List[Union[PaymentData, Exception]],
+        saved: List[PaymentData],
+    ) -> List[Union[PaymentData, Exception]]:
+        by_payment_id = {data.payment_id: data for data in saved}
+        return [
+            by_payment_id.get(result.payment_id, result) if isinstance(result, PaymentData) else result
+            for result in results
+        ]
+
+    def _record_response(self, data: PaymentData, response: ConnectorResponse) -> None:
+        # Frozen once here so every later save and read shares the same snapshot
+        data.metadata["connector_response"] = freeze(response.raw_response)
         if response.provider_reference_id:
             data.metadata["provider_reference_id"] = response.provider_reference_id
         if response.error_message:
             data.metadata["error_message"] = response.error_message
-        
-        final_state = response.status
-        return await self.update_tracker(data, final_state)
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class TransferCursor:
+    """Keyset position in the (created_at DESC, id DESC) ordering of transfers."""
+
+    created_at: datetime
+    id: int
+
+    def encode(self) -> str:
+        raw = json.dumps({"c": self.created_at.isoformat(), "i": self.id}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, value: str) -> "TransferCursor":
+        try:
+            raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+            data = json.loads(raw)
+            return cls(created_at=datetime.fromisoformat(data["c"]), id=int(data["i"]))
+        except (ValueError, KeyError, TypeError) as exc:
+            raise InvalidCursor("Invalid pagination cursor") from exc
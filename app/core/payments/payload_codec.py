@@ -0,0 +1,169 @@
+"""Content-addressed encoding of transfer payloads.
+
+Large JSON sub-documents (the client request, the connector response and the
+request it echoes) are replaced by ``{"$blob": "<sha256>"}`` references and kept
+once per distinct content. Hashes are taken over canonical JSON, so the same
+document always maps to the same blob no matter how often it is saved.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Mapping, Optional, Set, Tuple
+
+from app.core.payments.frozen import FrozenDict, freeze, frozen_json_loads
+
+BLOB_REF_KEY = "$blob"
+BLOB_ENCODINGS = ("zstd", "gzip", "identity")
+
+
+@dataclass(frozen=True)
+class EncodedBlob:
+    hash: str
+    encoding: str
+    size: int
+    data: bytes
+
+
+def _json_default(value: Any) -> Any:
+    # Same fallbacks as the JSONB serializer for values the connectors hand back
+    return str(value)
+
+
+def canonical_json(value: Any) -> bytes:
+    return json.dumps(
+        value,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=_json_default,
+    ).encode()
+
+
+def blob_ref(blob_hash: str) -> FrozenDict:
+    return FrozenDict({BLOB_REF_KEY: blob_hash})
+
+
+def ref_hash(value: Any) -> Optional[str]:
+    if isinstance(value, dict) and len(value) == 1:
+        blob_hash = value.get(BLOB_REF_KEY)
+        if isinstance(blob_hash, str):
+            return blob_hash
+    return None
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def compress(raw: bytes, codec: str, min_bytes: int) -> Tuple[str, bytes]:
+    """Compress with `codec`; zstd falls back to gzip when `zstandard` is not installed."""
+    if codec == "identity" or len(raw) < min_bytes:
+        return "identity", raw
+    if codec == "zstd":
+        zstandard = _zstd()
+        if zstandard is not None:
+            return "zstd", zstandard.ZstdCompressor(level=3).compress(raw)
+        codec = "gzip"
+    if codec == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return "gzip", compressor.compress(raw) + compressor.flush()
+    raise ValueError(f"Unsupported payload compression: {codec}; expected one of {BLOB_ENCODINGS}")
+
+
+def decompress(encoding: str, data: bytes) -> bytes:
+    if encoding == "identity":
+        return data
+    if encoding == "gzip":
+        return zlib.decompress(data, 16 + zlib.MAX_WBITS)
+    if encoding == "zstd":
+        zstandard = _zstd()
+        if zstandard is None:
+            raise RuntimeError("zstd payload blobs require the 'zstandard' package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown payload blob encoding: {encoding}")
+
+
+class PayloadEncoder:
+    """Swaps payload sub-documents for blob references and collects the blobs to write."""
+
+    def __init__(self, codec: str = "gzip", min_compress_bytes: int = 256, min_blob_bytes: int = 64) -> None:
+        self.codec = codec
+        self.min_compress_bytes = min_compress_bytes
+        # Smaller documents stay inline; a reference would not save anything
+        self.min_blob_bytes = min_blob_bytes
+        self.blobs: Dict[str, EncodedBlob] = {}
+
+    def store(self, value: Any) -> Any:
+        if not isinstance(value, dict) or ref_hash(value) is not None:
+            return value
+        raw = canonical_json(value)
+        if len(raw) < self.min_blob_bytes:
+            return value
+        blob_hash = hashlib.sha256(raw).hexdigest()
+        if blob_hash not in self.blobs:
+            encoding, data = compress(raw, self.codec, self.min_compress_bytes)
+            self.blobs[blob_hash] = EncodedBlob(blob_hash, encoding, len(raw), data)
+        return blob_ref(blob_hash)
+
+    def encode(self, metadata: Mapping[str, Any], connector_response: Mapping[str, Any]) -> Tuple[FrozenDict, Any]:
+        """Return (metadata, connector_response) as they should be written to JSONB."""
+        response = connector_response
+        data = response.get("data") if isinstance(response, dict) else None
+        if isinstance(data, dict) and isinstance(data.get("request"), dict):
+            # The connector echoes the request it sent; keep that copy once as well
+            response = FrozenDict({**response, "data": FrozenDict({**data, "request": self.store(data["request"])})})
+        response_ref = self.store(response)
+
+        stored = dict(metadata)
+        if "client_request" in stored:
+            stored["client_request"] = self.store(stored["client_request"])
+        if "connector_response" in stored:
+            stored["connector_response"] = response_ref
+        return FrozenDict(stored), response_ref
+
+
+def collect_refs(value: Any, found: Optional[Set[str]] = None) -> Set[str]:
+    found = set() if found is None else found
+    blob_hash = ref_hash(value)
+    if blob_hash is not None:
+        found.add(blob_hash)
+    elif isinstance(value, dict):
+        for item in value.values():
+            collect_refs(item, found)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            collect_refs(item, found)
+    return found
+
+
+def decode_blobs(rows: Iterable[Any]) -> Dict[str, Any]:
+    """Map hash -> frozen document for rows carrying hash, encoding and data."""
+    return {row.hash: frozen_json_loads(decompress(row.encoding, bytes(row.data))) for row in rows}
+
+
+def rehydrate(value: Any, documents: Mapping[str, Any]) -> Any:
+    """Replace blob references with their documents, recursively; unknown refs are left as is."""
+    blob_hash = ref_hash(value)
+    if blob_hash is not None:
+        if blob_hash not in documents:
+            return value
+        return rehydrate(documents[blob_hash], documents)
+    if isinstance(value, dict):
+        items = {key: rehydrate(item, documents) for key, item in value.items()}
+        if all(items[key] is item for key, item in value.items()):
+            return value
+        return FrozenDict(items)
+    if isinstance(value, (list, tuple)):
+        items = [rehydrate(item, documents) for item in value]
+        if all(new is old for new, old in zip(items, value)):
+            return value
+        return freeze(items)
+    return value
@@ -0,0 +1,57 @@
+"""Retry policy for bank calls that failed transiently."""
+
+from __future__ import annotations
+
+import httpx
+from tenacity import RetryCallState, wait_random_exponential
+
+from app.core.connectors.interface import ConnectorUnavailable
+from config.settings import settings
+
+# Besides 5xx: the bank is shedding load and asks us to come back later
+_RETRYABLE_STATUS = frozenset({408, 425, 429})
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Timeouts, connection failures and 5xx/429 answers; other 4xx are final rejections."""
+    if isinstance(exc, ConnectorUnavailable):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status >= 500 or status in _RETRYABLE_STATUS
+    return isinstance(exc, httpx.TransportError)
+
+
+class RetryPolicy:
+    """Jittered exponential backoff with an attempt cap.
+
+    Delays are drawn uniformly between `base_delay` and `base_delay * 2**(attempt-1)`
+    (capped at `max_delay`), so transfers that failed together during an outage come
+    back spread over the window instead of all at once.
+    """
+
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float) -> None:
+        self.max_attempts = max_attempts
+        self._wait = wait_random_exponential(multiplier=base_delay, min=base_delay, max=max_delay)
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait after the `attempt`-th failed attempt (1-based)."""
+        state = RetryCallState(retry_object=None, fn=None, args=(), kwargs={})
+        state.attempt_number = attempt
+        return self._wait(state)
+
+    def exhausted(self, attempt: int) -> bool:
+        return attempt >= self.max_attempts
+
+
+def default_retry_policy() -> RetryPolicy:
+    return RetryPolicy(
+        max_attempts=settings.transfer_retry_max_attempts,
+        base_delay=settings.transfer_retry_base_delay,
+        max_delay=settings.transfer_retry_max_delay,
+    )
+
+
+def describe_failure(exc: BaseException) -> str:
+    # httpx timeouts often carry an empty message
+    return f"{type(exc).__name__}: {exc}" if str(exc) else type(exc).__name__
@@ -1,9 +1,9 @@
 from decimal import Decimal, ROUND_HALF_UP
 from enum import Enum
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
-from pydantic import BaseModel, Field, ConfigDict, model_validator
-from datetime import datetime
+from pydantic import BaseModel, Field, ConfigDict, field_validator, model_validator
+from datetime import datetime, timezone
 from uuid import UUID, uuid4
 
 class PaymentState(str, Enum):
@@ -53,6 +53,8 @@ class TransferRequest(BaseModel):
     source: TransferParty
     destination: TransferParty
     body: TransferBody
+    # Optional client-chosen id; also the idempotency key when no Idempotency-Key header is sent
+    origin_id: Optional[str] = Field(default=None, alias="originId", max_length=64)
 
 
 class TransferInitResponse(BaseModel):
@@ -65,6 +67,30 @@ class TransferInitResponse(BaseModel):
     bank_response: Dict[str, Any] | None = Field(default=None, alias="bankResponse")
 
 
+class TransferBatchItem(BaseModel):
+    """Outcome of one item of a batch, by its position in the request.
+
+    Items rejected before being saved have only `error`; saved items that FAILED carry it too.
+    """
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    index: int
+    payment_id: Optional[UUID] = Field(default=None, alias="paymentId")
+    origin_id: Optional[str] = Field(default=None, alias="originId")
+    status: Optional[str] = None
+    bank_response: Dict[str, Any] | None = Field(default=None, alias="bankResponse")
+    error: Optional[str] = None
+
+
+class TransferBatchResponse(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    accepted: int
+    rejected: int
+    items: List[TransferBatchItem]
+
+
 class PaymentData(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
 
@@ -94,3 +120,44 @@ class ConnectorResponse(BaseModel):
     provider_reference_id: Optional[str] = None
     error_message: Optional[str] = None
     raw_response: Dict[str, Any] = Field(default_factory=dict)
+
+
+class TransferSummary(BaseModel):
+    """Projection used by the transfer listing; no parties' owners or JSON payloads."""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    payment_id: UUID = Field(..., alias="paymentId")
+    origin_id: str = Field(..., alias="originId")
+    status: PaymentState
+    amount: Decimal
+    currency: str
+    connector_id: Optional[str] = Field(default=None, alias="connectorId")
+    source_address: str = Field(..., alias="sourceAddress")
+    destination_address: str = Field(..., alias="destinationAddress")
+    created_at: datetime = Field(..., alias="createdAt")
+
+
+class TransferListFilters(BaseModel):
+    status: Optional[PaymentState] = None
+    currency: Optional[str] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    connector_id: Optional[str] = None
+    source_address: Optional[str] = None
+    destination_address: Optional[str] = None
+
+    @field_validator("created_from", "created_to")
+    @classmethod
+    def _as_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # Bounds without an offset are UTC, as stored; every backend compares aware UTC values
+        if value is None:
+            return None
+        return value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class TransferPage(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    items: List[TransferSummary]
+    next_cursor: Optional[str] = Field(default=None, alias="nextCursor")
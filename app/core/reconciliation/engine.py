@@ -0,0 +1,176 @@
+"""Hash-join reconciliation of a statement index against ledger rows.
+
+The statement is the build side (one dict); ledger rows stream through as the
+probe side in batches, so the ledger never has to fit in memory and each row
+costs one dict lookup.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.core.payments.types import PaymentState
+from app.core.reconciliation.statement import StatementIndex, StatementLine
+
+# Bank statuses (upper-cased) by the outcome they stand for
+SETTLED_STATUSES = frozenset({"", "OK", "ACCEPTED", "SUCCESS", "COMPLETED", "SETTLED", "ACREDITADA", "ACREDITADO", "APROBADA"})
+REJECTED_STATUSES = frozenset({"REJECTED", "FAILED", "RETURNED", "RECHAZADA", "RECHAZADO", "DEVUELTA"})
+
+_SETTLED_STATES = frozenset({PaymentState.AUTHORIZED, PaymentState.CAPTURED})
+_REJECTED_STATES = frozenset({PaymentState.FAILED, PaymentState.CANCELLED})
+
+
+class LedgerEntry(NamedTuple):
+    origin_id: str
+    provider_reference_id: Optional[str]
+    amount_cents: int
+    currency: str
+    status: PaymentState
+
+
+class Mismatch(NamedTuple):
+    ledger: LedgerEntry
+    statement: StatementLine
+
+
+@dataclass
+class ReconciliationReport:
+    matched: List[LedgerEntry] = field(default_factory=list)
+    amount_mismatches: List[Mismatch] = field(default_factory=list)
+    status_mismatches: List[Mismatch] = field(default_factory=list)
+    # In our ledger but not on the statement
+    missing_in_statement: List[LedgerEntry] = field(default_factory=list)
+    # On the statement but unknown to the ledger
+    missing_in_ledger: List[StatementLine] = field(default_factory=list)
+    duplicates: List[StatementLine] = field(default_factory=list)
+    rejected_lines: List[int] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "matched": len(self.matched),
+            "amount_mismatches": len(self.amount_mismatches),
+            "status_mismatches": len(self.status_mismatches),
+            "missing_in_statement": len(self.missing_in_statement),
+            "missing_in_ledger": len(self.missing_in_ledger),
+            "duplicates": len(self.duplicates),
+            "rejected_lines": len(self.rejected_lines),
+        }
+
+
+def statuses_agree(ledger_status: PaymentState, statement_status: str) -> bool:
+    return ledger_status in _agreeing_states(statement_status)
+
+
+def _agreeing_states(statement_status: str) -> FrozenSet[PaymentState]:
+    bank = statement_status.upper()
+    if bank in SETTLED_STATUSES:
+        return _SETTLED_STATES
+    if bank in REJECTED_STATUSES:
+        return _REJECTED_STATES
+    return frozenset()
+
+
+class Reconciler:
+    """Incremental reconciliation: feed ledger batches, then `finish()`."""
+
+    def __init__(self, statement: StatementIndex) -> None:
+        self.statement = statement
+        # Consumed while probing; what is left at the end is missing from the ledger
+        self._pending = dict(statement.positions)
+        # Bank statuses repeat a handful of values; classify each one once
+        self._agreeing: Dict[str, FrozenSet[PaymentState]] = {}
+        self._amount_mismatches: List[Tuple[LedgerEntry, int]] = []
+        self._status_mismatches: List[Tuple[LedgerEntry, int]] = []
+        self.report = ReconciliationReport(rejected_lines=list(statement.rejected))
+
+    def feed(self, entries: Iterable[LedgerEntry]) -> None:
+        pop = self._pending.pop
+        cents = self.statement.amount_cents
+        currencies = self.statement.currencies
+        statuses = self.statement.statuses
+        agreeing = self._agreeing
+        matched = self.report.matched
+        missing = self.report.missing_in_statement
+        amount_mismatches = self._amount_mismatches
+        status_mismatches = self._status_mismatches
+
+        for entry in entries:
+            # The bank echoes dest_ori_trx_id; older rows may only have their originId
+            position = pop(entry.provider_reference_id, None) if entry.provider_reference_id else None
+            if position is None:
+                position = pop(entry.origin_id, None)
+            if position is None:
+                missing.append(entry)
+                continue
+            currency = currencies[position]
+            if entry.amount_cents != cents[position] or (currency and currency != entry.currency):
+                amount_mismatches.append((entry, position))
+                continue
+            status = statuses[position]
+            states = agreeing.get(status)
+            if states is None:
+                states = agreeing[status] = _agreeing_states(status)
+            if entry.status in states:
+                matched.append(entry)
+            else:
+                status_mismatches.append((entry, position))
+
+    def finish(self) -> ReconciliationReport:
+        line = self.statement.line
+        report = self.report
+        report.amount_mismatches = [Mismatch(entry, line(position)) for entry, position in self._amount_mismatches]
+        report.status_mismatches = [Mismatch(entry, line(position)) for entry, position in self._status_mismatches]
+        report.missing_in_ledger = [line(position) for position in sorted(self._pending.values())]
+        report.duplicates = [line(position) for position in self.statement.duplicates]
+        self._pending = {}
+        return report
+
+
+def reconcile(statement: StatementIndex, ledger: Iterable[LedgerEntry]) -> ReconciliationReport:
+    reconciler = Reconciler(statement)
+    reconciler.feed(ledger)
+    return reconciler.finish()
+
+
+async def reconcile_batches(
+    statement: StatementIndex,
+    batches: AsyncIterable[List[LedgerEntry]],
+) -> ReconciliationReport:
+    reconciler = Reconciler(statement)
+    async for batch in batches:
+        reconciler.feed(batch)
+    return reconciler.finish()
+
+
+def report_rows(report: ReconciliationReport) -> Iterable[Dict[str, Any]]:
+    """Flattened discrepancy rows (matched lines are left out) for NDJSON/CSV output."""
+    for kind, pairs in (("amount_mismatch", report.amount_mismatches), ("status_mismatch", report.status_mismatches)):
+        for ledger, line in pairs:
+            yield {
+                "kind": kind,
+                "reference": line.reference,
+                "origin_id": ledger.origin_id,
+                "ledger_amount_cents": ledger.amount_cents,
+                "statement_amount_cents": line.amount_cents,
+                "ledger_status": ledger.status.value,
+                "statement_status": line.status,
+                "statement_line": line.line,
+            }
+    for ledger in report.missing_in_statement:
+        yield {
+            "kind": "missing_in_statement",
+            "reference": ledger.provider_reference_id,
+            "origin_id": ledger.origin_id,
+            "ledger_amount_cents": ledger.amount_cents,
+            "ledger_status": ledger.status.value,
+        }
+    for kind, lines in (("missing_in_ledger", report.missing_in_ledger), ("duplicate", report.duplicates)):
+        for line in lines:
+            yield {
+                "kind": kind,
+                "reference": line.reference,
+                "statement_amount_cents": line.amount_cents,
+                "statement_status": line.status,
+                "statement_line": line.line,
+            }
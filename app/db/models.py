@@ -5,7 +5,21 @@ from datetime import datetime, timezone
 from decimal import Decimal
 from typing import Any, Dict, Optional
 
-from sqlalchemy import DateTime, Enum, ForeignKey, Numeric, String, Text
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    Numeric,
+    Sequence,
+    String,
+    Text,
+    UniqueConstraint,
+    text,
+)
 from sqlalchemy.dialects.postgresql import JSONB, UUID as PGUUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -35,6 +49,7 @@ class PaymentRecord(Base):
     )
     description: Mapped[Optional[str]] = mapped_column(String(255))
     metadata: Mapped[Dict[str, Any]] = mapped_column(JSONB, default=dict)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         default=utcnow,
@@ -55,16 +70,47 @@ class PaymentRecord(Base):
 
 
 class TransferRecord(Base):
+    """Monthly range partitions on created_at; uniqueness of origin_id/payment_id lives in TransferLookupRecord."""
+
     __tablename__ = "transfers"
+    __table_args__ = (
+        UniqueConstraint("payment_id", "created_at", name="uq_transfers_payment_id_created_at"),
+        # Keyset listing: (created_at, id) covering index plus one per filter column
+        Index(
+            "ix_transfers_created_id",
+            "created_at",
+            "id",
+            postgresql_include=[
+                "payment_id",
+                "origin_id",
+                "status",
+                "amount",
+                "currency",
+                "connector_id",
+                "source_address",
+                "destination_address",
+            ],
+        ),
+        Index("ix_transfers_status_created_id", "status", "created_at", "id"),
+        Index("ix_transfers_currency_created_id", "currency", "created_at", "id"),
+        Index("ix_transfers_connector_created_id", "connector_id", "created_at", "id"),
+        Index("ix_transfers_source_address_created_id", "source_address", "created_at", "id"),
+        Index("ix_transfers_destination_address_created_id", "destination_address", "created_at", "id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
-    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    id: Mapped[int] = mapped_column(
+        BigInteger,
+        Sequence("transfers_id_seq"),
+        primary_key=True,
+        autoincrement=True,
+    )
     payment_id: Mapped[uuid.UUID] = mapped_column(
         PGUUID(as_uuid=True),
         ForeignKey("payments.id", ondelete="CASCADE"),
-        unique=True,
         nullable=False,
     )
-    origin_id: Mapped[str] = mapped_column(String(64), unique=True, index=True, nullable=False)
+    origin_id: Mapped[str] = mapped_column(String(64), index=True, nullable=False)
     status: Mapped[PaymentState] = mapped_column(
         Enum(PaymentState, name="transfer_status"),
         default=PaymentState.CREATED,
@@ -90,6 +136,7 @@ class TransferRecord(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         default=utcnow,
+        primary_key=True,
         nullable=False,
     )
     updated_at: Mapped[datetime] = mapped_column(
@@ -102,20 +149,25 @@ class TransferRecord(Base):
     payment: Mapped[PaymentRecord] = relationship(back_populates="transfer")
     events: Mapped[list["TransferEventRecord"]] = relationship(
         back_populates="transfer",
+        primaryjoin="TransferRecord.id == foreign(TransferEventRecord.transfer_id)",
         cascade="all, delete-orphan",
         order_by="TransferEventRecord.created_at",
     )
 
 
 class TransferEventRecord(Base):
+    """Partitioned like transfers; no FK to transfers since its key includes the partition column."""
+
     __tablename__ = "transfer_events"
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
 
-    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    transfer_id: Mapped[int] = mapped_column(
-        ForeignKey("transfers.id", ondelete="CASCADE"),
-        index=True,
-        nullable=False,
+    id: Mapped[int] = mapped_column(
+        BigInteger,
+        Sequence("transfer_events_id_seq"),
+        primary_key=True,
+        autoincrement=True,
     )
+    transfer_id: Mapped[int] = mapped_column(BigInteger, index=True, nullable=False)
     status: Mapped[PaymentState] = mapped_column(
         Enum(PaymentState, name="transfer_event_status"),
         nullable=False,
@@ -125,7 +177,64 @@ class TransferEventRecord(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         default=utcnow,
+        primary_key=True,
         nullable=False,
     )
 
-    transfer: Mapped[TransferRecord] = relationship(back_populates="events")
+    transfer: Mapped[TransferRecord] = relationship(
+        back_populates="events",
+        primaryjoin="foreign(TransferEventRecord.transfer_id) == TransferRecord.id",
+    )
+
+
+class TransferLookupRecord(Base):
+    """Small unpartitioned index from origin_id/payment_id to the transfer's partition key."""
+
+    __tablename__ = "transfer_lookup"
+
+    origin_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    payment_id: Mapped[uuid.UUID] = mapped_column(PGUUID(as_uuid=True), unique=True, nullable=False)
+    transfer_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True, nullable=False)
+
+
+class PayloadBlobRecord(Base):
+    """Content-addressed transfer payloads; JSONB columns reference them as {"$blob": hash}."""
+
+    __tablename__ = "payload_blobs"
+
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    encoding: Mapped[str] = mapped_column(String(8), nullable=False)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=False)
+
+
+class TransferOutboxRecord(Base):
+    """Transfers accepted asynchronously, written in the same transaction as the transfer.
+
+    The relay publishes rows to the worker (published_at) and the worker claims each
+    one before calling the bank (dispatched_at), so a re-published row is not sent twice.
+    A transient bank failure releases the claim with a later next_attempt_at.
+    """
+
+    __tablename__ = "transfer_outbox"
+    __table_args__ = (
+        Index("ix_transfer_outbox_unpublished", "id", postgresql_where=text("published_at IS NULL")),
+        Index("ix_transfer_outbox_due", "next_attempt_at", "id", postgresql_where=text("dispatched_at IS NULL")),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    payment_id: Mapped[uuid.UUID] = mapped_column(PGUUID(as_uuid=True), unique=True, nullable=False)
+    origin_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=False)
+    published_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    dispatched_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    # Server defaults only, so the accept statement does not have to send them
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=text("now()"),
+        nullable=False,
+    )
+    last_error: Mapped[Optional[str]] = mapped_column(String(255))
@@ -0,0 +1,184 @@
+"""Monthly range partitions for transfers and transfer_events.
+
+Partitions are named ``<table>_pYYYY_MM`` and cover ``[first day of month,
+first day of next month)`` in UTC. ``ensure_partitions`` creates upcoming
+months ahead of time; ``apply_retention`` detaches (and optionally drops)
+months older than the retention window, which is a catalog operation instead
+of a bulk DELETE. Rows outside every monthly range (the maintenance job fell
+behind) land in ``<table>_default`` instead of failing the insert, and move
+to their month's partition once ``ensure_partitions`` creates it.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import TransferLookupRecord
+from app.db.session import tenant_session
+from config.settings import settings
+
+PARTITIONED_TABLES: Sequence[str] = ("transfers", "transfer_events")
+
+_PARTITION_SUFFIX = re.compile(r"_p(\d{4})_(\d{2})$")
+
+
+def month_start(value: datetime) -> datetime:
+    value = value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + (month.month - 1) + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month.year:04d}_{month.month:02d}"
+
+
+def partition_ddl(table: str, month: datetime) -> str:
+    start = month_start(month)
+    end = add_months(start, 1)
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(table, start)}" PARTITION OF "{table}" '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def default_partition_ddl(table: str) -> str:
+    return f'CREATE TABLE IF NOT EXISTS "{default_partition_name(table)}" PARTITION OF "{table}" DEFAULT'
+
+
+@dataclass(frozen=True)
+class Partition:
+    table: str
+    name: str
+    month: datetime
+
+
+async def list_partitions(session: AsyncSession, table: str) -> List[Partition]:
+    result = await session.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.oid = to_regclass(:table)"
+        ),
+        {"table": table},
+    )
+    partitions = []
+    for (name,) in result:
+        match = _PARTITION_SUFFIX.search(name)
+        if match:
+            month = datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+            partitions.append(Partition(table=table, name=name, month=month))
+    return sorted(partitions, key=lambda partition: partition.month)
+
+
+async def ensure_partitions(
+    session: AsyncSession,
+    months_ahead: int,
+    now: Optional[datetime] = None,
+) -> List[str]:
+    """Create the current month plus `months_ahead` future months; returns the partitions created."""
+    current = month_start(now or datetime.now(timezone.utc))
+    created = []
+    for table in PARTITIONED_TABLES:
+        existing = {partition.name for partition in await list_partitions(session, table)}
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            name = partition_name(table, month)
+            if name not in existing:
+                await create_partition(session, table, month)
+                created.append(name)
+    return created
+
+
+async def create_partition(session: AsyncSession, table: str, month: datetime) -> None:
+    """Create one month's partition, moving in the rows the DEFAULT partition caught for it.
+
+    Postgres refuses to attach a range the DEFAULT partition already holds rows
+    for, so the DEFAULT partition is detached while those rows are moved.
+    """
+    start = month_start(month)
+    default = default_partition_name(table)
+    params = {"start": start, "end": add_months(start, 1)}
+    in_range = f'FROM "{default}" WHERE created_at >= :start AND created_at < :end'
+    has_default = (await session.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": default})).scalar()
+    stray = has_default and (await session.execute(text(f"SELECT EXISTS (SELECT 1 {in_range})"), params)).scalar()
+    if not stray:
+        await session.execute(text(partition_ddl(table, start)))
+        return
+    await session.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{default}"'))
+    await session.execute(text(partition_ddl(table, start)))
+    await session.execute(text(f'INSERT INTO "{table}" SELECT * {in_range}'), params)
+    await session.execute(text(f"DELETE {in_range}"), params)
+    await session.execute(text(f'ALTER TABLE "{table}" ATTACH PARTITION "{default}" DEFAULT'))
+
+
+async def apply_retention(
+    session: AsyncSession,
+    keep_months: int,
+    drop: bool = False,
+    now: Optional[datetime] = None,
+    lookup_batch_size: int = 10000,
+) -> List[str]:
+    """Detach (or drop) partitions entirely older than `keep_months` and prune transfer_lookup."""
+    cutoff = add_months(month_start(now or datetime.now(timezone.utc)), -keep_months)
+    removed = []
+    for table in PARTITIONED_TABLES:
+        for partition in await list_partitions(session, table):
+            if partition.month >= cutoff:
+                continue
+            await session.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{partition.name}"'))
+            if drop:
+                await session.execute(text(f'DROP TABLE "{partition.name}"'))
+            removed.append(partition.name)
+
+    # Lookup rows of retired months go in bounded batches to keep locks short
+    lookup = TransferLookupRecord.__table__
+    while True:
+        batch = (
+            select(lookup.c.origin_id)
+            .where(lookup.c.created_at < cutoff)
+            .limit(lookup_batch_size)
+            .scalar_subquery()
+        )
+        result = await session.execute(delete(lookup).where(lookup.c.origin_id.in_(batch)))
+        if result.rowcount < lookup_batch_size:
+            break
+    return removed
+
+
+def configured_tenants() -> List[str]:
+    return [tenant.strip() for tenant in settings.partition_tenants.split(",") if tenant.strip()]
+
+
+async def maintain_partitions(
+    tenants: Optional[Sequence[str]] = None,
+    months_ahead: Optional[int] = None,
+    keep_months: Optional[int] = None,
+    drop: Optional[bool] = None,
+) -> Dict[str, Dict[str, List[str]]]:
+    """Create upcoming partitions and apply retention for every tenant schema."""
+    months_ahead = settings.partition_months_ahead if months_ahead is None else months_ahead
+    keep_months = settings.partition_retention_months if keep_months is None else keep_months
+    drop = settings.partition_retention_drop if drop is None else drop
+
+    report = {}
+    for tenant in tenants or configured_tenants():
+        async with tenant_session(tenant) as session:
+            created = await ensure_partitions(session, months_ahead)
+            removed = await apply_retention(session, keep_months, drop=drop) if keep_months > 0 else []
+        report[tenant] = {"created": created, "removed": removed}
+    return report
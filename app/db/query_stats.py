@@ -0,0 +1,110 @@
+"""Statement counts and DB time per unit of work, plus the slow-query log.
+
+Hooks on every Engine add each statement to the QueryStats of the current
+context (an HTTP request, a worker task or a test). Statements slower than
+DB_SLOW_QUERY_SECONDS are logged with their parameters reduced to type names,
+so account numbers and names never reach the logs.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_STARTED_KEY = "query_started"
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+    slow: int = 0
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _query_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Count the statements run inside the block, including from tasks it starts."""
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+@contextmanager
+def query_budget(max_queries: int) -> Iterator[QueryStats]:
+    """Test helper: fail when the block runs more than `max_queries` statements."""
+    with track_queries() as stats:
+        yield stats
+    assert_query_budget(stats.count, max_queries)
+
+
+def assert_query_budget(count: int, max_queries: int) -> None:
+    if count > max_queries:
+        raise QueryBudgetExceeded(f"{count} queries, budget is {max_queries}")
+
+
+def redact_parameters(parameters: Any) -> Any:
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: the first row's shape stands for all of them
+            return [redact_parameters(parameters[0]), f"... {len(parameters)} rows"]
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_STARTED_KEY, []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "handle_error")
+def _drop_timer(exception_context):
+    # after_cursor_execute does not run for failed statements
+    started = exception_context.connection.info.get(_STARTED_KEY) if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info[_STARTED_KEY].pop()
+    elapsed = time.perf_counter() - started
+    stats = _query_stats.get()
+    slow = elapsed >= settings.db_slow_query_seconds
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+        stats.slow += slow
+    if slow:
+        logger.warning(
+            "Slow query (%.1f ms): %s | parameters: %s",
+            elapsed * 1000,
+            statement[: settings.db_slow_query_log_chars],
+            redact_parameters(parameters),
+        )
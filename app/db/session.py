@@ -1,42 +1,359 @@
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from contextvars import ContextVar
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy import text
-from typing import AsyncGenerator
+from sqlalchemy import event, text
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession, async_sessionmaker
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+from app.core.payments.frozen import frozen_json_loads
+# Registers the statement counting and slow-query hooks on every engine
+from app.db import query_stats  # noqa: F401
 from config.settings import settings
 
+logger = logging.getLogger(__name__)
+
 # Global Context for storing current Tenant ID
 _tenant_id_ctx: ContextVar[str] = ContextVar("tenant_id", default="public")
 
+# Tenants are schema names; only plain identifiers ever reach the search_path
+_TENANT_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]{0,62}$")
+
+DEFAULT_TENANT = "public"
+
+
+def validate_tenant(tenant_id: str) -> str:
+    if not isinstance(tenant_id, str) or not _TENANT_IDENTIFIER.match(tenant_id):
+        raise ValueError(f"Invalid tenant identifier: {tenant_id!r}")
+    return tenant_id
+
+
 def get_current_tenant() -> str:
     return _tenant_id_ctx.get()
 
 def set_current_tenant(tenant_id: str):
-    _tenant_id_ctx.set(tenant_id)
+    _tenant_id_ctx.set(validate_tenant(tenant_id))
+
+
+def _create_tenant_engine(tenant_id: str, url: Optional[str] = None, **pool_options: Any) -> AsyncEngine:
+    tenant_engine = create_async_engine(
+        url or settings.DATABASE_URL,
+        echo=settings.db_echo,
+        future=True,
+        # JSONB columns decode straight into frozen containers so repositories can share them
+        json_deserializer=frozen_json_loads,
+        **pool_options,
+    )
+
+    # The search_path is fixed once per pooled connection instead of once per session
+    search_path = f"{tenant_id}, public" if tenant_id != DEFAULT_TENANT else "public"
+
+    @event.listens_for(tenant_engine.sync_engine, "connect")
+    def set_search_path(dbapi_connection, connection_record):
+        # Outside any transaction: a SET inside one is undone when it rolls back,
+        # which would leave the pooled connection on the default search_path
+        autocommit = dbapi_connection.autocommit
+        dbapi_connection.autocommit = True
+        try:
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"SET search_path TO {search_path}")
+            cursor.close()
+        finally:
+            dbapi_connection.autocommit = autocommit
+
+    return tenant_engine
+
+
+class TenantEngines:
+    """Bounded LRU of per-tenant engines, each with its own small connection pool.
+
+    The default tenant's engine is never evicted. Evicted engines are disposed in
+    the background; connections still checked out close when they are returned.
+    """
+
+    def __init__(self, default: AsyncEngine, max_engines: int, url: Optional[str] = None) -> None:
+        self.default = default
+        self.max_engines = max_engines
+        self.url = url
+        self._engines: "OrderedDict[str, AsyncEngine]" = OrderedDict()
+        self._disposing: Set[asyncio.Task[None]] = set()
+        self._created = 0
+        self._evicted = 0
+
+    def get(self, tenant_id: str) -> AsyncEngine:
+        if tenant_id == DEFAULT_TENANT:
+            return self.default
+        tenant_engine = self._engines.get(validate_tenant(tenant_id))
+        if tenant_engine is not None:
+            self._engines.move_to_end(tenant_id)
+            return tenant_engine
 
-# Async Engine
-engine = create_async_engine(settings.DATABASE_URL, echo=True, future=True)
+        tenant_engine = _create_tenant_engine(
+            tenant_id,
+            url=self.url,
+            pool_size=settings.db_tenant_pool_size,
+            max_overflow=settings.db_tenant_max_overflow,
+        )
+        self._engines[tenant_id] = tenant_engine
+        self._created += 1
+        while len(self._engines) > self.max_engines:
+            _, evicted = self._engines.popitem(last=False)
+            self._evicted += 1
+            task = asyncio.get_running_loop().create_task(evicted.dispose())
+            self._disposing.add(task)
+            task.add_done_callback(self._disposing.discard)
+        return tenant_engine
+
+    async def dispose(self) -> None:
+        engines = list(self._engines.values())
+        self._engines.clear()
+        for tenant_engine in engines:
+            await tenant_engine.dispose()
+        if self._disposing:
+            await asyncio.gather(*self._disposing, return_exceptions=True)
+        await self.default.dispose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "engines": len(self._engines) + 1,
+            "max_engines": self.max_engines,
+            "created": self._created,
+            "evicted": self._evicted,
+        }
+
+
+# Async Engine (default tenant)
+engine = _create_tenant_engine(DEFAULT_TENANT)
+
+tenant_engines = TenantEngines(engine, max_engines=settings.db_max_tenant_engines)
 
 # Session Factory
 async_session_factory = async_sessionmaker(
-    engine, 
-    class_=AsyncSession, 
+    engine,
+    class_=AsyncSession,
     expire_on_commit=False,
     autoflush=False
 )
 
-async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
+
+def get_tenant_engine(tenant_id: Optional[str] = None) -> AsyncEngine:
+    return tenant_engines.get(tenant_id or get_current_tenant())
+
+
+_AFTER_COMMIT_KEY = "after_commit_callbacks"
+_WROTE_KEY = "wrote"
+
+# Seconds since the last replayed transaction; 0 when the replica has replayed all it received
+_REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaRouter:
+    """Decides per read whether the replica can serve it.
+
+    A tenant reads from the primary for `read_your_writes` seconds after one of
+    its sessions committed a write in this process. The replica is skipped while
+    its replay lag exceeds `max_lag` (checked at most every `lag_check_interval`
+    seconds) and for `retry_after` seconds after it failed.
+    """
+
+    def __init__(
+        self,
+        engines: TenantEngines,
+        read_your_writes: float,
+        max_lag: float,
+        lag_check_interval: float,
+        retry_after: float,
+    ) -> None:
+        self.engines = engines
+        self.read_your_writes = read_your_writes
+        self.max_lag = max_lag
+        self.lag_check_interval = lag_check_interval
+        self.retry_after = retry_after
+        self._last_write: Dict[str, float] = {}
+        self._unavailable_until = 0.0
+        self._lag: Optional[float] = None
+        self._lag_checked_at = float("-inf")
+        self._lag_lock = asyncio.Lock()
+        self._replica_reads = 0
+        self._primary_reads = 0
+        self._failures = 0
+
+    def record_write(self, tenant_id: str) -> None:
+        now = time.monotonic()
+        self._last_write[tenant_id] = now
+        if len(self._last_write) > 1024:
+            cutoff = now - self.read_your_writes
+            self._last_write = {tenant: at for tenant, at in self._last_write.items() if at > cutoff}
+
+    def mark_unavailable(self) -> None:
+        self._failures += 1
+        self._unavailable_until = time.monotonic() + self.retry_after
+
+    async def use_replica(self, tenant_id: str) -> bool:
+        now = time.monotonic()
+        use = (
+            now - self._last_write.get(tenant_id, float("-inf")) >= self.read_your_writes
+            and now >= self._unavailable_until
+            and await self._replica_lag() <= self.max_lag
+        )
+        if use:
+            self._replica_reads += 1
+        else:
+            self._primary_reads += 1
+        return use
+
+    async def _replica_lag(self) -> float:
+        if time.monotonic() - self._lag_checked_at < self.lag_check_interval:
+            return self._lag if self._lag is not None else float("inf")
+        async with self._lag_lock:
+            if time.monotonic() - self._lag_checked_at >= self.lag_check_interval:
+                try:
+                    async with self.engines.default.connect() as connection:
+                        self._lag = float((await connection.execute(_REPLICA_LAG_SQL)).scalar() or 0)
+                except Exception:
+                    logger.warning("Replica lag check failed; reading from the primary", exc_info=True)
+                    self._lag = None
+                    self.mark_unavailable()
+                self._lag_checked_at = time.monotonic()
+        return self._lag if self._lag is not None else float("inf")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "replica_reads": self._replica_reads,
+            "primary_reads": self._primary_reads,
+            "failures": self._failures,
+            "lag_seconds": self._lag,
+            "available": time.monotonic() >= self._unavailable_until,
+            "engines": self.engines.stats(),
+        }
+
+
+replica_router: Optional[ReplicaRouter] = None
+if settings.DATABASE_REPLICA_URL:
+    replica_router = ReplicaRouter(
+        TenantEngines(
+            _create_tenant_engine(DEFAULT_TENANT, url=settings.DATABASE_REPLICA_URL),
+            max_engines=settings.db_max_tenant_engines,
+            url=settings.DATABASE_REPLICA_URL,
+        ),
+        read_your_writes=settings.db_replica_read_your_writes_seconds,
+        max_lag=settings.db_replica_max_lag_seconds,
+        lag_check_interval=settings.db_replica_lag_check_interval,
+        retry_after=settings.db_replica_retry_after,
+    )
+
+
+async def dispose_engines() -> None:
+    """Close every tenant pool (app shutdown, or before leaving a short-lived event loop)."""
+    await tenant_engines.dispose()
+    if replica_router is not None:
+        await replica_router.engines.dispose()
+
+
+def mark_write(session: AsyncSession) -> None:
+    """Flag the session as writing so its tenant reads from the primary after commit.
+
+    Flushes and ORM INSERT/UPDATE/DELETE are detected automatically; statements
+    that write through CTEs must call this explicitly.
+    """
+    session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _flag_flush_write(session, flush_context):
+    session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _flag_orm_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[_WROTE_KEY] = True
+
+
+def on_commit(session: AsyncSession, callback: Callable[[], Awaitable[None]]) -> None:
+    """Run `callback` after the session's transaction commits; it is dropped on rollback."""
+    session.info.setdefault(_AFTER_COMMIT_KEY, []).append(callback)
+
+
+@asynccontextmanager
+async def tenant_session(tenant_id: Optional[str] = None) -> AsyncIterator[AsyncSession]:
     """
-    Dependency to get a database session with the search_path set to the current tenant.
+    Session bound to the tenant's pool (search_path already set), committed on success.
     """
-    tenant_id = get_current_tenant()
-    async with async_session_factory() as session:
-        # Set the search path to the tenant schema (and public as fallback)
-        await session.execute(text(f"SET search_path TO {tenant_id}, public"))
+    tenant_id = tenant_id or get_current_tenant()
+    async with async_session_factory(bind=get_tenant_engine(tenant_id)) as session:
         try:
             yield session
             await session.commit()
+            callbacks = session.info.pop(_AFTER_COMMIT_KEY, [])
+            if session.info.pop(_WROTE_KEY, False) and replica_router is not None:
+                replica_router.record_write(tenant_id)
         except Exception:
+            session.info.pop(_AFTER_COMMIT_KEY, None)
             await session.rollback()
             raise
         finally:
             await session.close()
+
+    for callback in callbacks:
+        await callback()
+
+
+async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency to get a database session for the current tenant.
+    """
+    async with tenant_session(get_current_tenant()) as session:
+        yield session
+
+
+@asynccontextmanager
+async def read_session(tenant_id: Optional[str] = None) -> AsyncIterator[AsyncSession]:
+    """
+    Session for read-only work: the tenant's replica pool when it is healthy and
+    the tenant has not written recently, otherwise a regular primary session.
+    """
+    tenant_id = tenant_id or get_current_tenant()
+    session: Optional[AsyncSession] = None
+    if replica_router is not None and await replica_router.use_replica(tenant_id):
+        session = async_session_factory(bind=replica_router.engines.get(tenant_id))
+        try:
+            await session.connection()
+        except (OperationalError, InterfaceError, OSError):
+            logger.warning("Replica unavailable; reading from the primary", exc_info=True)
+            replica_router.mark_unavailable()
+            await session.close()
+            session = None
+
+    if session is None:
+        async with tenant_session(tenant_id) as primary_session:
+            yield primary_session
+        return
+
+    try:
+        yield session
+        await session.rollback()
+    except (OperationalError, InterfaceError):
+        replica_router.mark_unavailable()
+        await session.rollback()
+        raise
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+
+async def get_db_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency for read-only endpoints; routed to the replica when one is configured.
+    """
+    async with read_session(get_current_tenant()) as session:
+        yield session
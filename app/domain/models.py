@@ -5,6 +5,7 @@ from uuid import UUID, uuid4
 
 class PaymentStatus(str, Enum):
     PENDING = "PENDING"
+    PROCESSING = "PROCESSING"
     COMPLETED = "COMPLETED"
     FAILED = "FAILED"
     REFUNDED = "REFUNDED"
@@ -14,7 +15,13 @@ class Payment(BaseModel):
     amount: float
     currency: str
     status: PaymentStatus = PaymentStatus.PENDING
+    # Bumped on every write; updates only apply to the version they were read at
+    version: int = 1
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class StalePaymentError(Exception):
+    """The payment changed since it was read; reload it and retry."""
@@ -1,28 +1,72 @@
+from contextlib import asynccontextmanager
+from typing import Optional
+
 from fastapi import Depends, FastAPI
+from fastapi.responses import PlainTextResponse
 
 from app.adapters.api.dependencies import (
+    get_idempotency_guard,
+    get_payload_store,
     get_payment_operation,
+    get_payment_read_operation,
+    get_payment_read_service,
     get_payment_service,
+    get_transfer_cache,
+    get_transfer_connector,
+    get_transfer_event_buffer,
+    get_transfer_export_source,
 )
+from app.adapters.api.middleware import QueryStatsMiddleware
 from app.adapters.api.routes import router as payment_router
 from app.adapters.db.memory_repository import InMemoryPaymentRepository
 from app.adapters.db.memory_transfer_repository import InMemoryTransferRepository
 from app.adapters.db.sql_payment_repository import SqlAlchemyPaymentRepository
+from app.adapters.db.sql_transfer_export import SqlTransferExportSource
 from app.adapters.db.sql_transfer_repository import SqlAlchemyTransferRepository
+from app.adapters.db.transfer_cache import TransferCache
 from app.adapters.payment.mock_gateway import MockPaymentGateway
+from app.core.connectors.interface import ConnectorIntegration
+from app.core.metrics import stage_metrics
 from app.core.payments.operation import PaymentOperation
-from app.db.session import get_db_session
+from app.db import session as db_session
+from app.db.session import dispose_engines, get_current_tenant, get_db_read_session, get_db_session
 from app.services.payment_service import PaymentService
 from sqlalchemy.ext.asyncio import AsyncSession
 from config.settings import settings
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The connector owns a keep-alive HTTP pool shared by every request
+    connector = get_transfer_connector()
+    await connector.startup()
+    event_buffer = get_transfer_event_buffer()
+    if event_buffer is not None:
+        await event_buffer.start()
+    try:
+        yield
+    finally:
+        if event_buffer is not None:
+            await event_buffer.close()
+        transfer_cache = get_transfer_cache()
+        if transfer_cache is not None:
+            await transfer_cache.close()
+        idempotency = get_idempotency_guard()
+        if idempotency is not None:
+            await idempotency.store.close()
+        await connector.shutdown()
+        await dispose_engines()
+
+
 app = FastAPI(
     title="Pagoflex Middleware",
     description="Payment Gateway API",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 gateway = MockPaymentGateway()
+stage_metrics.tenant_of = get_current_tenant
 
 
 if settings.persistence_backend.lower() == "memory":
@@ -47,15 +91,75 @@ else:
     async def get_payment_operation_impl(
         session: AsyncSession = Depends(get_db_session),
     ) -> PaymentOperation:
-        repository = SqlAlchemyTransferRepository(session)
+        repository = SqlAlchemyTransferRepository(
+            session,
+            event_buffer=get_transfer_event_buffer(),
+            cache=get_transfer_cache(),
+            payload_store=get_payload_store(),
+        )
+        return PaymentOperation(transfer_repository=repository)
+
+    async def get_payment_read_service_impl(
+        session: AsyncSession = Depends(get_db_read_session),
+    ) -> PaymentService:
+        return PaymentService(SqlAlchemyPaymentRepository(session), gateway)
+
+    async def get_payment_read_operation_impl(
+        session: AsyncSession = Depends(get_db_read_session),
+    ) -> PaymentOperation:
+        repository = SqlAlchemyTransferRepository(
+            session,
+            cache=get_transfer_cache(),
+            payload_store=get_payload_store(),
+        )
         return PaymentOperation(transfer_repository=repository)
 
+    def get_transfer_export_source_impl() -> SqlTransferExportSource:
+        # Opens its own read session while the response streams
+        return SqlTransferExportSource(get_current_tenant())
+
 # Override dependency tokens
 app.dependency_overrides[get_payment_service] = get_payment_service_impl
 app.dependency_overrides[get_payment_operation] = get_payment_operation_impl
+if settings.persistence_backend.lower() != "memory":
+    app.dependency_overrides[get_transfer_export_source] = get_transfer_export_source_impl
+if settings.persistence_backend.lower() != "memory" and db_session.replica_router is not None:
+    # GET endpoints go to the replica; without one they keep resolving to the tokens above
+    app.dependency_overrides[get_payment_read_service] = get_payment_read_service_impl
+    app.dependency_overrides[get_payment_read_operation] = get_payment_read_operation_impl
 
 app.include_router(payment_router, prefix="/api/v1")
+if settings.db_query_stats_headers:
+    app.add_middleware(QueryStatsMiddleware)
 
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+
+@app.get("/health/connector")
+async def connector_health(
+    connector: ConnectorIntegration = Depends(get_transfer_connector),
+):
+    return {"connector": type(connector).__name__, **connector.stats()}
+
+
+@app.get("/health/db")
+async def db_health():
+    replica_router = db_session.replica_router
+    return {
+        "tenant_engines": db_session.tenant_engines.stats(),
+        "replica": replica_router.stats() if replica_router is not None else None,
+    }
+
+
+@app.get("/health/cache")
+async def cache_health(
+    cache: Optional[TransferCache] = Depends(get_transfer_cache),
+):
+    return {"transfer_cache": cache.stats() if cache is not None else None}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(stage_metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,56 @@
+import json
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+
+@dataclass(frozen=True)
+class IdempotencyRecord:
+    state: str
+    fingerprint: str
+    owner: str
+    response: Optional[Dict[str, Any]] = None
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {"state": self.state, "fingerprint": self.fingerprint, "owner": self.owner, "response": self.response},
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "IdempotencyRecord":
+        data = json.loads(raw)
+        return cls(
+            state=data["state"],
+            fingerprint=data["fingerprint"],
+            owner=data["owner"],
+            response=data.get("response"),
+        )
+
+
+class IdempotencyStore(ABC):
+    """Claims and results per idempotency key, shared by every worker that serves the key."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[IdempotencyRecord]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def claim(self, key: str, record: IdempotencyRecord, ttl: float) -> bool:
+        """Store an in-progress `record` only if the key is free; the claim expires after `ttl`."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def complete(self, key: str, record: IdempotencyRecord, ttl: float) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def release(self, key: str, owner: str) -> None:
+        """Drop an in-progress claim held by `owner` so the request can be retried."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
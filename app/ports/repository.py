@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 from uuid import UUID
 from typing import Optional
-from app.domain.models import Payment
+from app.domain.models import Payment, PaymentStatus
 
 class PaymentRepository(ABC):
     @abstractmethod
@@ -14,4 +14,15 @@ class PaymentRepository(ABC):
 
     @abstractmethod
     async def update(self, payment: Payment) -> Payment:
+        """Write `payment` if it is still at `payment.version`; raises StalePaymentError otherwise."""
+        pass
+
+    @abstractmethod
+    async def transition(
+        self,
+        payment_id: UUID,
+        expected: PaymentStatus,
+        new: PaymentStatus,
+    ) -> Optional[Payment]:
+        """Atomically move a payment from `expected` to `new`; None when it was not in `expected`."""
         pass
@@ -0,0 +1,23 @@
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Sequence
+
+from app.core.payments.types import TransferListFilters
+
+EXPORT_DATASETS = ("transfers", "transfer_events")
+
+
+class TransferExportSource(ABC):
+    """Produces export rows in bounded batches; never materializes the full result."""
+
+    @abstractmethod
+    def columns(self, dataset: str) -> Sequence[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def batches(
+        self,
+        dataset: str,
+        filters: TransferListFilters,
+        batch_size: int,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        raise NotImplementedError
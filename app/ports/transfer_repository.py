@@ -1,20 +1,76 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Dict, List, Optional, Sequence
 from uuid import UUID
 
-from app.core.payments.types import PaymentData
+from app.core.payments.pagination import TransferCursor
+from app.core.payments.types import PaymentData, TransferListFilters, TransferPage
+
+
+class DuplicateOriginId(ValueError):
+    """The originId already belongs to another transfer."""
+
+    def __init__(self, origin_id: str):
+        super().__init__(f"A transfer with originId {origin_id} already exists")
+        self.origin_id = origin_id
 
 
 class TransferRepository(ABC):
+    # Whether a worker dispatches the transfers saved with `dispatch`; without one,
+    # callers must not accept transfers for later delivery
+    has_outbox_worker: bool = True
+
     @abstractmethod
-    async def save(self, data: PaymentData) -> PaymentData:
-        """Persist or update a transfer request."""
+    async def save(self, data: PaymentData, dispatch: bool = False) -> PaymentData:
+        """Persist or update a transfer request.
+
+        With `dispatch`, an outbox row for the worker is written in the same transaction.
+        Raises DuplicateOriginId when the origin_id belongs to a different payment.
+        """
         raise NotImplementedError
 
+    async def save_many(self, items: Sequence[PaymentData], dispatch: bool = False) -> List[PaymentData]:
+        """Batch variant of save, in input order; adapters override it with bulk writes."""
+        return [await self.save(data, dispatch=dispatch) for data in items]
+
+    async def commit(self) -> None:
+        """Make the saves so far durable before the caller reports them; no-op without transactions."""
+
     @abstractmethod
     async def get_by_origin_id(self, origin_id: str) -> Optional[PaymentData]:
         raise NotImplementedError
 
+    async def get_payment_ids_by_origin_ids(self, origin_ids: Sequence[str]) -> Dict[str, UUID]:
+        """payment_id of each origin_id already taken; adapters override it with a single lookup."""
+        taken = {}
+        for origin_id in origin_ids:
+            existing = await self.get_by_origin_id(origin_id)
+            if existing is not None:
+                taken[origin_id] = existing.payment_id
+        return taken
+
     @abstractmethod
     async def get_by_payment_id(self, payment_id: UUID) -> Optional[PaymentData]:
         raise NotImplementedError
+
+    @abstractmethod
+    async def schedule_retry(self, payment_id: UUID, delay: float, error: str, count_attempt: bool = True) -> None:
+        """Make an accepted transfer due for another dispatch attempt in `delay` seconds.
+
+        Worker claims count their attempt when claiming, and pass `count_attempt=False`.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def mark_dispatched(self, payment_id: UUID) -> None:
+        """The worker settled an accepted transfer; it is not claimed again."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def list_transfers(
+        self,
+        filters: TransferListFilters,
+        limit: int,
+        cursor: Optional[TransferCursor] = None,
+    ) -> TransferPage:
+        """Newest first, `limit` summaries after `cursor`; `next_cursor` is set when more remain."""
+        raise NotImplementedError
@@ -0,0 +1,146 @@
+"""Outbox relay and batched transfer dispatch for asynchronously accepted transfers."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from app.adapters.db.payload_store import PayloadStore
+from app.adapters.db.sql_transfer_repository import SqlAlchemyTransferRepository
+from app.adapters.db.transfer_outbox import claim_pending, claim_unpublished, has_due
+from app.core.connectors.interface import ConnectorIntegration, ConnectorUnavailable
+from app.core.payments.operation import PaymentOperation
+from app.core.payments.retry import RetryPolicy, default_retry_policy, describe_failure, is_retryable
+from app.core.payments.types import PaymentData, PaymentState
+from app.db.session import set_current_tenant, tenant_session
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+async def relay_outbox(
+    tenant: str,
+    publish: Callable[[str], None],
+    batch_size: Optional[int] = None,
+) -> int:
+    """Mark every unpublished outbox row of `tenant` as published and wake a worker for them.
+
+    Workers claim transfers themselves, so the message only says which tenant has
+    work. It is sent before the batch commits: a crash in between sends it again,
+    which at worst wakes a worker that finds nothing to claim.
+    """
+    batch_size = batch_size or settings.outbox_relay_batch_size
+    published = 0
+    while True:
+        async with tenant_session(tenant) as session:
+            rows = await claim_unpublished(session, batch_size)
+            # Nothing new, but retries may have come due since the last tick
+            if rows or (not published and await has_due(session)):
+                publish(tenant)
+        published += len(rows)
+        if len(rows) < batch_size:
+            return published
+
+
+class TransferDispatcher:
+    """Claims CREATED transfers in batches and calls the bank with bounded concurrency.
+
+    Up to `limit` bank calls run at once (the semaphore is shared by everything using
+    the same connector in this process) and `prefetch` more transfers are claimed
+    ahead, so a free slot never waits on the claim query. The queue is refilled
+    whenever the backlog drops to `limit`, and draining stops once a claim comes back
+    short. Claims are leases of `lease` seconds: whatever this worker has not settled
+    or rescheduled by then is claimed again by another one.
+    """
+
+    def __init__(
+        self,
+        tenant: str,
+        connector: ConnectorIntegration,
+        semaphore: asyncio.Semaphore,
+        limit: int,
+        prefetch: Optional[int] = None,
+        payload_store: Optional[PayloadStore] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        lease: Optional[float] = None,
+    ) -> None:
+        self.tenant = tenant
+        self.connector = connector
+        self.semaphore = semaphore
+        self.limit = limit
+        self.prefetch = settings.worker_prefetch if prefetch is None else prefetch
+        self.payload_store = payload_store
+        self.retry_policy = retry_policy or default_retry_policy()
+        self.lease = settings.worker_claim_lease if lease is None else lease
+
+    async def drain(self) -> Dict[str, int]:
+        set_current_tenant(self.tenant)
+        stats = {"claimed": 0, "sent": 0, "retried": 0, "failed": 0}
+        pending: Set[asyncio.Task] = set()
+        exhausted = False
+        while True:
+            if not exhausted and len(pending) <= self.limit:
+                room = self.limit + self.prefetch - len(pending)
+                claimed, batch = await self._claim(room)
+                exhausted = claimed < room
+                stats["claimed"] += claimed
+                pending.update(asyncio.create_task(self._send(data, attempt)) for data, attempt in batch)
+            if not pending:
+                return stats
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                stats[task.result()] += 1
+
+    async def _claim(self, limit: int) -> Tuple[int, List[Tuple[PaymentData, int]]]:
+        """(rows claimed, transfers still to send with the attempt number of this claim)."""
+        async with tenant_session(self.tenant) as session:
+            rows = await claim_pending(session, limit, self.lease)
+            attempts = {row.payment_id: row.attempts for row in rows}
+            repository = SqlAlchemyTransferRepository(session, payload_store=self.payload_store)
+            transfers = await repository.get_by_payment_ids(list(attempts))
+            ready = [data for data in transfers if data.status == PaymentState.CREATED]
+            # A transfer already settled by another path is not sent, nor claimed again
+            for payment_id in attempts.keys() - {data.payment_id for data in ready}:
+                await repository.mark_dispatched(payment_id)
+        return len(rows), [(data, attempts[data.payment_id]) for data in ready]
+
+    async def _send(self, data: PaymentData, attempt: int) -> str:
+        if self.retry_policy.exhausted(attempt - 1):
+            # The claim at the retry limit ran out its lease: its worker died mid-dispatch
+            return await self._give_up(data, attempt - 1, "Dispatch did not finish within the claim lease")
+        async with self.semaphore:
+            try:
+                async with tenant_session(self.tenant) as session:
+                    repository = SqlAlchemyTransferRepository(session, payload_store=self.payload_store)
+                    await PaymentOperation(transfer_repository=repository).dispatch(data, self.connector)
+                    await repository.mark_dispatched(data.payment_id)
+                return "sent"
+            except Exception as exc:
+                return await self._handle_failure(data, attempt, exc)
+
+    async def _give_up(self, data: PaymentData, attempts: int, error: str) -> str:
+        logger.warning("Transfer %s failed after %d attempt(s): %s", data.origin_id, attempts, error)
+        async with tenant_session(self.tenant) as session:
+            repository = SqlAlchemyTransferRepository(session, payload_store=self.payload_store)
+            await PaymentOperation(transfer_repository=repository).fail(data, error)
+            await repository.mark_dispatched(data.payment_id)
+        return "failed"
+
+    async def _handle_failure(self, data: PaymentData, attempt: int, exc: Exception) -> str:
+        error = describe_failure(exc)
+        # A 4xx is the bank's final answer; anything else (including our own errors) is retried
+        rejected = isinstance(exc, httpx.HTTPStatusError) and not is_retryable(exc)
+        if rejected or self.retry_policy.exhausted(attempt):
+            return await self._give_up(data, attempt, error)
+        async with tenant_session(self.tenant) as session:
+            repository = SqlAlchemyTransferRepository(session, payload_store=self.payload_store)
+            delay = self.retry_policy.delay(attempt)
+            if isinstance(exc, ConnectorUnavailable):
+                delay = max(delay, exc.retry_after)
+            if not isinstance(exc, httpx.HTTPError):
+                logger.exception("Dispatch failed for transfer %s (tenant %s)", data.origin_id, self.tenant)
+            await repository.schedule_retry(data.payment_id, delay, error, count_attempt=False)
+        return "retried"
@@ -0,0 +1,90 @@
+"""Per-process asyncio runtime for Celery tasks.
+
+Prefork workers run one task at a time per child process. Reusing a single event
+loop per child keeps the tenant engine pools, the connector's HTTP pool and its
+token cache alive between tasks; asyncio.run per task would rebuild all of them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Coroutine, Dict, Optional, TypeVar
+
+from celery.signals import worker_process_shutdown
+
+from app.adapters.api.dependencies import build_transfer_connector
+from app.adapters.db.payload_store import PayloadStore, build_payload_store
+from app.core.connectors.interface import ConnectorIntegration
+from app.db.session import dispose_engines
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def connector_limits() -> Dict[str, int]:
+    limits: Dict[str, int] = {}
+    for item in settings.worker_connector_limits.split(","):
+        name, _, limit = item.partition("=")
+        if name.strip() and limit.strip():
+            limits[name.strip()] = int(limit)
+    return limits
+
+
+class WorkerRuntime:
+    def __init__(self) -> None:
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._connector: Optional[ConnectorIntegration] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.payload_store: Optional[PayloadStore] = build_payload_store()
+
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        if self.loop is None or self.loop.is_closed():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+        return self.loop.run_until_complete(coroutine)
+
+    async def connector(self) -> ConnectorIntegration:
+        if self._connector is None:
+            connector = build_transfer_connector()
+            await connector.startup()
+            self._connector = connector
+        return self._connector
+
+    def limit(self, connector: ConnectorIntegration) -> int:
+        return connector_limits().get(connector.name, settings.worker_connector_concurrency)
+
+    def semaphore(self, connector: ConnectorIntegration) -> asyncio.Semaphore:
+        # Created on the runtime loop and shared by every task of this process
+        if connector.name not in self._semaphores:
+            self._semaphores[connector.name] = asyncio.Semaphore(self.limit(connector))
+        return self._semaphores[connector.name]
+
+    def close(self) -> None:
+        if self.loop is None or self.loop.is_closed():
+            return
+        try:
+            self.loop.run_until_complete(self._release())
+        finally:
+            self.loop.close()
+            self.loop = None
+
+    async def _release(self) -> None:
+        if self._connector is not None:
+            await self._connector.shutdown()
+            self._connector = None
+        self._semaphores.clear()
+        await dispose_engines()
+
+
+runtime = WorkerRuntime()
+
+
+@worker_process_shutdown.connect
+def _close_runtime(**kwargs: Any) -> None:
+    try:
+        runtime.close()
+    except Exception:
+        logger.exception("Failed to close the worker runtime cleanly")
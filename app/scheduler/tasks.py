@@ -1,5 +1,38 @@
+from typing import Dict
+
+from app.db.partitions import configured_tenants, maintain_partitions
+from app.scheduler.dispatch import TransferDispatcher, relay_outbox
+from app.scheduler.runtime import runtime
 from app.scheduler.worker import celery_app
 
+
+@celery_app.task
+def maintain_transfer_partitions():
+    return runtime.run(maintain_partitions())
+
+
 @celery_app.task
-def process_payment_background(payment_id: str):
-    print(f"Processing payment {payment_id} in background")
+def relay_transfer_outbox():
+    def publish(tenant: str) -> None:
+        drain_transfer_outbox.delay(tenant)
+
+    async def run():
+        return {tenant: await relay_outbox(tenant, publish) for tenant in configured_tenants()}
+
+    return runtime.run(run())
+
+
+@celery_app.task
+def drain_transfer_outbox(tenant: str) -> Dict[str, int]:
+    async def run():
+        connector = await runtime.connector()
+        dispatcher = TransferDispatcher(
+            tenant,
+            connector,
+            semaphore=runtime.semaphore(connector),
+            limit=runtime.limit(connector),
+            payload_store=runtime.payload_store,
+        )
+        return await dispatcher.drain()
+
+    return runtime.run(run())
@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.schedules import crontab
 from config.settings import settings
 
 celery_app = Celery(
@@ -14,4 +15,17 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    # Each drain task already claims its own batch from the database; prefetching more
+    # messages would only park tenants behind a busy child process
+    worker_prefetch_multiplier=1,
+    beat_schedule={
+        "maintain-transfer-partitions": {
+            "task": "app.scheduler.tasks.maintain_transfer_partitions",
+            "schedule": crontab(minute=0, hour=3),
+        },
+        "relay-transfer-outbox": {
+            "task": "app.scheduler.tasks.relay_transfer_outbox",
+            "schedule": settings.outbox_relay_interval,
+        },
+    },
 )
@@ -14,21 +14,16 @@ class PaymentService:
         return await self.repository.create(payment)
 
     async def process_payment(self, payment_id: UUID) -> Optional[Payment]:
-        payment = await self.repository.get_by_id(payment_id)
-        if not payment:
-            return None
-
-        if payment.status != PaymentStatus.PENDING:
-            return payment  # Already processed
+        # Claim the payment first so only one caller ever reaches the gateway
+        payment = await self.repository.transition(payment_id, PaymentStatus.PENDING, PaymentStatus.PROCESSING)
+        if payment is None:
+            return await self.repository.get_by_id(payment_id)  # Missing, or already claimed
 
         success = await self.gateway.process_payment(payment)
-        
-        if success:
-            payment.status = PaymentStatus.COMPLETED
-        else:
-            payment.status = PaymentStatus.FAILED
+        outcome = PaymentStatus.COMPLETED if success else PaymentStatus.FAILED
 
-        return await self.repository.update(payment)
+        settled = await self.repository.transition(payment_id, PaymentStatus.PROCESSING, outcome)
+        return settled or await self.repository.get_by_id(payment_id)
 
     async def get_payment(self, payment_id: UUID) -> Optional[Payment]:
         return await self.repository.get_by_id(payment_id)
@@ -0,0 +1,382 @@
+"""End-to-end load test of the gateway API against a simulated Banco de Comercio.
+
+Workers pick operations from a weighted mix for a fixed duration and time each
+request; the report has throughput and p50/p95/p99 latency, overall and per
+operation. The app runs in-process over httpx.ASGITransport (lifespan included)
+or in a uvicorn subprocess, with either persistence backend. The bank is the
+mock connector's simulated bank with one of its latency/failure profiles, or
+with `--bank standin` the real connector talking HTTP to a stand-in server:
+
+    python -m benchmarks.loadtest --persistence memory --concurrency 32 --duration 20
+    DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.loadtest --persistence database --server uvicorn
+    python -m benchmarks.loadtest --bank-profile long_tail --seed 7
+    python -m benchmarks.loadtest --bank standin --bank-profile typical
+
+Operations: `create` (POST /payments), `process` (POST /payments/{id}/process on
+a payment created earlier), `transfer` (POST /transfers) and `get`
+(GET /transfers/{originId} on a transfer registered earlier). `process` and `get`
+fall back to `create` and `transfer` until there is something to read.
+
+`--save-baseline PATH` writes the report as JSON; `--baseline PATH` compares
+against it and exits 1 when throughput drops, or p99 grows, by more than the
+thresholds. Database mode needs a migrated database (`alembic upgrade head`).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import httpx
+
+from app.core.connectors.mock_banco_comercio import BEHAVIOUR_PROFILES
+from app.core.metrics import LatencyHistogram
+from config.settings import settings
+
+DEFAULT_MIX = "create=1,process=1,transfer=3,get=3"
+OPERATIONS = ("create", "process", "transfer", "get")
+STANDIN_SECRET_KEY = "loadtest-secret"
+
+TRANSFER_TEMPLATE = {
+    "source": {
+        "addressType": "CBU_CVU",
+        "address": "0000000000000000000000",
+        "owner": {"personIdType": "CUI", "personId": "20304050607", "personName": "John Doe"},
+    },
+    "destination": {
+        "addressType": "CBU_CVU",
+        "address": "9999999999999999999999",
+        "owner": {"personIdType": "CUI", "personId": "20987654321", "personName": "Jane Roe"},
+    },
+    "body": {"amount": "123.45", "currency": "ARS", "description": "Load test", "concept": "VAR"},
+}
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    mix: Dict[str, int] = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation {name!r}; expected one of {', '.join(OPERATIONS)}")
+        mix[name] = int(weight or 1)
+    if not any(mix.values()):
+        raise ValueError("The request mix needs at least one operation with a positive weight")
+    return mix
+
+
+class LoadState:
+    """Ids created during the run, for the operations that need an existing payment or transfer."""
+
+    def __init__(self) -> None:
+        self.unprocessed: List[str] = []
+        self.origin_ids: List[str] = []
+
+
+async def _create(client: httpx.AsyncClient, state: LoadState, rng: random.Random) -> httpx.Response:
+    response = await client.post("/api/v1/payments", json={"amount": 100.0, "currency": "USD"})
+    if response.status_code == 200:
+        state.unprocessed.append(response.json()["id"])
+    return response
+
+
+async def _process(client: httpx.AsyncClient, state: LoadState, rng: random.Random) -> httpx.Response:
+    payment_id = state.unprocessed.pop()
+    return await client.post(f"/api/v1/payments/{payment_id}/process")
+
+
+async def _transfer(client: httpx.AsyncClient, state: LoadState, rng: random.Random) -> httpx.Response:
+    origin_id = uuid4().hex
+    payload = {**TRANSFER_TEMPLATE, "originId": origin_id}
+    response = await client.post("/api/v1/transfers", json=payload)
+    if response.status_code in (200, 202):
+        state.origin_ids.append(origin_id)
+    return response
+
+
+async def _get(client: httpx.AsyncClient, state: LoadState, rng: random.Random) -> httpx.Response:
+    return await client.get(f"/api/v1/transfers/{rng.choice(state.origin_ids)}")
+
+
+_HANDLERS: Dict[str, Callable[[httpx.AsyncClient, LoadState, random.Random], Awaitable[httpx.Response]]] = {
+    "create": _create,
+    "process": _process,
+    "transfer": _transfer,
+    "get": _get,
+}
+
+
+def _resolve(operation: str, state: LoadState) -> str:
+    if operation == "process" and not state.unprocessed:
+        return "create"
+    if operation == "get" and not state.origin_ids:
+        return "transfer"
+    return operation
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    mix: Dict[str, int],
+    concurrency: int,
+    duration: float,
+    seed: int,
+    state: Optional[LoadState] = None,
+) -> Dict[str, Any]:
+    """Run `concurrency` closed-loop workers for `duration` seconds and summarise them."""
+    state = state or LoadState()
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+    histograms = {name: LatencyHistogram() for name in OPERATIONS}
+    overall = LatencyHistogram()
+    errors = {name: 0 for name in OPERATIONS}
+
+    async def worker(index: int) -> None:
+        # One generator per worker keeps each worker's sequence reproducible under a seed
+        rng = random.Random(seed * 1000 + index)
+        while time.perf_counter() < deadline:
+            operation = _resolve(rng.choices(names, weights)[0], state)
+            started = time.perf_counter_ns()
+            try:
+                response = await _HANDLERS[operation](client, state, rng)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            micros = (time.perf_counter_ns() - started) // 1000
+            histograms[operation].record(micros)
+            overall.record(micros)
+            errors[operation] += failed
+
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": overall.count,
+        "errors": sum(errors.values()),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput": round(overall.count / elapsed, 1),
+        "latency_ms": _percentiles(overall),
+        "operations": {
+            name: {"requests": histogram.count, "errors": errors[name], "latency_ms": _percentiles(histogram)}
+            for name, histogram in histograms.items()
+            if histogram.count
+        },
+    }
+
+
+def _percentiles(histogram: LatencyHistogram) -> Dict[str, float]:
+    return {label: round(histogram.percentile(quantile) * 1000, 3) for label, quantile in (
+        ("p50", 0.50), ("p95", 0.95), ("p99", 0.99),
+    )}
+
+
+@asynccontextmanager
+async def asgi_client(app_settings: Dict[str, Any], concurrency: int) -> AsyncIterator[httpx.AsyncClient]:
+    # app.main picks repositories and the connector at import time
+    for name, value in app_settings.items():
+        setattr(settings, name, value)
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+            yield client
+
+
+@asynccontextmanager
+async def uvicorn_client(app_settings: Dict[str, Any], concurrency: int) -> AsyncIterator[httpx.AsyncClient]:
+    port = _free_port()
+    server = _spawn(
+        ["uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning", "--no-access-log"], app_settings
+    )
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits) as client:
+            await _wait_until_serving(client, server, "/health")
+            yield client
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+@asynccontextmanager
+async def standin_bank(profile: str, seed: int) -> AsyncIterator[str]:
+    """Run the Banco de Comercio stand-in in a subprocess and yield its base URL."""
+    port = _free_port()
+    server = _spawn(
+        [
+            "app.core.connectors.banco_comercio_standin",
+            "--port", str(port),
+            "--profile", profile,
+            "--seed", str(seed),
+            "--secret-key", STANDIN_SECRET_KEY,
+        ],
+        {},
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            # Any answer will do: the stand-in has no health endpoint
+            await _wait_until_serving(client, server, "/")
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def _app_settings(args: argparse.Namespace, bank_url: Optional[str]) -> Dict[str, Any]:
+    values: Dict[str, Any] = {
+        "persistence_backend": args.persistence,
+        "transfer_connector_mode": "mock",
+        "mock_bank_profile": args.bank_profile,
+        "mock_bank_seed": args.seed,
+    }
+    if bank_url is not None:
+        values.update(transfer_connector_mode="banco_comercio", bdc_base_url=bank_url, bdc_secret_key=STANDIN_SECRET_KEY)
+    return values
+
+
+def _spawn(module_args: List[str], app_settings: Dict[str, Any]) -> subprocess.Popen:
+    env = {**os.environ, **{name.upper(): str(value) for name, value in app_settings.items()}}
+    return subprocess.Popen([sys.executable, "-m", *module_args], env=env)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_until_serving(
+    client: httpx.AsyncClient, server: subprocess.Popen, path: str, timeout: float = 30.0
+) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"{server.args[2]} exited with code {server.returncode}")
+        try:
+            await client.get(path)
+            return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"{server.args[2]} did not start in time")
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], throughput_drop: float, p99_growth: float) -> List[str]:
+    """Regressions of `report` against `baseline`, as human-readable lines (empty when none)."""
+    regressions = []
+    floor = baseline["throughput"] * (1 - throughput_drop)
+    if report["throughput"] < floor:
+        regressions.append(
+            f"throughput {report['throughput']} req/s is below {floor:.1f} "
+            f"(baseline {baseline['throughput']}, -{throughput_drop:.0%} allowed)"
+        )
+    ceiling = baseline["latency_ms"]["p99"] * (1 + p99_growth)
+    if report["latency_ms"]["p99"] > ceiling:
+        regressions.append(
+            f"p99 {report['latency_ms']['p99']} ms is above {ceiling:.3f} ms "
+            f"(baseline {baseline['latency_ms']['p99']}, +{p99_growth:.0%} allowed)"
+        )
+    return regressions
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    config = report["config"]
+    print(
+        f"persistence={config['persistence']} server={config['server']} concurrency={config['concurrency']} "
+        f"duration={config['duration']}s mix={config['mix']} bank={config['bank']}:{config['bank_profile']}"
+    )
+    print(f"{'operation':<10} {'requests':>9} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows: List[Tuple[str, Dict[str, Any]]] = list(report["operations"].items()) + [("total", report)]
+    for name, row in rows:
+        latency = row["latency_ms"]
+        print(
+            f"{name:<10} {row['requests']:>9} {row['errors']:>7} "
+            f"{latency['p50']:>9.3f} {latency['p95']:>9.3f} {latency['p99']:>9.3f}"
+        )
+    print(f"throughput: {report['throughput']} req/s")
+
+
+async def main(args: argparse.Namespace) -> int:
+    mix = parse_mix(args.mix)
+    open_client = uvicorn_client if args.server == "uvicorn" else asgi_client
+    state = LoadState()
+    async with AsyncExitStack() as stack:
+        bank_url = None
+        if args.bank == "standin":
+            bank_url = await stack.enter_async_context(standin_bank(args.bank_profile, args.seed))
+        client = await stack.enter_async_context(open_client(_app_settings(args, bank_url), args.concurrency))
+        if args.warmup > 0:
+            await drive(client, mix, args.concurrency, args.warmup, args.seed, state)
+        report = await drive(client, mix, args.concurrency, args.duration, args.seed, state)
+    report["config"] = {
+        "persistence": args.persistence,
+        "server": args.server,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "mix": args.mix,
+        "bank": args.bank,
+        "bank_profile": args.bank_profile,
+        "seed": args.seed,
+    }
+    _print_report(report)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as stream:
+            json.dump(report, stream, indent=2, sort_keys=True)
+            stream.write("\n")
+        print(f"baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as stream:
+            baseline = json.load(stream)
+        keys = ("persistence", "server", "concurrency", "mix", "bank", "bank_profile")
+        if any(baseline.get("config", {}).get(key) != report["config"][key] for key in keys):
+            print(f"note: baseline was recorded with {baseline.get('config')}; numbers may not be comparable")
+        regressions = compare(report, baseline, args.throughput_threshold, args.p99_threshold)
+        for line in regressions:
+            print(f"REGRESSION: {line}")
+        if regressions:
+            return 1
+        print("no regression against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--persistence", choices=("memory", "database"), default="memory")
+    parser.add_argument("--server", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted operations (default {DEFAULT_MIX})")
+    parser.add_argument(
+        "--bank",
+        choices=("mock", "standin"),
+        default="mock",
+        help="mock: in-memory simulated bank; standin: real connector over HTTP to the stand-in server",
+    )
+    parser.add_argument(
+        "--bank-profile",
+        choices=sorted(BEHAVIOUR_PROFILES),
+        default="instant",
+        help="latency and failure profile of the simulated bank (default instant)",
+    )
+    parser.add_argument("--seed", type=int, default=1, help="seeds the request mix and the simulated bank")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--baseline", metavar="PATH")
+    parser.add_argument("--throughput-threshold", type=float, default=0.15, help="allowed throughput drop (fraction)")
+    parser.add_argument("--p99-threshold", type=float, default=0.5, help="allowed p99 growth (fraction)")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args)))
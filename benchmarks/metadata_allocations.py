@@ -0,0 +1,132 @@
+"""Allocation and CPU cost of metadata handling along the transfer persistence path.
+
+Replays the metadata work done per POST /transfers + GET /transfers/{originId}
+(two saves and one read) with the previous deepcopy-based handling and with
+frozen shared snapshots, using InMemoryTransferRepository plus the metadata
+preparation done by SqlAlchemyTransferRepository.
+
+    python -m benchmarks.metadata_allocations --requests 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+from copy import deepcopy
+
+from app.adapters.db.memory_transfer_repository import InMemoryTransferRepository
+from app.core.payments.frozen import EMPTY, freeze
+from app.core.payments.types import PaymentData, PaymentState, TransferRequest
+from app.ports.transfer_repository import TransferRepository
+from benchmarks.transfer_save_roundtrips import SAMPLE_REQUEST
+
+
+class LegacyInMemoryTransferRepository(TransferRepository):
+    """Previous implementation: deep copies on every save and read."""
+
+    def __init__(self):
+        self._by_origin = {}
+        self._by_payment = {}
+
+    async def save(self, data):
+        copy = data.model_copy(deep=True)
+        self._by_origin[copy.origin_id] = copy
+        self._by_payment[copy.payment_id] = copy
+        return copy
+
+    async def get_by_origin_id(self, origin_id):
+        stored = self._by_origin.get(origin_id)
+        return stored.model_copy(deep=True) if stored else None
+
+    async def get_by_payment_id(self, payment_id):
+        stored = self._by_payment.get(payment_id)
+        return stored.model_copy(deep=True) if stored else None
+
+
+def _bank_response(request: dict) -> dict:
+    return {
+        "statusCode": 0,
+        "message": "Simulated transfer accepted",
+        "dest_ori_trx_id": "origin",
+        "data": {"request": request, "originId": "origin", "concept": "VAR"},
+    }
+
+
+async def _legacy_request(repository, request: TransferRequest, index: int) -> None:
+    data = PaymentData(
+        source=request.source,
+        destination=request.destination,
+        transfer_body=request.body,
+        origin_id=f"origin-{index}",
+        metadata={"client_request": request.model_dump(by_alias=True)},
+    )
+    for state in (PaymentState.CREATED, PaymentState.AUTHORIZED):
+        if state is PaymentState.AUTHORIZED:
+            data.metadata["connector_response"] = _bank_response(SAMPLE_REQUEST)
+        data.status = state
+        # SqlAlchemyTransferRepository.save: metadata + connector_response copies, then the reload copies
+        metadata_copy = deepcopy(data.metadata)
+        deepcopy(metadata_copy.get("connector_response", {}))
+        deepcopy(metadata_copy)
+        await repository.save(data)
+    stored = await repository.get_by_origin_id(data.origin_id)
+    deepcopy(stored.metadata)
+
+
+async def _frozen_request(repository, request: TransferRequest, index: int) -> None:
+    data = PaymentData(
+        source=request.source,
+        destination=request.destination,
+        transfer_body=request.body,
+        origin_id=f"origin-{index}",
+        metadata={"client_request": freeze(request.model_dump(by_alias=True))},
+    )
+    for state in (PaymentState.CREATED, PaymentState.AUTHORIZED):
+        if state is PaymentState.AUTHORIZED:
+            data.metadata["connector_response"] = freeze(_bank_response(SAMPLE_REQUEST))
+        data.status = state
+        metadata = freeze(data.metadata)
+        metadata.get("connector_response", EMPTY)
+        dict(metadata)
+        await repository.save(data)
+    stored = await repository.get_by_origin_id(data.origin_id)
+    freeze(stored.metadata)
+
+
+async def _measure(label, handler, repository, requests: int) -> None:
+    request = TransferRequest.model_validate(SAMPLE_REQUEST)
+    began = time.perf_counter()
+    for index in range(requests):
+        await handler(repository, request, index)
+    elapsed = time.perf_counter() - began
+
+    # Transient allocation high-water mark of a single request, on top of what it retains
+    tracemalloc.start()
+    transient = retained = 0
+    for index in range(requests, requests + 200):
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        await handler(repository, request, index)
+        current, peak = tracemalloc.get_traced_memory()
+        transient += peak - start
+        retained += current - start
+    tracemalloc.stop()
+    print(
+        f"{label:9s} time/request={elapsed / requests * 1e6:7.1f} us "
+        f"peak alloc/request={transient / 200 / 1024:6.1f} KiB "
+        f"retained/request={retained / 200 / 1024:6.1f} KiB"
+    )
+
+
+async def main(requests: int) -> None:
+    await _measure("deepcopy", _legacy_request, LegacyInMemoryTransferRepository(), requests)
+    await _measure("frozen", _frozen_request, InMemoryTransferRepository(), requests)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
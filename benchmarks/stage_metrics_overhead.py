@@ -0,0 +1,67 @@
+"""Per-stage cost of the PaymentOperation latency instrumentation.
+
+Times `PaymentOperation._timed` around a no-op stage against awaiting the same
+stage directly, plus a bare `StageMetrics.observe`, and fails when the added
+cost per stage exceeds the budget.
+
+    python -m benchmarks.stage_metrics_overhead --stages 200000 --budget-us 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+
+from app.core.metrics import StageMetrics
+from app.core.payments.operation import PaymentOperation
+
+
+async def _noop() -> None:
+    return None
+
+
+async def _per_stage_ns(operation: PaymentOperation, stages: int, timed: bool) -> float:
+    started = time.perf_counter_ns()
+    if timed:
+        for _ in range(stages):
+            await operation._timed("validate_request", "mock", _noop())
+    else:
+        for _ in range(stages):
+            await _noop()
+    return (time.perf_counter_ns() - started) / stages
+
+
+def _observe_ns(metrics: StageMetrics, stages: int) -> float:
+    started = time.perf_counter_ns()
+    for index in range(stages):
+        metrics.observe("execute_request", "mock", "ok", 1500 + index)
+    return (time.perf_counter_ns() - started) / stages
+
+
+async def main(stages: int, budget_us: float) -> int:
+    metrics = StageMetrics(tenant_of=lambda: "public")
+    operation = PaymentOperation(metrics=metrics)
+
+    # Warm up: first observe creates the histogram
+    await _per_stage_ns(operation, 1000, timed=True)
+    bare = await _per_stage_ns(operation, stages, timed=False)
+    timed = await _per_stage_ns(operation, stages, timed=True)
+    observe = _observe_ns(metrics, stages)
+    overhead_us = (timed - bare) / 1000
+
+    print(f"stages={stages}")
+    print(f"bare stage:           {bare:8.0f} ns")
+    print(f"timed stage:          {timed:8.0f} ns")
+    print(f"StageMetrics.observe: {observe:8.0f} ns")
+    print(f"overhead per stage:   {overhead_us:8.2f} us (budget {budget_us} us)")
+    return 0 if overhead_us <= budget_us else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", type=int, default=200_000)
+    parser.add_argument("--budget-us", type=float, default=5.0)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.stages, args.budget_us)))
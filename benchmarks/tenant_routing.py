@@ -0,0 +1,81 @@
+"""Session throughput with many tenants: SET search_path per session vs per-tenant pools.
+
+The baseline opens a session on a shared engine and runs `SET search_path` before
+the query, as get_db_session did before. The tenant-pool path binds the session
+to `app.db.session` tenant engines, whose connections already carry the
+search_path. Schemas do not need to exist; the query only reads `current_schema()`.
+
+    DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.tenant_routing --tenants 50 --sessions 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.session import dispose_engines, tenant_session
+from config.settings import settings
+
+QUERY = text("SELECT current_schema()")
+
+
+async def _drive(open_session: Callable[[str], Awaitable[None]], tenants: List[str], sessions: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> None:
+        async with semaphore:
+            await open_session(tenants[index % len(tenants)])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(sessions)))
+    return sessions / (time.perf_counter() - started)
+
+
+async def main(tenant_count: int, sessions: int, concurrency: int) -> None:
+    tenants = [f"bench_tenant_{index:03d}" for index in range(tenant_count)]
+    random.shuffle(tenants)
+
+    shared = create_async_engine(settings.DATABASE_URL, pool_size=concurrency, max_overflow=0)
+    factory = async_sessionmaker(shared, class_=AsyncSession, expire_on_commit=False)
+
+    async def set_search_path(tenant: str) -> None:
+        async with factory() as session:
+            await session.execute(text(f"SET search_path TO {tenant}, public"))
+            await session.execute(QUERY)
+            await session.commit()
+
+    async def tenant_pool(tenant: str) -> None:
+        async with tenant_session(tenant) as session:
+            await session.execute(QUERY)
+
+    try:
+        # Warm both paths so pool growth is not part of the measurement
+        await _drive(set_search_path, tenants, len(tenants), concurrency)
+        await _drive(tenant_pool, tenants, len(tenants), concurrency)
+
+        baseline = await _drive(set_search_path, tenants, sessions, concurrency)
+        pooled = await _drive(tenant_pool, tenants, sessions, concurrency)
+    finally:
+        await shared.dispose()
+        await dispose_engines()
+
+    print(f"tenants={tenant_count} sessions={sessions} concurrency={concurrency}")
+    print(f"SET search_path per session: {baseline:10.1f} sessions/s")
+    print(f"per-tenant pools:            {pooled:10.1f} sessions/s ({pooled / baseline:.2f}x)")
+    if tenant_count > settings.db_max_tenant_engines:
+        print(f"note: {tenant_count} tenants exceed DB_MAX_TENANT_ENGINES={settings.db_max_tenant_engines}; pools are being evicted")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenants", type=int, default=20)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.tenants, args.sessions, args.concurrency))
@@ -0,0 +1,176 @@
+"""Round trips and latency of SqlAlchemyTransferRepository.save against PostgreSQL.
+
+Compares the single-statement upsert path with the previous ORM path
+(get payment, flush/refresh, select transfer, flush event, reload).
+
+    DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.transfer_save_roundtrips --transfers 200
+
+Requires a migrated database (`alembic upgrade head`). Everything runs inside
+a transaction that is rolled back at the end.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from copy import deepcopy
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Callable, List
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.adapters.db.sql_transfer_repository import SqlAlchemyTransferRepository
+from app.core.payments.types import PaymentData, PaymentState, TransferRequest
+from app.db.models import PaymentRecord, TransferEventRecord, TransferRecord
+from app.domain.models import PaymentStatus
+from config.settings import settings
+
+SAMPLE_REQUEST = {
+    "source": {
+        "addressType": "CBU_CVU",
+        "address": "0000000000000000000000",
+        "owner": {"personIdType": "CUI", "personId": "20304050607", "personName": "John Doe"},
+    },
+    "destination": {
+        "addressType": "CBU_CVU",
+        "address": "9999999999999999999999",
+        "owner": {"personIdType": "CUI", "personId": "20987654321", "personName": "Jane Roe"},
+    },
+    "body": {"amount": "123.45", "currency": "ARS", "description": "Benchmark", "concept": "VAR"},
+}
+
+
+class LegacyTransferRepository(SqlAlchemyTransferRepository):
+    """The ORM write path used before the upsert statement, kept here as the baseline."""
+
+    async def save(self, data: PaymentData) -> PaymentData:
+        payment_record = await self.session.get(PaymentRecord, data.payment_id)
+        if payment_record is None:
+            payment_record = PaymentRecord(
+                id=data.payment_id,
+                amount=Decimal(str(data.amount)),
+                currency=data.currency,
+                status=PaymentStatus.PENDING,
+                description=data.description,
+                metadata=deepcopy(data.metadata or {}),
+            )
+            self.session.add(payment_record)
+            await self.session.flush()
+            await self.session.refresh(payment_record)
+
+        record = await self._get_transfer_by_payment_id(data.payment_id)
+        body = data.transfer_body
+        metadata_copy = deepcopy(data.metadata or {})
+        connector_response = deepcopy(metadata_copy.get("connector_response", {}))
+        if record is None:
+            record = TransferRecord(
+                payment=payment_record,
+                payment_id=payment_record.id,
+                origin_id=data.origin_id,
+                status=data.status,
+                amount=Decimal(str(data.amount)),
+                currency=data.currency,
+                concept=body.concept,
+                description=data.description or body.description,
+                connector_id=data.connector_id,
+                source_address=data.source.address,
+                source_address_type=data.source.address_type,
+                source_owner_id_type=data.source.owner.person_id_type,
+                source_owner_id=data.source.owner.person_id,
+                source_owner_name=data.source.owner.person_name,
+                destination_address=data.destination.address,
+                destination_address_type=data.destination.address_type,
+                destination_owner_id_type=data.destination.owner.person_id_type,
+                destination_owner_id=data.destination.owner.person_id,
+                destination_owner_name=data.destination.owner.person_name,
+                metadata=metadata_copy,
+                connector_response=connector_response,
+            )
+            self.session.add(record)
+        else:
+            record.status = data.status
+            record.metadata = metadata_copy
+            record.connector_response = connector_response
+            record.updated_at = datetime.now(timezone.utc)
+
+        self.session.add(
+            TransferEventRecord(
+                transfer=record,
+                status=data.status,
+                message=metadata_copy.get("error_message"),
+                payload={"status": data.status.value, "metadata": metadata_copy, "connector_response": connector_response},
+            )
+        )
+        await self.session.flush()
+        record = await self._get_transfer_by_payment_id(data.payment_id)
+        return self._record_to_payment_data(record)
+
+
+async def _run(
+    session: AsyncSession,
+    repository_factory: Callable[[AsyncSession], SqlAlchemyTransferRepository],
+    counter: List[int],
+    transfers: int,
+) -> tuple[float, List[float]]:
+    request = TransferRequest.model_validate(SAMPLE_REQUEST)
+    latencies: List[float] = []
+    start_count = counter[0]
+    for index in range(transfers):
+        data = PaymentData(
+            source=request.source,
+            destination=request.destination,
+            transfer_body=request.body,
+            description=request.body.description,
+            origin_id=f"bench-{time.time_ns()}-{index}",
+            metadata={"client_request": request.model_dump(by_alias=True, mode="json")},
+        )
+        for state in (PaymentState.CREATED, PaymentState.AUTHORIZED):
+            data.status = state
+            if state is PaymentState.AUTHORIZED:
+                data.metadata["connector_response"] = {"statusCode": 0, "data": {"request": SAMPLE_REQUEST}}
+            repository = repository_factory(session)
+            began = time.perf_counter()
+            await repository.save(data)
+            latencies.append((time.perf_counter() - began) * 1000)
+    saves = transfers * 2
+    return (counter[0] - start_count) / saves, latencies
+
+
+async def main(transfers: int) -> None:
+    engine = create_async_engine(settings.DATABASE_URL)
+    counter = [0]
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counter[0] += 1
+
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        session = AsyncSession(bind=connection, expire_on_commit=False, autoflush=False)
+        try:
+            for label, factory in (
+                ("legacy ORM path", LegacyTransferRepository),
+                ("upsert CTE path", SqlAlchemyTransferRepository),
+            ):
+                round_trips, latencies = await _run(session, factory, counter, transfers)
+                latencies.sort()
+                print(
+                    f"{label:16s} round trips/save={round_trips:.2f} "
+                    f"p50={statistics.median(latencies):.2f}ms "
+                    f"p95={latencies[int(len(latencies) * 0.95) - 1]:.2f}ms"
+                )
+        finally:
+            await session.close()
+            await transaction.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transfers", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.transfers))
@@ -3,6 +3,8 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite:///./app.db"
+    # Optional streaming replica for read-only endpoints
+    DATABASE_REPLICA_URL: Optional[str] = None
     REDIS_URL: str = "redis://localhost:6379/0"
 
     # Security
@@ -19,7 +21,122 @@ class Settings(BaseSettings):
     bdc_client_secret: str = ""
     bdc_secret_key: str = ""
     transfer_connector_mode: str = "mock"
+    # Simulated bank used in mock mode: instant, typical, long_tail, flaky or rate_limited
+    mock_bank_profile: str = "instant"
+    mock_bank_seed: int = 0
     persistence_backend: str = "database"
+
+    # Banco Comercio HTTP client (shared keep-alive pool)
+    bdc_http2: bool = False
+    bdc_pool_max_connections: int = 100
+    bdc_pool_max_keepalive: int = 20
+    bdc_keepalive_expiry: float = 30.0
+    bdc_connect_timeout: float = 5.0
+    bdc_read_timeout: float = 30.0
+    bdc_write_timeout: float = 10.0
+    bdc_pool_timeout: float = 5.0
+    bdc_auth_timeout: float = 10.0
+
+    # Banco Comercio access token cache ("none", "memory" or "redis" shared store)
+    bdc_token_store: str = "none"
+    bdc_token_refresh_margin: float = 60.0
+    bdc_token_default_ttl: float = 300.0
+
+    # transfer_events write-behind (off: events are written inside the request transaction)
+    transfer_events_write_behind: bool = False
+    transfer_events_batch_size: int = 500
+    transfer_events_flush_interval: float = 0.5
+    transfer_events_max_buffered: int = 10000
+    transfer_events_use_copy: bool = False
+    transfer_events_flush_on_shutdown: bool = True
+
+    # SQL logging: echo every statement (development only) and warn about statements slower
+    # than db_slow_query_seconds, with parameters redacted to their types
+    db_echo: bool = False
+    db_slow_query_seconds: float = 0.5
+    db_slow_query_log_chars: int = 2000
+    db_query_stats_headers: bool = True
+
+    # Per-tenant engines: each keeps a small pool whose connections carry the tenant search_path
+    db_max_tenant_engines: int = 32
+    db_tenant_pool_size: int = 2
+    db_tenant_max_overflow: int = 3
+
+    # Read replica routing: primary for a while after a tenant writes, or when the replica lags/fails
+    db_replica_read_your_writes_seconds: float = 5.0
+    db_replica_max_lag_seconds: float = 5.0
+    db_replica_lag_check_interval: float = 1.0
+    db_replica_retry_after: float = 10.0
+
+    # GET /transfers/{origin_id} cache ("none", "memory" or "redis" as shared second tier)
+    transfer_cache_backend: str = "memory"
+    transfer_cache_max_entries: int = 10000
+    transfer_cache_ttl: float = 2.0
+    transfer_cache_terminal_ttl: float = 300.0
+
+    # Asynchronous acceptance: POST /transfers answers 202 and a Celery worker calls the bank
+    # (also per request with "Prefer: respond-async"); the relay runs every interval seconds
+    transfer_async_acceptance: bool = False
+    outbox_relay_interval: float = 2.0
+    outbox_relay_batch_size: int = 500
+
+    # Transfer worker: concurrent bank calls per connector and process ("name=limit,..." overrides
+    # the default), plus how many extra transfers to claim ahead so no slot waits on the database
+    worker_connector_concurrency: int = 8
+    worker_connector_limits: str = ""
+    worker_prefetch: int = 8
+    # A claim leases the transfer for this many seconds; if the worker dies before
+    # finishing it, another worker claims it again once the lease runs out
+    worker_claim_lease: float = 300.0
+
+    # POST /transfers/batch: items per request and concurrent bank calls per batch
+    transfer_batch_max_items: int = 1000
+    transfer_batch_concurrency: int = 16
+
+    # Transient bank failures (timeouts, connection errors, 5xx, 429) are retried from
+    # transfer_outbox with jittered exponential backoff; after max_attempts the transfer FAILS
+    transfer_retry_max_attempts: int = 8
+    transfer_retry_base_delay: float = 2.0
+    transfer_retry_max_delay: float = 600.0
+
+    # Connector circuit breaker (over the last `window` calls) and AIMD concurrency limit per
+    # process; calls slower than slow_call_seconds count against both
+    connector_resilience_enabled: bool = True
+    connector_slow_call_seconds: float = 5.0
+    connector_breaker_failure_rate: float = 0.5
+    connector_breaker_slow_call_rate: float = 0.8
+    connector_breaker_window: int = 20
+    connector_breaker_min_calls: int = 10
+    connector_breaker_open_seconds: float = 30.0
+    connector_breaker_half_open_calls: int = 3
+    connector_limit_initial: int = 20
+    connector_limit_min: int = 2
+    connector_limit_max: int = 200
+    connector_limit_max_wait: float = 1.0
+
+    # Idempotency-Key handling for POST /transfers ("none", "memory" or "redis" via REDIS_URL).
+    # lock_ttl bounds how long a crashed worker's claim blocks retries of the same key.
+    idempotency_backend: str = "memory"
+    idempotency_ttl: float = 86400.0
+    idempotency_lock_ttl: float = 60.0
+    idempotency_wait_timeout: float = 30.0
+
+    # Content-addressed payload_blobs for client requests/connector responses (opt-in);
+    # compression is "gzip", "zstd" (needs the optional zstandard package on every
+    # instance that reads the blobs) or "identity"
+    payload_store_enabled: bool = False
+    payload_store_compression: str = "gzip"
+    payload_store_min_compress_bytes: int = 256
+    payload_store_min_blob_bytes: int = 64
+
+    # Streaming exports: rows fetched per server-side cursor round trip (and per output chunk)
+    export_batch_size: int = 1000
+
+    # Monthly partitions of transfers/transfer_events (retention 0 keeps every month)
+    partition_tenants: str = "public"
+    partition_months_ahead: int = 3
+    partition_retention_months: int = 0
+    partition_retention_drop: bool = False
     
     class Config:
         env_file = ".env"
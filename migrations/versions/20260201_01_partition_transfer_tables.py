@@ -0,0 +1,211 @@
+"""partition transfers and transfer_events by month
+
+Revision ID: 20260201_01
+Revises: 20260102_01
+Create Date: 2026-02-01 09:00:00.000000
+
+"""
+
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "20260201_01"
+down_revision = "20260102_01"
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+TRANSFER_COLUMNS = (
+    "id, payment_id, origin_id, status, amount, currency, concept, description, connector_id, "
+    "source_address, source_address_type, source_owner_id_type, source_owner_id, source_owner_name, "
+    "destination_address, destination_address_type, destination_owner_id_type, destination_owner_id, "
+    "destination_owner_name, metadata, connector_response, created_at, updated_at"
+)
+EVENT_COLUMNS = "id, transfer_id, status, message, payload, created_at"
+
+transfer_status_enum = postgresql.ENUM(name="transfer_status", create_type=False)
+transfer_event_status_enum = postgresql.ENUM(name="transfer_event_status", create_type=False)
+
+
+def _month_start(value: datetime) -> datetime:
+    value = value.astimezone(timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(month: datetime) -> datetime:
+    return month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1)
+
+
+def _create_monthly_partitions(table: str, first: datetime, last: datetime) -> None:
+    month = _month_start(first)
+    while month <= last:
+        end = _next_month(month)
+        op.execute(
+            f'CREATE TABLE IF NOT EXISTS "{table}_p{month.year:04d}_{month.month:02d}" PARTITION OF "{table}" '
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        month = end
+
+
+def _timestamps():
+    return (
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("timezone('utc', now())")),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("timezone('utc', now())")),
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    # Keep the legacy heap tables around until their rows are copied
+    op.execute("ALTER TABLE transfer_events RENAME TO transfer_events_legacy")
+    op.execute("ALTER TABLE transfers RENAME TO transfers_legacy")
+    op.execute("ALTER INDEX transfers_pkey RENAME TO transfers_legacy_pkey")
+    op.execute("ALTER INDEX transfers_payment_id_key RENAME TO transfers_legacy_payment_id_key")
+    op.execute("ALTER INDEX ix_transfers_origin_id RENAME TO ix_transfers_legacy_origin_id")
+    op.execute("ALTER INDEX transfer_events_pkey RENAME TO transfer_events_legacy_pkey")
+    op.execute("ALTER INDEX ix_transfer_events_transfer_id_created RENAME TO ix_transfer_events_legacy_transfer_id_created")
+    # Ids keep counting from the existing sequences
+    op.execute("ALTER SEQUENCE transfers_id_seq OWNED BY NONE")
+    op.execute("ALTER SEQUENCE transfer_events_id_seq OWNED BY NONE")
+
+    op.create_table(
+        "transfers",
+        sa.Column("id", sa.BigInteger(), nullable=False, server_default=sa.text("nextval('transfers_id_seq')")),
+        sa.Column("payment_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("payments.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("origin_id", sa.String(length=64), nullable=False),
+        sa.Column("status", transfer_status_enum, nullable=False, server_default="CREATED"),
+        sa.Column("amount", sa.Numeric(18, 2), nullable=False),
+        sa.Column("currency", sa.String(length=8), nullable=False),
+        sa.Column("concept", sa.String(length=32), nullable=True),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("connector_id", sa.String(length=64), nullable=True),
+        sa.Column("source_address", sa.String(length=64), nullable=False),
+        sa.Column("source_address_type", sa.String(length=32), nullable=False),
+        sa.Column("source_owner_id_type", sa.String(length=16), nullable=False),
+        sa.Column("source_owner_id", sa.String(length=32), nullable=False),
+        sa.Column("source_owner_name", sa.String(length=128), nullable=True),
+        sa.Column("destination_address", sa.String(length=64), nullable=False),
+        sa.Column("destination_address_type", sa.String(length=32), nullable=False),
+        sa.Column("destination_owner_id_type", sa.String(length=16), nullable=False),
+        sa.Column("destination_owner_id", sa.String(length=32), nullable=False),
+        sa.Column("destination_owner_name", sa.String(length=128), nullable=True),
+        sa.Column("metadata", postgresql.JSONB(astext_type=sa.Text()), nullable=False, server_default=sa.text("'{}'::jsonb")),
+        sa.Column("connector_response", postgresql.JSONB(astext_type=sa.Text()), nullable=False, server_default=sa.text("'{}'::jsonb")),
+        *_timestamps(),
+        sa.PrimaryKeyConstraint("id", "created_at", name="transfers_pkey"),
+        sa.UniqueConstraint("payment_id", "created_at", name="uq_transfers_payment_id_created_at"),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    op.create_index("ix_transfers_origin_id", "transfers", ["origin_id"], unique=False)
+
+    op.create_table(
+        "transfer_events",
+        sa.Column("id", sa.BigInteger(), nullable=False, server_default=sa.text("nextval('transfer_events_id_seq')")),
+        sa.Column("transfer_id", sa.BigInteger(), nullable=False),
+        sa.Column("status", transfer_event_status_enum, nullable=False),
+        sa.Column("message", sa.String(length=255), nullable=True),
+        sa.Column("payload", postgresql.JSONB(astext_type=sa.Text()), nullable=False, server_default=sa.text("'{}'::jsonb")),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("timezone('utc', now())")),
+        sa.PrimaryKeyConstraint("id", "created_at", name="transfer_events_pkey"),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    op.create_index("ix_transfer_events_transfer_id_created", "transfer_events", ["transfer_id", "created_at"], unique=False)
+
+    op.create_table(
+        "transfer_lookup",
+        sa.Column("origin_id", sa.String(length=64), primary_key=True, nullable=False),
+        sa.Column("payment_id", postgresql.UUID(as_uuid=True), nullable=False, unique=True),
+        sa.Column("transfer_id", sa.BigInteger(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_transfer_lookup_created_at", "transfer_lookup", ["created_at"], unique=False)
+
+    now = datetime.now(timezone.utc)
+    oldest = bind.execute(
+        sa.text(
+            "SELECT least((SELECT min(created_at) FROM transfers_legacy), "
+            "(SELECT min(created_at) FROM transfer_events_legacy))"
+        )
+    ).scalar() or now
+    last = _month_start(now)
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+    _create_monthly_partitions("transfers", oldest, last)
+    _create_monthly_partitions("transfer_events", oldest, last)
+
+    op.execute(f"INSERT INTO transfers ({TRANSFER_COLUMNS}) SELECT {TRANSFER_COLUMNS} FROM transfers_legacy")
+    op.execute(
+        "INSERT INTO transfer_lookup (origin_id, payment_id, transfer_id, created_at) "
+        "SELECT origin_id, payment_id, id, created_at FROM transfers_legacy"
+    )
+    op.execute(f"INSERT INTO transfer_events ({EVENT_COLUMNS}) SELECT {EVENT_COLUMNS} FROM transfer_events_legacy")
+
+    op.drop_table("transfer_events_legacy")
+    op.drop_table("transfers_legacy")
+    op.execute("ALTER SEQUENCE transfers_id_seq OWNED BY transfers.id")
+    op.execute("ALTER SEQUENCE transfer_events_id_seq OWNED BY transfer_events.id")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE transfer_events RENAME TO transfer_events_partitioned")
+    op.execute("ALTER TABLE transfers RENAME TO transfers_partitioned")
+    op.execute("ALTER INDEX transfers_pkey RENAME TO transfers_partitioned_pkey")
+    op.execute("ALTER INDEX ix_transfers_origin_id RENAME TO ix_transfers_partitioned_origin_id")
+    op.execute("ALTER INDEX transfer_events_pkey RENAME TO transfer_events_partitioned_pkey")
+    op.execute("ALTER INDEX ix_transfer_events_transfer_id_created RENAME TO ix_transfer_events_partitioned_transfer_id_created")
+    op.execute("ALTER SEQUENCE transfers_id_seq OWNED BY NONE")
+    op.execute("ALTER SEQUENCE transfer_events_id_seq OWNED BY NONE")
+
+    op.create_table(
+        "transfers",
+        sa.Column("id", sa.BigInteger(), primary_key=True, nullable=False, server_default=sa.text("nextval('transfers_id_seq')")),
+        sa.Column("payment_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("payments.id", ondelete="CASCADE"), nullable=False, unique=True),
+        sa.Column("origin_id", sa.String(length=64), nullable=False),
+        sa.Column("status", transfer_status_enum, nullable=False, server_default="CREATED"),
+        sa.Column("amount", sa.Numeric(18, 2), nullable=False),
+        sa.Column("currency", sa.String(length=8), nullable=False),
+        sa.Column("concept", sa.String(length=32), nullable=True),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("connector_id", sa.String(length=64), nullable=True),
+        sa.Column("source_address", sa.String(length=64), nullable=False),
+        sa.Column("source_address_type", sa.String(length=32), nullable=False),
+        sa.Column("source_owner_id_type", sa.String(length=16), nullable=False),
+        sa.Column("source_owner_id", sa.String(length=32), nullable=False),
+        sa.Column("source_owner_name", sa.String(length=128), nullable=True),
+        sa.Column("destination_address", sa.String(length=64), nullable=False),
+        sa.Column("destination_address_type", sa.String(length=32), nullable=False),
+        sa.Column("destination_owner_id_type", sa.String(length=16), nullable=False),
+        sa.Column("destination_owner_id", sa.String(length=32), nullable=False),
+        sa.Column("destination_owner_name", sa.String(length=128), nullable=True),
+        sa.Column("metadata", postgresql.JSONB(astext_type=sa.Text()), nullable=False, server_default=sa.text("'{}'::jsonb")),
+        sa.Column("connector_response", postgresql.JSONB(astext_type=sa.Text()), nullable=False, server_default=sa.text("'{}'::jsonb")),
+        *_timestamps(),
+    )
+    op.create_index("ix_transfers_origin_id", "transfers", ["origin_id"], unique=True)
+
+    op.create_table(
+        "transfer_events",
+        sa.Column("id", sa.BigInteger(), primary_key=True, nullable=False, server_default=sa.text("nextval('transfer_events_id_seq')")),
+        sa.Column("transfer_id", sa.BigInteger(), sa.ForeignKey("transfers.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("status", transfer_event_status_enum, nullable=False),
+        sa.Column("message", sa.String(length=255), nullable=True),
+        sa.Column("payload", postgresql.JSONB(astext_type=sa.Text()), nullable=False, server_default=sa.text("'{}'::jsonb")),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("timezone('utc', now())")),
+    )
+    op.create_index("ix_transfer_events_transfer_id_created", "transfer_events", ["transfer_id", "created_at"], unique=False)
+
+    op.execute(f"INSERT INTO transfers ({TRANSFER_COLUMNS}) SELECT {TRANSFER_COLUMNS} FROM transfers_partitioned")
+    op.execute(f"INSERT INTO transfer_events ({EVENT_COLUMNS}) SELECT {EVENT_COLUMNS} FROM transfer_events_partitioned")
+
+    op.drop_index("ix_transfer_lookup_created_at", table_name="transfer_lookup")
+    op.drop_table("transfer_lookup")
+    op.drop_table("transfer_events_partitioned")
+    op.drop_table("transfers_partitioned")
+    op.execute("ALTER SEQUENCE transfers_id_seq OWNED BY transfers.id")
+    op.execute("ALTER SEQUENCE transfer_events_id_seq OWNED BY transfer_events.id")
@@ -0,0 +1,46 @@
+"""keyset listing indexes for transfers
+
+Revision ID: 20260215_01
+Revises: 20260201_01
+Create Date: 2026-02-15 09:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20260215_01"
+down_revision = "20260201_01"
+branch_labels = None
+depends_on = None
+
+# The listing orders by (created_at DESC, id DESC); every filter index ends with
+# the same keys so the filtered scan is already in cursor order.
+SUMMARY_INCLUDE = ["payment_id", "origin_id", "status", "amount", "currency", "connector_id", "source_address", "destination_address"]
+
+FILTER_INDEXES = {
+    "ix_transfers_status_created_id": ["status", "created_at", "id"],
+    "ix_transfers_currency_created_id": ["currency", "created_at", "id"],
+    "ix_transfers_connector_created_id": ["connector_id", "created_at", "id"],
+    "ix_transfers_source_address_created_id": ["source_address", "created_at", "id"],
+    "ix_transfers_destination_address_created_id": ["destination_address", "created_at", "id"],
+}
+
+
+def upgrade() -> None:
+    # Covering index for the unfiltered listing: index-only scans return the projection
+    op.create_index(
+        "ix_transfers_created_id",
+        "transfers",
+        ["created_at", "id"],
+        unique=False,
+        postgresql_include=SUMMARY_INCLUDE,
+    )
+    for name, columns in FILTER_INDEXES.items():
+        op.create_index(name, "transfers", columns, unique=False)
+
+
+def downgrade() -> None:
+    for name in reversed(list(FILTER_INDEXES)):
+        op.drop_index(name, table_name="transfers")
+    op.drop_index("ix_transfers_created_id", table_name="transfers")
@@ -0,0 +1,32 @@
+"""payment version column and PROCESSING status
+
+Revision ID: 20260301_01
+Revises: 20260215_01
+Create Date: 2026-03-01 09:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20260301_01"
+down_revision = "20260215_01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # ALTER TYPE ... ADD VALUE cannot run inside a transaction block on older servers
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE payment_status ADD VALUE IF NOT EXISTS 'PROCESSING' AFTER 'PENDING'")
+    op.add_column(
+        "payments",
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("payments", "version")
+    # Enum values cannot be dropped; park in-flight claims back on PENDING instead
+    op.execute("UPDATE payments SET status = 'PENDING' WHERE status = 'PROCESSING'")
@@ -0,0 +1,33 @@
+"""content-addressed payload_blobs table
+
+Revision ID: 20260315_01
+Revises: 20260301_01
+Create Date: 2026-03-15 09:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20260315_01"
+down_revision = "20260301_01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing JSONB payloads stay inline; only rows saved with PAYLOAD_STORE_ENABLED reference blobs
+    op.create_table(
+        "payload_blobs",
+        sa.Column("hash", sa.String(length=64), primary_key=True),
+        sa.Column("encoding", sa.String(length=8), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+    )
+
+
+def downgrade() -> None:
+    # Rows saved while the store was enabled keep dangling {"$blob": ...} references
+    op.drop_table("payload_blobs")
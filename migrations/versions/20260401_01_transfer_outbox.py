@@ -0,0 +1,48 @@
+"""transfer_outbox for asynchronous transfer acceptance
+
+Revision ID: 20260401_01
+Revises: 20260315_01
+Create Date: 2026-04-01 09:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "20260401_01"
+down_revision = "20260315_01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "transfer_outbox",
+        sa.Column("id", sa.BigInteger(), primary_key=True, nullable=False),
+        sa.Column("payment_id", postgresql.UUID(as_uuid=True), nullable=False, unique=True),
+        sa.Column("origin_id", sa.String(length=64), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+        sa.Column("published_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("dispatched_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    # Both scans only ever look at the small pending tail of the table
+    op.create_index(
+        "ix_transfer_outbox_unpublished",
+        "transfer_outbox",
+        ["id"],
+        postgresql_where=sa.text("published_at IS NULL"),
+    )
+    op.create_index(
+        "ix_transfer_outbox_undispatched",
+        "transfer_outbox",
+        ["id"],
+        postgresql_where=sa.text("dispatched_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transfer_outbox_undispatched", table_name="transfer_outbox")
+    op.drop_index("ix_transfer_outbox_unpublished", table_name="transfer_outbox")
+    op.drop_table("transfer_outbox")
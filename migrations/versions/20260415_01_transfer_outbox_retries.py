@@ -0,0 +1,46 @@
+"""retry scheduling columns on transfer_outbox
+
+Revision ID: 20260415_01
+Revises: 20260401_01
+Create Date: 2026-04-15 09:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20260415_01"
+down_revision = "20260401_01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("transfer_outbox", sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column(
+        "transfer_outbox",
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+    )
+    op.add_column("transfer_outbox", sa.Column("last_error", sa.String(length=255), nullable=True))
+    # Workers claim due rows in next_attempt_at order; the index only covers the pending tail
+    op.drop_index("ix_transfer_outbox_undispatched", table_name="transfer_outbox")
+    op.create_index(
+        "ix_transfer_outbox_due",
+        "transfer_outbox",
+        ["next_attempt_at", "id"],
+        postgresql_where=sa.text("dispatched_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transfer_outbox_due", table_name="transfer_outbox")
+    op.create_index(
+        "ix_transfer_outbox_undispatched",
+        "transfer_outbox",
+        ["id"],
+        postgresql_where=sa.text("dispatched_at IS NULL"),
+    )
+    op.drop_column("transfer_outbox", "last_error")
+    op.drop_column("transfer_outbox", "next_attempt_at")
+    op.drop_column("transfer_outbox", "attempts")
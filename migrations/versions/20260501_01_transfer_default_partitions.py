@@ -0,0 +1,30 @@
+"""DEFAULT partitions for transfers and transfer_events
+
+Revision ID: 20260501_01
+Revises: 20260415_01
+Create Date: 2026-05-01 09:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20260501_01"
+down_revision = "20260415_01"
+branch_labels = None
+depends_on = None
+
+PARTITIONED_TABLES = ("transfers", "transfer_events")
+
+
+def upgrade() -> None:
+    # Catches rows of months the maintenance job has not created yet, instead of failing the insert
+    for table in PARTITIONED_TABLES:
+        op.execute(f'CREATE TABLE IF NOT EXISTS "{table}_default" PARTITION OF "{table}" DEFAULT')
+
+
+def downgrade() -> None:
+    # Detached rather than dropped, so rows it caught are kept for a manual move
+    for table in PARTITIONED_TABLES:
+        op.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{table}_default"')
+        op.execute(f'ALTER TABLE "{table}_default" RENAME TO "{table}_default_detached"')
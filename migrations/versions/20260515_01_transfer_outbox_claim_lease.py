@@ -0,0 +1,29 @@
+"""release transfer_outbox claims stranded by crashed workers
+
+Revision ID: 20260515_01
+Revises: 20260501_01
+Create Date: 2026-05-15 09:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20260515_01"
+down_revision = "20260501_01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Workers used to set dispatched_at when claiming; it now means "settled" and claims
+    # are leases on next_attempt_at. Claims whose transfer never left CREATED are released.
+    op.execute(
+        "UPDATE transfer_outbox SET dispatched_at = NULL, next_attempt_at = now() "
+        "WHERE dispatched_at IS NOT NULL "
+        "AND payment_id IN (SELECT payment_id FROM transfers WHERE status = 'CREATED')"
+    )
+
+
+def downgrade() -> None:
+    pass
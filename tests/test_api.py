@@ -1,24 +1,40 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+from uuid import UUID
+
+import httpx
 from fastapi.testclient import TestClient
 from app.main import app
 from app.adapters.api.dependencies import (
+    get_idempotency_guard,
     get_payment_operation,
     get_payment_service,
     get_transfer_connector,
+    get_transfer_export_source,
 )
+from app.adapters.db.repository_transfer_export import RepositoryTransferExportSource
 from app.adapters.db.memory_repository import InMemoryPaymentRepository
 from app.adapters.db.memory_transfer_repository import InMemoryTransferRepository
 from app.adapters.payment.mock_gateway import MockPaymentGateway
 from app.core.payments.operation import PaymentOperation
 from app.core.connectors.interface import ConnectorIntegration
+from app.core.connectors.resilient import CircuitBreaker, ResilientConnector
 from app.core.payments.types import ConnectorResponse, PaymentState
+from app.db.query_stats import assert_query_budget
 from app.services.payment_service import PaymentService
 
 
 class StubConnector(ConnectorIntegration):
+    executed = 0
+
     async def build_request(self, data):
         return {"originId": data.origin_id or "test-origin"}
 
     async def execute_request(self, request):
+        StubConnector.executed += 1
         return {"statusCode": 0, "requestEcho": request}
 
     async def handle_response(self, response):
@@ -34,7 +50,12 @@ def override_connector():
 
 
 _memory_payment_repository = InMemoryPaymentRepository()
-_memory_transfer_repository = InMemoryTransferRepository()
+class QueuedTransferRepository(InMemoryTransferRepository):
+    # Stands in for the database backend, whose outbox a worker serves; tests dispatch by hand
+    has_outbox_worker = True
+
+
+_memory_transfer_repository = QueuedTransferRepository()
 _mock_gateway = MockPaymentGateway()
 
 
@@ -49,13 +70,36 @@ def override_payment_operation():
 app.dependency_overrides[get_transfer_connector] = override_connector
 app.dependency_overrides[get_payment_service] = override_payment_service
 app.dependency_overrides[get_payment_operation] = override_payment_operation
+app.dependency_overrides[get_transfer_export_source] = lambda: RepositoryTransferExportSource(_memory_transfer_repository)
 
 client = TestClient(app)
 
+
+def _transfer_payload(address, amount, description, concept="VAR", **overrides):
+    """Transfer request body from John Doe's account to `address`; `overrides` are extra top-level fields."""
+    payload = {
+        "source": {
+            "addressType": "CBU_CVU",
+            "address": "0000000000000000000000",
+            "owner": {"personIdType": "CUI", "personId": "20304050607", "personName": "John Doe"},
+        },
+        "destination": {
+            "addressType": "CBU_CVU",
+            "address": address,
+            "owner": {"personIdType": "CUI", "personId": "20987654321", "personName": "Jane Roe"},
+        },
+        "body": {"amount": amount, "currency": "ARS", "description": description, "concept": concept},
+    }
+    payload.update(overrides)
+    return payload
+
 def test_health_check():
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
+    # In-memory persistence: any statement here would be a regression
+    assert_query_budget(int(response.headers["X-DB-Query-Count"]), 0)
+    assert "X-DB-Query-Time-Ms" in response.headers
 
 def test_create_and_process_payment():
     # 1. Create Payment
@@ -86,32 +130,7 @@ def test_failed_payment_large_amount():
 
 
 def test_register_transfer_request():
-    payload = {
-        "source": {
-            "addressType": "CBU_CVU",
-            "address": "0000000000000000000000",
-            "owner": {
-                "personIdType": "CUI",
-                "personId": "20304050607",
-                "personName": "John Doe",
-            },
-        },
-        "destination": {
-            "addressType": "CBU_CVU",
-            "address": "9999999999999999999999",
-            "owner": {
-                "personIdType": "CUI",
-                "personId": "20987654321",
-                "personName": "Jane Roe",
-            },
-        },
-        "body": {
-            "amount": "123.45",
-            "currency": "ARS",
-            "description": "Test transfer",
-            "concept": "VAR",
-        },
-    }
+    payload = _transfer_payload("9999999999999999999999", "123.45", "Test transfer")
 
     response = client.post("/api/v1/transfers", json=payload)
     assert response.status_code == 200
@@ -138,3 +157,291 @@ def test_register_transfer_request():
     assert status_body["origin_id"] == origin_id
     assert status_body["status"] == "AUTHORIZED"
     assert status_body["metadata"]["client_request"]["body"]["amount"] == payload["body"]["amount"]
+
+
+def test_list_transfers_with_keyset_cursor():
+    payload = _transfer_payload("1111111111111111111111", "10.00", "Listing")
+    created = [client.post("/api/v1/transfers", json=payload).json()["originId"] for _ in range(3)]
+
+    params = {"destinationAddress": "1111111111111111111111", "limit": 2}
+    first = client.get("/api/v1/transfers", params=params).json()
+    assert len(first["items"]) == 2
+    assert first["nextCursor"]
+
+    second = client.get("/api/v1/transfers", params={**params, "cursor": first["nextCursor"]}).json()
+    assert len(second["items"]) == 1
+    assert second["nextCursor"] is None
+
+    listed = [item["originId"] for item in first["items"] + second["items"]]
+    assert listed == list(reversed(created))
+    assert set(first["items"][0]) >= {"paymentId", "status", "amount", "sourceAddress", "createdAt"}
+
+    assert client.get("/api/v1/transfers", params={**params, "status": "FAILED"}).json()["items"] == []
+    assert client.get("/api/v1/transfers", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_list_transfers_accepts_utc_offset_bounds():
+    payload = _transfer_payload("1212121212121212121212", "10.00", "Offsets")
+    assert client.post("/api/v1/transfers", json=payload).status_code == 200
+    params = {"destinationAddress": "1212121212121212121212"}
+    listed = client.get("/api/v1/transfers", params={**params, "createdFrom": "2000-01-01T00:00:00Z"})
+    assert listed.status_code == 200
+    assert listed.json()["items"]
+
+    future = client.get("/api/v1/transfers", params={**params, "createdFrom": "2999-01-01T00:00:00+03:00"})
+    assert future.status_code == 200
+    assert future.json()["items"] == []
+
+
+
+def test_retried_transfer_is_replayed_without_calling_the_bank():
+    payload = _transfer_payload("3333333333333333333333", "15.00", "Retry")
+    headers = {"Idempotency-Key": "retry-test-1"}
+    before = StubConnector.executed
+
+    first = client.post("/api/v1/transfers", json=payload, headers=headers)
+    retry = client.post("/api/v1/transfers", json=payload, headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert StubConnector.executed == before + 1
+
+    # Without the header the client originId is the key
+    by_origin = {**payload, "originId": "client-origin-1"}
+    assert client.post("/api/v1/transfers", json=by_origin).json()["originId"] == "client-origin-1"
+    assert client.post("/api/v1/transfers", json=by_origin).headers["Idempotent-Replayed"] == "true"
+
+    changed = {**payload, "body": {**payload["body"], "amount": "16.00"}}
+    assert client.post("/api/v1/transfers", json=changed, headers=headers).status_code == 422
+
+
+def test_failed_commit_does_not_store_an_idempotent_result():
+    class CommitFailsOnce(InMemoryTransferRepository):
+        failed = False
+
+        async def commit(self):
+            if not self.failed:
+                self.failed = True
+                raise RuntimeError("commit failed")
+
+    payload = _transfer_payload("3535353535353535353535", "15.00", "Commit")
+    headers = {"Idempotency-Key": "commit-test-1"}
+    repository = CommitFailsOnce()
+    app.dependency_overrides[get_payment_operation] = lambda: PaymentOperation(transfer_repository=repository)
+    try:
+        with TestClient(app, raise_server_exceptions=False) as failing_client:
+            first = failing_client.post("/api/v1/transfers", json=payload, headers=headers)
+        retry = client.post("/api/v1/transfers", json=payload, headers=headers)
+    finally:
+        app.dependency_overrides[get_payment_operation] = override_payment_operation
+
+    assert first.status_code == 500
+    # The key was released, so the retry ran again instead of replaying an uncommitted paymentId
+    assert retry.status_code == 200
+    assert "Idempotent-Replayed" not in retry.headers
+    stored = asyncio.run(repository.get_by_origin_id(retry.json()["originId"]))
+    assert str(stored.payment_id) == retry.json()["paymentId"]
+
+
+def test_duplicate_origin_id_is_rejected_before_the_bank_without_idempotency():
+    payload = _transfer_payload("3434343434343434343434", "15.00", "Duplicate", originId="duplicate-origin-1")
+    before = StubConnector.executed
+    app.dependency_overrides[get_idempotency_guard] = lambda: None
+    try:
+        first = client.post("/api/v1/transfers", json=payload)
+        second = client.post("/api/v1/transfers", json=payload)
+    finally:
+        del app.dependency_overrides[get_idempotency_guard]
+
+    assert first.status_code == 200
+    assert second.status_code == 409
+    assert second.json()["detail"] == "A transfer with originId duplicate-origin-1 already exists"
+    assert StubConnector.executed == before + 1
+    assert client.get("/api/v1/transfers/duplicate-origin-1").json()["payment_id"] == first.json()["paymentId"]
+
+
+def test_async_acceptance_returns_202_and_queues_the_transfer():
+    payload = _transfer_payload("4444444444444444444444", "20.00", "Async")
+    before = StubConnector.executed
+
+    response = client.post("/api/v1/transfers", json=payload, headers={"Prefer": "respond-async"})
+
+    assert response.status_code == 202
+    body = response.json()
+    assert body["status"] == "CREATED"
+    assert body["bankResponse"] is None
+    assert response.headers["Location"].endswith(f"/api/v1/transfers/{body['originId']}")
+    assert StubConnector.executed == before
+    assert _memory_transfer_repository.outbox[-1] == UUID(body["paymentId"])
+    assert client.get(response.headers["Location"]).json()["status"] == "CREATED"
+
+    # What the worker does once the relay hands it the payment id
+    async def dispatch():
+        operation = PaymentOperation(transfer_repository=_memory_transfer_repository)
+        data = await _memory_transfer_repository.get_by_payment_id(UUID(body["paymentId"]))
+        return await operation.dispatch(data, StubConnector())
+
+    assert asyncio.run(dispatch()).status == PaymentState.AUTHORIZED
+    assert client.get(response.headers["Location"]).json()["status"] == "AUTHORIZED"
+
+def test_bank_timeout_defers_the_transfer_to_the_retry_queue():
+    class TimeoutConnector(StubConnector):
+        async def execute_request(self, request):
+            raise httpx.ConnectTimeout("bank unreachable")
+
+    payload = _transfer_payload("5555555555555555555555", "30.00", "Timeout")
+    app.dependency_overrides[get_transfer_connector] = TimeoutConnector
+    try:
+        response = client.post("/api/v1/transfers", json=payload)
+    finally:
+        app.dependency_overrides[get_transfer_connector] = override_connector
+
+    assert response.status_code == 202
+    body = response.json()
+    assert body["status"] == "CREATED"
+    payment_id = UUID(body["paymentId"])
+    assert _memory_transfer_repository.outbox[-1] == payment_id
+    attempts, _, error = _memory_transfer_repository.retries[payment_id]
+    assert (attempts, error) == (1, "ConnectTimeout: bank unreachable")
+
+
+def test_backend_without_outbox_worker_never_accepts_for_later():
+    class TimeoutConnector(StubConnector):
+        async def execute_request(self, request):
+            if request["originId"].startswith("no-worker-timeout"):
+                raise httpx.ConnectTimeout("bank unreachable")
+            return await super().execute_request(request)
+
+    def payload(origin_id):
+        return _transfer_payload("5656565656565656565656", "30.00", "No worker", originId=origin_id)
+
+    repository = InMemoryTransferRepository()
+    app.dependency_overrides[get_payment_operation] = lambda: PaymentOperation(transfer_repository=repository)
+    app.dependency_overrides[get_transfer_connector] = TimeoutConnector
+    prefer = {"Prefer": "respond-async"}
+    try:
+        preferred = client.post("/api/v1/transfers", json=payload("no-worker-1"), headers=prefer)
+        timed_out = client.post("/api/v1/transfers", json=payload("no-worker-timeout-1"))
+        batch = client.post(
+            "/api/v1/transfers/batch",
+            json=[payload("no-worker-2"), payload("no-worker-timeout-2")],
+            headers=prefer,
+        )
+    finally:
+        app.dependency_overrides[get_payment_operation] = override_payment_operation
+        app.dependency_overrides[get_transfer_connector] = override_connector
+
+    assert preferred.status_code == 200
+    assert preferred.json()["status"] == "AUTHORIZED"
+    assert timed_out.status_code == 502
+    assert batch.status_code == 200
+    assert [item["status"] for item in batch.json()["items"]] == ["AUTHORIZED", "FAILED"]
+    assert repository.outbox == []
+    assert repository.retries == {}
+
+
+def test_batch_reports_each_item_and_persists_the_valid_ones():
+    class PartlyDownConnector(StubConnector):
+        async def execute_request(self, request):
+            if request["originId"] == "batch-timeout":
+                raise httpx.ReadTimeout("bank slow")
+            return await super().execute_request(request)
+
+    def item(origin_id, amount="10.00"):
+        return _transfer_payload("7777777777777777777777", amount, "Payroll", concept="HAB", originId=origin_id)
+
+    batch = [item("batch-1"), item("batch-1"), item("batch-timeout"), item("batch-2")]
+    app.dependency_overrides[get_transfer_connector] = PartlyDownConnector
+    try:
+        response = client.post("/api/v1/transfers/batch", json=batch)
+    finally:
+        app.dependency_overrides[get_transfer_connector] = override_connector
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["accepted"], body["rejected"]) == (3, 1)
+    items = body["items"]
+    assert [entry["status"] for entry in items] == ["AUTHORIZED", None, "CREATED", "AUTHORIZED"]
+    assert items[1]["error"] == "Duplicate originId in batch: batch-1"
+    assert items[0]["bankResponse"]["requestEcho"]["originId"] == "batch-1"
+    assert UUID(items[2]["paymentId"]) in _memory_transfer_repository.retries
+    assert client.get("/api/v1/transfers/batch-2").json()["status"] == "AUTHORIZED"
+
+    too_many = client.post("/api/v1/transfers/batch", json=[item(f"many-{n}") for n in range(1001)])
+    assert too_many.status_code == 413
+
+    accepted = client.post("/api/v1/transfers/batch", json=[item("batch-async")], headers={"Prefer": "respond-async"})
+    assert accepted.status_code == 202
+    assert accepted.json()["items"][0]["status"] == "CREATED"
+    assert _memory_transfer_repository.outbox[-1] == UUID(accepted.json()["items"][0]["paymentId"])
+
+def test_open_circuit_fails_fast_with_503():
+    breaker = CircuitBreaker(open_seconds=30.0)
+    breaker._open()
+    connector = ResilientConnector(StubConnector(), breaker=breaker)
+
+    class CommittedTransferRepository(QueuedTransferRepository):
+        # Only what was committed survives the request's rollback
+        committed = {}
+
+        async def commit(self):
+            self.committed = {origin_id: stored.status for origin_id, stored in self._by_origin.items()}
+
+    repository = CommittedTransferRepository()
+    payload = _transfer_payload("6666666666666666666666", "40.00", "Open circuit", originId="open-circuit-1")
+    before = StubConnector.executed
+    app.dependency_overrides[get_transfer_connector] = lambda: connector
+    app.dependency_overrides[get_payment_operation] = lambda: PaymentOperation(transfer_repository=repository)
+    try:
+        response = client.post("/api/v1/transfers", json=payload)
+        health = client.get("/health/connector").json()
+    finally:
+        app.dependency_overrides[get_transfer_connector] = override_connector
+        app.dependency_overrides[get_payment_operation] = override_payment_operation
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "30"
+    assert StubConnector.executed == before
+    assert health["circuit_breaker"]["state"] == "open"
+    assert health["circuit_breaker"]["rejected"] == 1
+    assert repository.committed == {"open-circuit-1": PaymentState.FAILED}
+
+def test_export_transfers_streams_ndjson_and_gzipped_csv():
+    payload = _transfer_payload("2222222222222222222222", "7.50", "Export")
+    created = {client.post("/api/v1/transfers", json=payload).json()["originId"] for _ in range(3)}
+    params = {"destinationAddress": "2222222222222222222222"}
+
+    response = client.get("/api/v1/transfers/export", params=params)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert {row["origin_id"] for row in rows} == created
+    assert rows[0]["amount"] == "7.50"
+
+    response = client.get("/api/v1/transfers/export", params={**params, "format": "csv", "gzip": "true"})
+    assert response.headers["content-disposition"].endswith('.csv.gz"')
+    reader = csv.DictReader(io.StringIO(gzip.decompress(response.content).decode()))
+    assert {row["origin_id"] for row in reader} == created
+
+    # The bounds are compared inside the streaming body, after the 200 is sent
+    response = client.get("/api/v1/transfers/export", params={**params, "createdFrom": "2000-01-01T00:00:00Z"})
+    assert response.status_code == 200
+    assert {json.loads(line)["origin_id"] for line in response.text.splitlines()} == created
+
+    assert client.get("/api/v1/transfers/export", params={"dataset": "transfer_events"}).status_code == 400
+    assert client.get("/api/v1/transfers/export", params={"format": "xml"}).status_code == 422
+
+
+def test_metrics_endpoint_exposes_stage_latencies():
+    payload = _transfer_payload("8888888888888888888888", "50.00", "Metrics")
+    assert client.post("/api/v1/transfers", json=payload).status_code == 200
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    for stage in ("validate_request", "domain_logic", "build_request", "execute_request", "handle_response", "update_tracker"):
+        assert f'stage="{stage}",connector="default",tenant="public",outcome="ok"' in response.text
+    assert 'stage="process",connector="default",tenant="public",outcome="authorized"' in response.text
@@ -0,0 +1,356 @@
+import asyncio
+import hashlib
+import hmac
+import json
+
+import httpx
+
+from app.core.connectors import banco_comercio
+from app.core.connectors.banco_comercio import BancoComercioConnector
+from app.core.connectors.banco_comercio_standin import BancoComercioStandIn
+from app.core.connectors.interface import ConnectorIntegration
+from app.core.connectors.mock_banco_comercio import (
+    MockBancoComercioBehaviour,
+    MockBancoComercioConnector,
+    SimulatedBank,
+)
+from app.core.connectors.resilient import (
+    AdaptiveLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    ConnectorOverloaded,
+    ResilientConnector,
+)
+from app.core.payments.retry import is_retryable
+from app.core.payments.types import ConnectorResponse, PaymentState
+
+
+def _bank_transport(calls):
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path == "/auth":
+            return httpx.Response(200, json={"data": {"accessToken": "token-1"}})
+        return httpx.Response(200, json={"statusCode": 0, "dest_ori_trx_id": "origin-1"})
+
+    return httpx.MockTransport(handler)
+
+
+def test_connector_reuses_one_client_across_requests():
+    calls = []
+    connector = BancoComercioConnector(transport=_bank_transport(calls))
+
+    async def scenario():
+        await connector.startup()
+        client = connector._client
+        for _ in range(3):
+            response = await connector.execute_request({"originId": "origin-1", "body": {}})
+            assert response["statusCode"] == 0
+        assert connector._client is client
+
+        stats = connector.stats()["http_pool"]
+        assert stats["open"] is True
+        assert stats["requests_total"] == len(calls)
+        assert stats["in_flight"] == 0
+
+        await connector.shutdown()
+        assert client.is_closed
+        assert connector.stats()["http_pool"]["open"] is False
+
+    asyncio.run(scenario())
+    assert "/movements/transfer-request" in calls
+
+
+def test_http2_falls_back_to_http11_without_h2(monkeypatch, caplog):
+    monkeypatch.setattr(banco_comercio.settings, "bdc_http2", True)
+    monkeypatch.setattr(banco_comercio.importlib.util, "find_spec", lambda name: None)
+    connector = BancoComercioConnector(transport=_bank_transport([]))
+
+    async def scenario():
+        await connector.startup()
+        assert connector.stats()["http_pool"]["http2"] is False
+        await connector.shutdown()
+
+    asyncio.run(scenario())
+    assert "h2 package is not installed" in caplog.text
+
+
+def test_token_is_cached_and_refreshed_once_for_concurrent_callers():
+    calls = []
+    connector = BancoComercioConnector(transport=_bank_transport(calls))
+
+    async def scenario():
+        tokens = await asyncio.gather(*(connector._get_token() for _ in range(20)))
+        assert set(tokens) == {"token-1"}
+        await connector.execute_request({"originId": "origin-1", "body": {}})
+        await connector.shutdown()
+
+    asyncio.run(scenario())
+    assert calls.count("/auth") == 1
+    assert calls.count("/movements/transfer-request") == 1
+
+
+def test_short_lived_token_is_reused_despite_a_larger_refresh_margin():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path == "/auth":
+            # Shorter than the default 60s refresh margin
+            return httpx.Response(200, json={"data": {"accessToken": f"token-{len(calls)}", "expiresIn": 30}})
+        return httpx.Response(200, json={"statusCode": 0})
+
+    connector = BancoComercioConnector(transport=httpx.MockTransport(handler))
+
+    async def scenario():
+        for _ in range(5):
+            await connector.execute_request({"originId": "origin-1", "body": {}})
+        await asyncio.sleep(0)
+        stats = connector.stats()["token"]
+        await connector.shutdown()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert calls.count("/auth") == 1
+    assert stats["fetches"] == 1
+    assert stats["refreshing"] is False
+
+
+def test_unauthorized_transfer_invalidates_token_and_retries_once():
+    calls = []
+    issued = iter(["stale", "fresh"])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path == "/auth":
+            return httpx.Response(200, json={"data": {"accessToken": next(issued), "expiresIn": 3600}})
+        if request.headers["Authorization"] == "Bearer stale":
+            return httpx.Response(401, json={"message": "expired"})
+        return httpx.Response(200, json={"statusCode": 0})
+
+    connector = BancoComercioConnector(transport=httpx.MockTransport(handler))
+
+    async def scenario():
+        response = await connector.execute_request({"originId": "origin-1", "body": {}})
+        assert response["statusCode"] == 0
+        assert connector.stats()["token"]["invalidations"] == 1
+        await connector.shutdown()
+
+    asyncio.run(scenario())
+    assert calls == ["/auth", "/movements/transfer-request", "/auth", "/movements/transfer-request"]
+
+
+def _simulated(behaviour, now=None):
+    slept = []
+
+    async def sleep(seconds):
+        slept.append(seconds)
+
+    clock = (lambda: now[0]) if now is not None else (lambda: 0.0)
+    bank = SimulatedBank(behaviour, clock=clock, sleep=sleep)
+    return MockBancoComercioConnector(bank=bank), slept
+
+
+def _transfer(origin_id, concept="VAR"):
+    return {"originId": origin_id, "body": {"amount": 10.0, "concept": concept}}
+
+
+def test_mock_bank_latency_is_reproducible_under_a_seed():
+    async def latencies(behaviour):
+        connector, slept = _simulated(behaviour)
+        for index in range(200):
+            await connector.execute_request(_transfer(f"origin-{index}"))
+        await connector.shutdown()
+        return slept
+
+    fixed = asyncio.run(latencies(MockBancoComercioBehaviour(latency="fixed", latency_ms=40.0)))
+    assert fixed == [0.04] * 200
+
+    long_tail = MockBancoComercioBehaviour(latency="pareto", latency_ms=10.0, pareto_alpha=1.2, seed=7)
+    first = asyncio.run(latencies(long_tail))
+    assert first == asyncio.run(latencies(long_tail))
+    assert min(first) >= 0.01 and max(first) > 0.1
+    assert first != asyncio.run(latencies(MockBancoComercioBehaviour.from_profile("long_tail", seed=8)))
+
+
+def test_mock_bank_only_tracks_attempts_of_recent_origins():
+    bank = SimulatedBank(MockBancoComercioBehaviour(seed=5), max_tracked_origins=3)
+
+    first_draw = bank._rng_for("origin-0").random()
+    retry_draw = bank._rng_for("origin-0").random()
+    for index in range(1, 4):
+        bank._rng_for(f"origin-{index}")
+
+    assert first_draw != retry_draw
+    assert list(bank._attempts) == ["origin-1", "origin-2", "origin-3"]
+    # Evicted: its next call draws like a first attempt again
+    assert bank._rng_for("origin-0").random() == first_draw
+    assert len(bank._attempts) == 3
+
+
+def test_mock_bank_injects_timeouts_and_http_errors():
+    async def scenario():
+        connector, _ = _simulated(MockBancoComercioBehaviour(timeout_rate=0.2, error_rate=0.3, seed=3))
+        outcomes = {"ok": 0, "timeout": 0, "error": 0}
+        for index in range(500):
+            try:
+                response = await connector.execute_request(_transfer(f"origin-{index}"))
+                assert response["statusCode"] == 0
+                outcomes["ok"] += 1
+            except httpx.ReadTimeout as exc:
+                assert is_retryable(exc)
+                outcomes["timeout"] += 1
+            except httpx.HTTPStatusError as exc:
+                assert exc.response.status_code in (500, 502, 503)
+                outcomes["error"] += 1
+        assert connector.stats()["bank"]["timeouts"] == outcomes["timeout"]
+        await connector.shutdown()
+        return outcomes
+
+    outcomes = asyncio.run(scenario())
+    assert 70 < outcomes["timeout"] < 130
+    assert 110 < outcomes["error"] < 190
+    assert outcomes == asyncio.run(scenario())
+
+
+def test_mock_bank_expires_tokens_and_enforces_its_quota():
+    now = [0.0]
+    behaviour = MockBancoComercioBehaviour(token_ttl_seconds=300.0, rate_limit_per_second=1.0, rate_limit_burst=2)
+    connector, _ = _simulated(behaviour, now)
+
+    async def scenario():
+        assert (await connector.execute_request(_transfer("origin-1")))["statusCode"] == 0
+        assert (await connector.execute_request(_transfer("origin-2", concept="REJECT")))["statusCode"] == 4099
+        try:
+            await connector.execute_request(_transfer("origin-3"))
+            raise AssertionError("quota should be exhausted")
+        except httpx.HTTPStatusError as exc:
+            assert exc.response.status_code == 429
+            assert exc.response.headers["Retry-After"] == "1"
+            assert is_retryable(exc)
+
+        # The bank expired the token while the connector still holds it: one 401, then a new token
+        now[0] = 301.0
+        assert (await connector.execute_request(_transfer("origin-3")))["statusCode"] == 0
+        stats = connector.stats()
+        await connector.shutdown()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["bank"]["unauthorized"] == 1
+    assert stats["bank"]["tokens_issued"] == 2
+    assert stats["token"]["invalidations"] == 1
+
+
+def test_connector_sends_exactly_the_signed_bytes_to_the_standin(monkeypatch):
+    monkeypatch.setattr(banco_comercio.settings, "bdc_secret_key", "s3cret")
+    standin = BancoComercioStandIn(MockBancoComercioBehaviour(latency="fixed", latency_ms=1.0))
+    connector = BancoComercioConnector(transport=httpx.ASGITransport(app=standin))
+    # Non-ASCII text is where httpx's json= encoding and the signed string used to differ
+    request = {"originId": "origin-1", "to": {"owner": {"personName": "José Peña"}}, "body": {"amount": 10.0}}
+
+    async def scenario():
+        response = await connector.execute_request(request)
+        assert response["statusCode"] == 0
+        assert response["data"]["request"]["to"]["owner"]["personName"] == "José Peña"
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=standin), base_url="http://bank") as client:
+            token = (await client.post("/auth", json={})).json()["data"]["accessToken"]
+            body = json.dumps({**request, "originId": "origin-2"}, separators=(",", ":")).encode()
+            expected = hmac.new(b"s3cret", b"[movements/transfer-request]" + body, hashlib.sha256).hexdigest()
+            headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+            signed = await client.post("/movements/transfer-request", content=body, headers={**headers, "X-SIGNATURE": expected})
+            assert signed.status_code == 200
+            tampered = await client.post(
+                "/movements/transfer-request", content=body.replace(b"10.0", b"99.0"), headers={**headers, "X-SIGNATURE": expected}
+            )
+            assert tampered.status_code == 403
+        await connector.shutdown()
+
+    asyncio.run(scenario())
+    assert standin.stats()["invalid_signatures"] == 1
+    assert standin.stats()["transfers"] == 2
+
+
+class FlakyBank(ConnectorIntegration):
+    name = "flaky"
+
+    def __init__(self):
+        self.status = 200
+        self.delay = 0.0
+        self.calls = 0
+
+    async def build_request(self, data):
+        return {}
+
+    async def execute_request(self, request):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.status != 200:
+            bank_request = httpx.Request("POST", "https://bank.test/transfers")
+            raise httpx.HTTPStatusError("bank", request=bank_request, response=httpx.Response(self.status))
+        return {"statusCode": 0}
+
+    async def handle_response(self, response):
+        return ConnectorResponse(status=PaymentState.AUTHORIZED, raw_response=response)
+
+
+def test_circuit_breaker_opens_on_errors_and_closes_after_probes():
+    now = [0.0]
+    bank = FlakyBank()
+    breaker = CircuitBreaker(window=10, min_calls=4, open_seconds=30.0, half_open_calls=2, clock=lambda: now[0])
+    connector = ResilientConnector(bank, breaker=breaker, limiter=AdaptiveLimiter(initial=4))
+
+    async def call():
+        try:
+            await connector.execute_request({})
+            return "ok"
+        except httpx.HTTPStatusError:
+            return "error"
+        except CircuitOpenError as exc:
+            return exc.retry_after
+
+    async def scenario():
+        # Business rejections are answers from a healthy bank
+        bank.status = 400
+        assert [await call() for _ in range(4)] == ["error"] * 4
+        assert breaker.state == "closed"
+
+        bank.status = 503
+        assert [await call() for _ in range(4)] == ["error"] * 4
+        assert breaker.state == "open"
+        calls = bank.calls
+        now[0] = 10.0
+        assert await call() == 20.0
+        assert bank.calls == calls
+
+        now[0] = 31.0
+        bank.status = 200
+        assert await call() == "ok"
+        assert breaker.state == "half_open"
+        assert await call() == "ok"
+        assert breaker.state == "closed"
+
+    asyncio.run(scenario())
+    stats = connector.stats()
+    assert stats["circuit_breaker"]["opened"] == 1
+    assert stats["circuit_breaker"]["rejected"] == 1
+    assert stats["concurrency_limit"]["in_flight"] == 0
+
+
+def test_adaptive_limit_backs_off_on_slow_calls_and_bounds_waiting():
+    bank = FlakyBank()
+    limiter = AdaptiveLimiter(initial=4, min_limit=1, latency_target=0.01, max_wait=0.05)
+    connector = ResilientConnector(bank, breaker=CircuitBreaker(min_calls=100), limiter=limiter)
+
+    async def scenario():
+        bank.delay = 0.1
+        return await asyncio.gather(*(connector.execute_request({}) for _ in range(8)), return_exceptions=True)
+
+    outcomes = asyncio.run(scenario())
+
+    # The first four waited past max_wait for a slot held by a slow call
+    assert sum(isinstance(outcome, ConnectorOverloaded) for outcome in outcomes) == 4
+    assert bank.calls == 4
+    assert limiter.limit < 4
+    assert limiter.in_flight == 0
+    assert limiter.stats()["rejected"] == 4
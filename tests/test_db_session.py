@@ -0,0 +1,283 @@
+import asyncio
+from types import SimpleNamespace
+
+import asyncpg
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.db import session as session_module
+from app.db.query_stats import QueryBudgetExceeded, query_budget, track_queries
+from app.db.session import TenantEngines, set_current_tenant, validate_tenant
+
+POSTGRES_URL = "postgresql+asyncpg://app@db/payments"
+
+
+class FakePgStatement:
+    def __init__(self, run, status="SELECT 1"):
+        self.run = run
+        self.status = status
+
+    def get_attributes(self):
+        return [] if self.status == "SET" else [SimpleNamespace(name="value", type=SimpleNamespace(oid=25))]
+
+    async def fetch(self, *params):
+        # Evaluated per execution: the adapter caches prepared statements per connection
+        return self.run()
+
+    def get_statusmsg(self):
+        return self.status
+
+
+class FakePgTransaction:
+    def __init__(self, connection):
+        self.connection = connection
+
+    async def start(self):
+        self.search_path = self.connection.search_path
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        # As in Postgres, a SET issued inside the transaction does not outlive its rollback
+        self.connection.search_path = self.search_path
+
+
+class FakePgConnection:
+    """Just enough of an asyncpg connection for the SQLAlchemy adapter."""
+
+    def __init__(self, server_settings):
+        self.search_path = server_settings.get("search_path", "public")
+        self.closed = False
+
+    def transaction(self, **options):
+        return FakePgTransaction(self)
+
+    async def set_type_codec(self, *args, **kwargs):
+        pass
+
+    async def prepare(self, sql, name=None):
+        statement = sql.strip()
+        lowered = statement.lower()
+        if lowered.startswith("set search_path to "):
+            return FakePgStatement(lambda: self._set_search_path(statement[len("set search_path to "):]), "SET")
+        if lowered == "show search_path":
+            return FakePgStatement(lambda: [(self.search_path,)])
+        if lowered == "select current_schema()":
+            return FakePgStatement(lambda: [(self.search_path.split(",")[0],)])
+        answers = {
+            "select pg_catalog.version()": "PostgreSQL 16.2",
+            "show transaction isolation level": "read committed",
+            "show standard_conforming_strings": "on",
+        }
+        if lowered in answers:
+            return FakePgStatement(lambda: [(answers[lowered],)])
+        if "pg_last_wal_replay_lsn" in lowered:
+            return FakePgStatement(lambda: [(0,)])
+        raise AssertionError(f"unexpected SQL: {statement}")
+
+    def _set_search_path(self, search_path):
+        self.search_path = search_path
+        return []
+
+    async def fetchrow(self, sql):
+        return None
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self, timeout=None):
+        self.closed = True
+
+    def terminate(self):
+        self.closed = True
+
+
+def _fake_postgres(monkeypatch):
+    """Route asyncpg connections to fakes; one pooled connection per tenant engine."""
+    connections = []
+
+    async def connect(*args, server_settings=None, **kwargs):
+        connections.append(FakePgConnection(server_settings or {}))
+        return connections[-1]
+
+    monkeypatch.setattr(asyncpg, "connect", connect)
+    monkeypatch.setattr(session_module.settings, "db_tenant_pool_size", 1)
+    monkeypatch.setattr(session_module.settings, "db_tenant_max_overflow", 0)
+    return connections
+
+
+def test_tenant_identifiers_are_validated():
+    assert validate_tenant("acme_01") == "acme_01"
+    for invalid in ["", "1acme", "acme; DROP TABLE transfers", 'acme"', "a" * 64]:
+        with pytest.raises(ValueError):
+            validate_tenant(invalid)
+    with pytest.raises(ValueError):
+        set_current_tenant("public, pg_catalog")
+
+
+def test_tenant_engines_are_a_bounded_lru(monkeypatch):
+    created = []
+
+    class FakeEngine:
+        def __init__(self, tenant_id):
+            self.tenant_id = tenant_id
+            self.disposed = False
+
+        async def dispose(self):
+            self.disposed = True
+
+    def fake_create(tenant_id, **pool_options):
+        created.append(tenant_id)
+        return FakeEngine(tenant_id)
+
+    monkeypatch.setattr(session_module, "_create_tenant_engine", fake_create)
+
+    async def scenario():
+        default = FakeEngine("public")
+        engines = TenantEngines(default, max_engines=2)
+        assert engines.get("public") is default
+        a = engines.get("tenant_a")
+        engines.get("tenant_b")
+        assert engines.get("tenant_a") is a
+        engines.get("tenant_c")  # evicts tenant_b, the least recently used
+        await asyncio.sleep(0)
+        stats = engines.stats()
+        await engines.dispose()
+        return a, default, stats
+
+    a, default, stats = asyncio.run(scenario())
+
+    assert created == ["tenant_a", "tenant_b", "tenant_c"]
+    assert stats["evicted"] == 1 and stats["engines"] == 3
+    assert a.disposed and default.disposed
+
+
+def test_search_path_survives_a_rollback_on_the_first_checkout(monkeypatch):
+    connections = _fake_postgres(monkeypatch)
+    engines = TenantEngines(
+        session_module._create_tenant_engine(session_module.DEFAULT_TENANT, url=POSTGRES_URL),
+        max_engines=2,
+        url=POSTGRES_URL,
+    )
+    monkeypatch.setattr(session_module, "tenant_engines", engines)
+
+    async def scenario():
+        with pytest.raises(LookupError):
+            async with session_module.tenant_session("acme") as session:
+                await session.execute(text("SHOW search_path"))
+                raise LookupError("transfer not found")
+        async with session_module.tenant_session("acme") as session:
+            search_path = (await session.execute(text("SHOW search_path"))).scalar()
+        await engines.dispose()
+        return search_path
+
+    assert asyncio.run(scenario()) == "acme, public"
+    assert len(connections) == 1
+
+
+def test_replica_router_prefers_primary_after_writes_and_failures():
+    class LagEngine:
+        lag = 0.0
+
+        def connect(self):
+            engine = self
+
+            class Connection:
+                async def __aenter__(self):
+                    return self
+
+                async def __aexit__(self, *exc):
+                    return False
+
+                async def execute(self, statement):
+                    if engine.lag is None:
+                        raise OSError("replica down")
+                    return type("Result", (), {"scalar": lambda _: engine.lag})()
+
+            return Connection()
+
+    replica = LagEngine()
+    router = session_module.ReplicaRouter(
+        TenantEngines(replica, max_engines=2),
+        read_your_writes=60,
+        max_lag=5,
+        lag_check_interval=0,
+        retry_after=60,
+    )
+
+    async def scenario():
+        results = [await router.use_replica("tenant_a")]
+        router.record_write("tenant_a")
+        results += [await router.use_replica("tenant_a"), await router.use_replica("tenant_b")]
+        replica.lag = 30.0
+        results.append(await router.use_replica("tenant_b"))
+        replica.lag = None
+        results.append(await router.use_replica("tenant_b"))
+        replica.lag = 0.0
+        results.append(await router.use_replica("tenant_b"))
+        return results
+
+    assert asyncio.run(scenario()) == [True, False, True, False, False, False]
+    assert router.stats()["failures"] == 1
+
+
+def test_replica_reads_keep_the_tenant_search_path(monkeypatch):
+    connections = _fake_postgres(monkeypatch)
+    router = session_module.ReplicaRouter(
+        TenantEngines(
+            session_module._create_tenant_engine(session_module.DEFAULT_TENANT, url=POSTGRES_URL),
+            max_engines=2,
+            url=POSTGRES_URL,
+        ),
+        read_your_writes=60,
+        max_lag=5,
+        lag_check_interval=0,
+        retry_after=60,
+    )
+    monkeypatch.setattr(session_module, "replica_router", router)
+
+    async def scenario():
+        search_paths = []
+        for _ in range(2):
+            # Each replica read ends in a rollback
+            async with session_module.read_session("tenant_x") as session:
+                search_paths.append((await session.execute(text("SHOW search_path"))).scalar())
+        stats = router.stats()
+        await router.engines.dispose()
+        return search_paths, stats
+
+    search_paths, stats = asyncio.run(scenario())
+
+    assert search_paths == ["tenant_x, public", "tenant_x, public"]
+    assert stats["replica_reads"] == 2
+    # One connection for the lag checks and a single pooled one reused by both reads
+    assert len(connections) == 2
+
+
+def test_query_stats_count_statements_and_log_slow_ones_redacted(monkeypatch, caplog):
+    engine = create_engine("sqlite://")
+    with engine.connect() as connection:
+        connection.execute(text("CREATE TABLE accounts (number TEXT, owner TEXT)"))
+
+        with track_queries() as stats:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+        assert (stats.count, stats.slow) == (2, 0)
+        assert stats.seconds > 0
+
+        monkeypatch.setattr(session_module.settings, "db_slow_query_seconds", 0.0)
+        with caplog.at_level("WARNING", logger="app.db.query_stats"):
+            connection.execute(
+                text("INSERT INTO accounts VALUES (:number, :owner)"),
+                {"number": "0000000000000000000000", "owner": "Jane Roe"},
+            )
+        assert "Slow query" in caplog.text
+        assert "parameters: ['str', 'str']" in caplog.text
+        assert "Jane Roe" not in caplog.text
+
+        with pytest.raises(QueryBudgetExceeded, match="3 queries, budget is 2"):
+            with query_budget(2):
+                for _ in range(3):
+                    connection.execute(text("SELECT 1"))
+    engine.dispose()
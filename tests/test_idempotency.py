@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from app.adapters.idempotency.memory_store import InMemoryIdempotencyStore
+from app.core.payments.idempotency import (
+    IdempotencyGuard,
+    IdempotencyInProgress,
+    IdempotencyKeyReused,
+    request_fingerprint,
+)
+from app.ports.idempotency_store import IN_PROGRESS, IdempotencyRecord
+
+
+def test_concurrent_duplicates_share_one_execution_and_later_ones_replay():
+    guard = IdempotencyGuard(InMemoryIdempotencyStore())
+    calls = []
+
+    async def execute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"paymentId": "p-1"}
+
+    async def scenario():
+        concurrent = await asyncio.gather(*(guard.run("public:transfers:k", "fp", execute) for _ in range(5)))
+        later = await guard.run("public:transfers:k", "fp", execute)
+        return concurrent, later
+
+    concurrent, later = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert [replayed for _, replayed in concurrent].count(False) == 1
+    assert all(result == {"paymentId": "p-1"} for result, _ in concurrent)
+    assert later == ({"paymentId": "p-1"}, True)
+
+
+def test_failed_execution_releases_the_key_and_reused_keys_are_rejected():
+    guard = IdempotencyGuard(InMemoryIdempotencyStore())
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("bank timeout")
+        return {"status": "AUTHORIZED"}
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await guard.run("k", "fp", flaky)
+        result = await guard.run("k", "fp", flaky)
+        with pytest.raises(IdempotencyKeyReused):
+            await guard.run("k", "other-body", flaky)
+        return result
+
+    assert asyncio.run(scenario()) == ({"status": "AUTHORIZED"}, False)
+    assert len(attempts) == 2
+
+
+def test_claim_held_by_another_worker_is_waited_on_then_reported():
+    store = InMemoryIdempotencyStore()
+    guard = IdempotencyGuard(store, wait_timeout=0.05, poll_interval=0.01)
+
+    async def execute():
+        raise AssertionError("must not run while another worker holds the key")
+
+    async def scenario():
+        await store.claim("k", IdempotencyRecord(IN_PROGRESS, "fp", "other-worker"), ttl=60)
+        with pytest.raises(IdempotencyInProgress):
+            await guard.run("k", "fp", execute)
+
+    asyncio.run(scenario())
+
+
+def test_fingerprint_ignores_key_order():
+    assert request_fingerprint({"a": 1, "b": {"c": 2}}) == request_fingerprint({"b": {"c": 2}, "a": 1})
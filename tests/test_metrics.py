@@ -0,0 +1,45 @@
+import asyncio
+import random
+
+from app.core.metrics import STAGE_METRIC, LatencyHistogram, StageMetrics
+from app.core.payments.operation import PaymentOperation
+from app.core.payments.types import PaymentData
+
+
+def test_histogram_percentiles_stay_within_bucket_precision():
+    rng = random.Random(7)
+    values = sorted(int(rng.paretovariate(1.5) * 200) for _ in range(20000))
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+
+    for quantile in (0.5, 0.9, 0.99, 0.999):
+        exact = values[round(quantile * len(values)) - 1]
+        assert abs(histogram.percentile(quantile) * 1e6 - exact) <= exact * 0.035 + 1
+    assert histogram.percentile(1.0) * 1e6 == values[-1]
+    assert histogram.cumulative([0.0001, 3600.0]) == [sum(1 for value in values if value <= 100), len(values)]
+
+
+def test_stages_are_recorded_per_label_and_rendered_as_prometheus_text():
+    metrics = StageMetrics(tenant_of=lambda: "acme")
+    operation = PaymentOperation(metrics=metrics)
+
+    async def scenario():
+        await operation._prepare(PaymentData(amount=10), "mock")
+        try:
+            await operation._prepare(PaymentData(amount=0), "mock")
+        except ValueError:
+            pass
+
+    asyncio.run(scenario())
+
+    assert metrics.histograms[("validate_request", "mock", "acme", "ok")].count == 1
+    assert metrics.histograms[("validate_request", "mock", "acme", "error")].count == 1
+    assert metrics.histograms[("domain_logic", "mock", "acme", "ok")].count == 1
+
+    text = metrics.render()
+    labels = 'stage="validate_request",connector="mock",tenant="acme",outcome="error"'
+    assert f"# TYPE {STAGE_METRIC} histogram" in text
+    assert f'{STAGE_METRIC}_bucket{{{labels},le="+Inf"}} 1' in text
+    assert f"{STAGE_METRIC}_count{{{labels}}} 1" in text
+    assert f'{STAGE_METRIC}_quantile{{{labels},quantile="0.99"}}' in text
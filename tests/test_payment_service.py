@@ -0,0 +1,100 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from app.adapters.db.memory_repository import InMemoryPaymentRepository
+from app.adapters.db.sql_payment_repository import SqlAlchemyPaymentRepository
+from app.domain.models import Payment, PaymentStatus, StalePaymentError
+from app.ports.gateway import PaymentGateway
+from app.services.payment_service import PaymentService
+
+
+class SlowGateway(PaymentGateway):
+    def __init__(self):
+        self.calls = 0
+
+    async def process_payment(self, payment: Payment) -> bool:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return True
+
+
+class RecordingSession:
+    def __init__(self, row):
+        self.row = row
+        self.statements = []
+        self.info = {}
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return SimpleNamespace(one_or_none=lambda: self.row, one=lambda: self.row)
+
+
+def test_concurrent_process_calls_reach_the_gateway_once():
+    async def scenario():
+        repository = InMemoryPaymentRepository()
+        gateway = SlowGateway()
+        service = PaymentService(repository, gateway)
+        payment = await service.create_payment(100.0, "USD")
+
+        results = await asyncio.gather(*(service.process_payment(payment.id) for _ in range(5)))
+        return gateway.calls, results
+
+    calls, results = asyncio.run(scenario())
+
+    assert calls == 1
+    # Losers get whatever state the payment was in when they lost the claim
+    assert {result.status for result in results} <= {PaymentStatus.PROCESSING, PaymentStatus.COMPLETED}
+    assert max(result.version for result in results) == 3
+
+
+def test_memory_update_rejects_stale_versions():
+    async def scenario():
+        repository = InMemoryPaymentRepository()
+        payment = await repository.create(Payment(amount=10.0, currency="USD"))
+        await repository.update(payment.model_copy(update={"currency": "ARS"}))
+        await repository.update(payment.model_copy(update={"currency": "EUR"}))
+
+    with pytest.raises(StalePaymentError):
+        asyncio.run(scenario())
+
+
+def test_sql_transition_is_one_conditional_update_returning():
+    now = datetime.now(timezone.utc)
+    payment_id = uuid4()
+    row = SimpleNamespace(
+        id=payment_id,
+        amount=100,
+        currency="USD",
+        status=PaymentStatus.PROCESSING,
+        version=2,
+        created_at=now,
+        updated_at=now,
+    )
+    session = RecordingSession(row)
+
+    claimed = asyncio.run(
+        SqlAlchemyPaymentRepository(session).transition(payment_id, PaymentStatus.PENDING, PaymentStatus.PROCESSING)
+    )
+
+    assert len(session.statements) == 1
+    sql = str(session.statements[0].compile(dialect=asyncpg.dialect()))
+    assert sql.startswith("UPDATE payments SET")
+    assert "version=(payments.version + $" in sql
+    assert "WHERE payments.id = $" in sql and "payments.status = $" in sql
+    assert "RETURNING payments.id" in sql
+    assert claimed.status == PaymentStatus.PROCESSING and claimed.version == 2
+
+
+def test_sql_transition_returns_none_when_the_row_was_already_claimed():
+    session = RecordingSession(None)
+
+    claimed = asyncio.run(
+        SqlAlchemyPaymentRepository(session).transition(uuid4(), PaymentStatus.PENDING, PaymentStatus.PROCESSING)
+    )
+
+    assert claimed is None
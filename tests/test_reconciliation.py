@@ -0,0 +1,59 @@
+import io
+from pathlib import Path
+
+from app.core.payments.types import PaymentState
+from app.core.reconciliation.engine import LedgerEntry, reconcile, report_rows
+from app.core.reconciliation.statement import load_json, load_statement, to_cents
+
+SAMPLE_STATEMENT = Path(__file__).resolve().parents[1] / "docs" / "samples" / "bdc_statement_sample.csv"
+
+
+def test_reconcile_sample_statement_against_ledger():
+    statement = load_statement(SAMPLE_STATEMENT)
+    ledger = [
+        # Matched through the provider reference stored in metadata
+        LedgerEntry("local-1", "7f3c1e2a9b8d4c6e8f0a1b2c3d4e5f60", 12345, "ARS", PaymentState.AUTHORIZED),
+        # Matched through originId when no reference was stored
+        LedgerEntry("0a9b8c7d6e5f40312a1b2c3d4e5f6071", None, 250000, "ARS", PaymentState.AUTHORIZED),
+        # Bank rejected it, we still think it went through
+        LedgerEntry("1b2c3d4e5f60718293a4b5c6d7e8f901", None, 9990, "ARS", PaymentState.AUTHORIZED),
+        LedgerEntry("2c3d4e5f607182934a5b6c7d8e9f0a12", None, 1001, "ARS", PaymentState.AUTHORIZED),
+        LedgerEntry("never-settled", None, 500, "ARS", PaymentState.AUTHORIZED),
+    ]
+
+    report = reconcile(statement, ledger)
+
+    assert report.summary() == {
+        "matched": 2,
+        "amount_mismatches": 1,
+        "status_mismatches": 1,
+        "missing_in_statement": 1,
+        "missing_in_ledger": 0,
+        "duplicates": 0,
+        "rejected_lines": 0,
+    }
+    assert report.amount_mismatches[0].statement.amount_cents == 1000
+    assert report.status_mismatches[0].statement.status == "RECHAZADA"
+    assert {row["kind"] for row in report_rows(report)} == {"amount_mismatch", "status_mismatch", "missing_in_statement"}
+
+
+def test_json_statements_duplicates_and_bad_lines():
+    statement = load_json(
+        io.StringIO(
+            '{"movements": ['
+            '{"dest_ori_trx_id": "a", "amount": "10.5", "status": "OK"},'
+            '{"dest_ori_trx_id": "a", "amount": "10.50", "status": "OK"},'
+            '{"dest_ori_trx_id": "b", "amount": "abc"},'
+            '{"originId": "c", "amount": 3}'
+            "]}"
+        )
+    )
+
+    report = reconcile(statement, [LedgerEntry("a", None, 1050, "ARS", PaymentState.CAPTURED)])
+
+    assert len(statement) == 2
+    assert [line.line for line in report.duplicates] == [2]
+    assert report.rejected_lines == [3]
+    assert [line.reference for line in report.missing_in_ledger] == ["c"]
+    assert len(report.matched) == 1
+    assert [to_cents(value) for value in ("1234.56", "-0.5", "7", 3)] == [123456, -50, 700, 300]
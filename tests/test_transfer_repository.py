@@ -0,0 +1,501 @@
+import asyncio
+import copy
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.dialects.postgresql import asyncpg
+from sqlalchemy.exc import IntegrityError
+
+from app.adapters.db import event_buffer as event_buffer_module
+from app.adapters.db import transfer_outbox
+from app.adapters.db.event_buffer import TransferEventBuffer, TransferEventRow
+from app.adapters.db.memory_transfer_repository import InMemoryTransferRepository
+from app.adapters.db.payload_store import PayloadStore
+from app.adapters.db.sql_transfer_repository import SqlAlchemyTransferRepository
+from app.adapters.db.transfer_cache import TransferCache
+from app.core.payments.frozen import FrozenDict, freeze, frozen_json_loads
+from app.core.payments.operation import PaymentOperation
+from app.core.payments.payload_codec import PayloadEncoder, collect_refs, decode_blobs, rehydrate
+from app.core.payments.types import PaymentData, PaymentState, TransferRequest
+from app.db import partitions
+from app.ports.transfer_repository import DuplicateOriginId
+
+TRANSFER_REQUEST = {
+    "source": {
+        "addressType": "CBU_CVU",
+        "address": "0000000000000000000000",
+        "owner": {"personIdType": "CUI", "personId": "20304050607", "personName": "John Doe"},
+    },
+    "destination": {
+        "addressType": "CBU_CVU",
+        "address": "9999999999999999999999",
+        "owner": {"personIdType": "CUI", "personId": "20987654321", "personName": "Jane Roe"},
+    },
+    "body": {"amount": "123.45", "currency": "ARS", "description": "Test transfer", "concept": "VAR"},
+}
+
+
+def _payment_data(**overrides) -> PaymentData:
+    request = TransferRequest.model_validate(TRANSFER_REQUEST)
+    values = dict(
+        source=request.source,
+        destination=request.destination,
+        transfer_body=request.body,
+        description=request.body.description,
+        origin_id="origin-1",
+        metadata={"client_request": request.model_dump(by_alias=True)},
+    )
+    values.update(overrides)
+    return PaymentData(**values)
+
+
+class RecordingSession:
+    def __init__(self, row):
+        self.row = row
+        self.statements = []
+        self.info = {}
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return SimpleNamespace(one_or_none=lambda: self.row)
+
+
+def _returning_row(data: PaymentData):
+    return SimpleNamespace(
+        id=1,
+        payment_id=data.payment_id,
+        origin_id=data.origin_id,
+        status=data.status,
+        amount=data.amount,
+        currency=data.currency,
+        concept=data.transfer_body.concept,
+        description=data.description,
+        connector_id=None,
+        source_address=data.source.address,
+        source_address_type=data.source.address_type,
+        source_owner_id_type=data.source.owner.person_id_type,
+        source_owner_id=data.source.owner.person_id,
+        source_owner_name=data.source.owner.person_name,
+        destination_address=data.destination.address,
+        destination_address_type=data.destination.address_type,
+        destination_owner_id_type=data.destination.owner.person_id_type,
+        destination_owner_id=data.destination.owner.person_id,
+        destination_owner_name=data.destination.owner.person_name,
+        created_at=data.created_at,
+        updated_at=data.created_at,
+        payment_description=data.description,
+    )
+
+
+def test_save_is_a_single_upsert_statement():
+    data = _payment_data(status=PaymentState.AUTHORIZED)
+    data.metadata["connector_response"] = {"statusCode": 0}
+    session = RecordingSession(_returning_row(data))
+
+    saved = asyncio.run(SqlAlchemyTransferRepository(session).save(data))
+
+    assert len(session.statements) == 1
+    sql = str(session.statements[0].compile(dialect=asyncpg.dialect()))
+    assert sql.count("INSERT INTO") == 4
+    assert "ON CONFLICT (id) DO NOTHING" in sql
+    assert "ON CONFLICT (payment_id, created_at) DO UPDATE" in sql
+    assert "INSERT INTO transfer_lookup" in sql
+    # Only a re-save of the same payment is absorbed; a taken origin_id must fail
+    assert "ON CONFLICT (payment_id) DO NOTHING" in sql
+    assert saved.origin_id == "origin-1"
+    assert saved.status == PaymentState.AUTHORIZED
+    assert saved.metadata["connector_response"] == {"statusCode": 0}
+
+
+
+def test_save_many_writes_a_batch_with_one_upsert_and_one_event_insert():
+    items = [_payment_data(), _payment_data()]
+    items[1].origin_id = "origin-2"
+
+    class BulkSession(RecordingSession):
+        async def execute(self, statement):
+            self.statements.append(statement)
+            return SimpleNamespace(all=lambda: [_returning_row(data) for data in items])
+
+    session = BulkSession(None)
+    saved = asyncio.run(SqlAlchemyTransferRepository(session).save_many(items, dispatch=True))
+
+    assert [data.origin_id for data in saved] == ["origin-1", "origin-2"]
+    assert len(session.statements) == 2
+    upsert, events = (str(statement.compile(dialect=asyncpg.dialect())) for statement in session.statements)
+    # Two VALUES tuples per table, not one statement per transfer
+    assert upsert.count("INSERT INTO") == 4
+    assert "INSERT INTO transfer_outbox" in upsert
+    assert "ON CONFLICT (payment_id, created_at) DO UPDATE" in upsert
+    assert "LEFT OUTER JOIN payment_upsert" in upsert
+    assert upsert.count("), (") == 2
+    assert events.startswith("INSERT INTO transfer_events")
+    assert events.count("), (") == 1
+def test_save_with_payload_store_writes_blobs_in_the_same_statement():
+    data = _payment_data(status=PaymentState.AUTHORIZED)
+    data.metadata["connector_response"] = {"statusCode": 0, "data": {"request": dict(TRANSFER_REQUEST)}}
+    session = RecordingSession(_returning_row(data))
+
+    saved = asyncio.run(SqlAlchemyTransferRepository(session, payload_store=PayloadStore(codec="gzip")).save(data))
+
+    assert len(session.statements) == 1
+    sql = str(session.statements[0].compile(dialect=asyncpg.dialect()))
+    assert "INSERT INTO payload_blobs" in sql
+    assert "ON CONFLICT (hash) DO NOTHING" in sql
+    # The caller still gets the documents, not the references
+    assert saved.metadata["client_request"]["body"]["concept"] == "VAR"
+    assert saved.metadata["connector_response"]["data"]["request"]["body"]["amount"] == "123.45"
+
+
+def test_payload_encoder_deduplicates_and_rehydrates():
+    client_request = freeze({"originId": "origin-1", **TRANSFER_REQUEST})
+    response = freeze({"statusCode": 0, "message": "ok", "data": {"request": client_request, "originId": "origin-1"}})
+    metadata = freeze({"client_request": client_request, "connector_response": response, "provider_reference_id": "x"})
+    # gzip by default, so the blobs stay readable where zstandard is not installed
+    encoder = PayloadEncoder(min_compress_bytes=0)
+
+    stored_metadata, stored_response = encoder.encode(metadata, response)
+    # A second save of the same transfer yields the same references and no new blobs
+    again_metadata, _ = encoder.encode(metadata, response)
+
+    assert again_metadata == stored_metadata
+    assert stored_metadata["connector_response"] == stored_response
+    assert stored_metadata["provider_reference_id"] == "x"
+    # The echoed request is the client request: two distinct blobs in total
+    assert len(encoder.blobs) == 2
+    assert {blob.encoding for blob in encoder.blobs.values()} == {"gzip"}
+
+    documents = decode_blobs(encoder.blobs.values())
+    assert collect_refs(list(documents.values())) <= documents.keys()
+    assert rehydrate(stored_metadata, documents) == metadata
+    assert rehydrate(stored_response, documents) == response
+    # Inline values are returned untouched
+    assert rehydrate(metadata, documents) is metadata
+
+
+def test_accepted_transfer_writes_its_outbox_row_in_the_same_statement():
+    data = _payment_data()
+    session = RecordingSession(_returning_row(data))
+
+    asyncio.run(SqlAlchemyTransferRepository(session).save(data, dispatch=True))
+
+    assert len(session.statements) == 1
+    sql = str(session.statements[0].compile(dialect=asyncpg.dialect()))
+    assert "INSERT INTO transfer_outbox (payment_id, origin_id, created_at) SELECT" in sql
+    assert "ON CONFLICT (payment_id) DO NOTHING" in sql
+
+
+def test_outbox_relay_claims_with_skip_locked():
+    class ClaimSession:
+        def __init__(self):
+            self.statements = []
+
+        async def execute(self, statement):
+            self.statements.append(statement)
+            return SimpleNamespace(all=lambda: [])
+
+    session = ClaimSession()
+    asyncio.run(transfer_outbox.claim_unpublished(session, 100))
+
+    sql = str(session.statements[0].compile(dialect=asyncpg.dialect()))
+    assert sql.startswith("UPDATE transfer_outbox SET published_at=now()")
+    assert "WHERE transfer_outbox.published_at IS NULL ORDER BY transfer_outbox.id" in sql
+    assert "FOR UPDATE SKIP LOCKED" in sql
+
+
+def test_worker_claim_is_a_lease_reclaimed_after_a_crash():
+    class ClaimSession:
+        def __init__(self):
+            self.statements = []
+
+        async def execute(self, statement):
+            self.statements.append(statement)
+            return SimpleNamespace(all=lambda: [])
+
+    session = ClaimSession()
+    asyncio.run(transfer_outbox.claim_pending(session, 16, lease=300.0))
+
+    compiled = session.statements[0].compile(dialect=asyncpg.dialect())
+    sql = str(compiled)
+    # A lease, not a final mark: the row is due again once next_attempt_at passes
+    # Counted when claimed, so a claim whose worker dies still uses up an attempt
+    assert sql.startswith("UPDATE transfer_outbox SET attempts=(transfer_outbox.attempts + $")
+    assert "next_attempt_at=(now() + $" in sql
+    assert "dispatched_at=" not in sql
+    assert timedelta(seconds=300) in compiled.params.values()
+    assert "WHERE transfer_outbox.dispatched_at IS NULL AND transfer_outbox.next_attempt_at <= now()" in sql
+    assert "ORDER BY transfer_outbox.next_attempt_at, transfer_outbox.id" in sql
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert sql.endswith("RETURNING transfer_outbox.payment_id, transfer_outbox.attempts")
+
+
+def test_retry_replaces_the_lease_and_settling_ends_the_claims():
+    session = RecordingSession(None)
+
+    asyncio.run(transfer_outbox.schedule_retry(session, uuid4(), 30.0, "ConnectTimeout"))
+    asyncio.run(transfer_outbox.schedule_retry(session, uuid4(), 30.0, "ConnectTimeout", count_attempt=False))
+    asyncio.run(transfer_outbox.mark_dispatched(session, uuid4()))
+
+    retry, claimed_retry, settled = (
+        str(statement.compile(dialect=asyncpg.dialect())) for statement in session.statements
+    )
+    assert "attempts=(transfer_outbox.attempts + $" in retry
+    assert "attempts" not in claimed_retry
+    assert "next_attempt_at=(now() + $" in retry
+    assert "last_error=" in retry
+    assert "dispatched_at" not in retry
+    assert settled.startswith("UPDATE transfer_outbox SET dispatched_at=now() WHERE transfer_outbox.payment_id = $")
+
+def test_transfer_cache_is_filled_on_commit_and_serves_reads():
+    data = _payment_data(status=PaymentState.AUTHORIZED)
+    session = RecordingSession(_returning_row(data))
+    cache = TransferCache(max_entries=10, ttl=0, terminal_ttl=60)
+    repository = SqlAlchemyTransferRepository(session, cache=cache)
+
+    async def scenario():
+        await repository.save(data)
+        before_commit = await cache.get("public", "origin-1")
+        for callback in session.info.pop("after_commit_callbacks"):
+            await callback()
+        return before_commit, await repository.get_by_origin_id("origin-1")
+
+    before_commit, cached = asyncio.run(scenario())
+
+    assert before_commit is None
+    assert cached.status == PaymentState.AUTHORIZED
+    # The read was answered without a second statement
+    assert len(session.statements) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_transfer_cache_expires_in_flight_states_and_keeps_final_ones():
+    cache = TransferCache(max_entries=2, ttl=0, terminal_ttl=60)
+
+    async def scenario():
+        await cache.set("public", _payment_data(origin_id="pending"))
+        await cache.set("public", _payment_data(origin_id="done", status=PaymentState.FAILED))
+        # A late in-flight write does not replace the final state
+        await cache.set("public", _payment_data(origin_id="done", status=PaymentState.CREATED))
+        await cache.set("tenant_b", _payment_data(origin_id="done", status=PaymentState.AUTHORIZED))
+        return (
+            await cache.get("public", "pending"),
+            await cache.get("public", "done"),
+            await cache.get("tenant_b", "done"),
+        )
+
+    pending, done, other_tenant = asyncio.run(scenario())
+
+    assert pending is None
+    assert done.status == PaymentState.FAILED
+    assert other_tenant.status == PaymentState.AUTHORIZED
+    assert cache.stats()["entries"] == 2
+
+
+def test_second_transfer_with_the_same_origin_id_is_rejected():
+    class ConflictingSession(RecordingSession):
+        async def execute(self, statement):
+            error = Exception(
+                'duplicate key value violates unique constraint "transfer_lookup_pkey"\n'
+                "DETAIL:  Key (origin_id)=(origin-1) already exists."
+            )
+            raise IntegrityError("INSERT", {}, error)
+
+    repository = InMemoryTransferRepository()
+    first, second = _payment_data(), _payment_data()
+
+    async def scenario():
+        await repository.save(first)
+        await repository.save(first)
+        with pytest.raises(DuplicateOriginId):
+            await repository.save(second)
+        with pytest.raises(DuplicateOriginId) as rejected:
+            await SqlAlchemyTransferRepository(ConflictingSession(None)).save(second)
+        return rejected.value
+
+    error = asyncio.run(scenario())
+
+    assert error.origin_id == "origin-1"
+    assert asyncio.run(repository.get_by_origin_id("origin-1")).payment_id == first.payment_id
+
+
+def test_batch_checks_taken_origin_ids_with_one_lookup():
+    class LookupSession(RecordingSession):
+        async def execute(self, statement):
+            self.statements.append(statement)
+            return SimpleNamespace(all=lambda: [("origin-1", self.row)])
+
+    class CountingRepository(InMemoryTransferRepository):
+        single_lookups = 0
+
+        async def get_by_origin_id(self, origin_id):
+            self.single_lookups += 1
+            return await super().get_by_origin_id(origin_id)
+
+    taken = _payment_data()
+    session = LookupSession(taken.payment_id)
+    repository = CountingRepository()
+    batch = [_payment_data(), _payment_data(origin_id="origin-2"), _payment_data(origin_id="origin-3")]
+
+    async def scenario():
+        await repository.save(taken)
+        found = await SqlAlchemyTransferRepository(session).get_payment_ids_by_origin_ids(["origin-1", "origin-2"])
+        results = await PaymentOperation(transfer_repository=repository).accept_many(batch)
+        return found, results
+
+    found, results = asyncio.run(scenario())
+
+    assert found == {"origin-1": taken.payment_id}
+    assert len(session.statements) == 1
+    sql = str(session.statements[0].compile(dialect=asyncpg.dialect()))
+    assert sql.startswith("SELECT transfer_lookup.origin_id, transfer_lookup.payment_id \nFROM transfer_lookup")
+    assert "transfer_lookup.origin_id IN" in sql
+    assert isinstance(results[0], DuplicateOriginId)
+    assert [result.status for result in results[1:]] == [PaymentState.CREATED, PaymentState.CREATED]
+    assert repository.single_lookups == 0
+
+
+def test_memory_repository_shares_frozen_metadata_between_reads():
+    repository = InMemoryTransferRepository()
+    data = _payment_data()
+
+    async def scenario():
+        await repository.save(data)
+        return await repository.get_by_origin_id("origin-1"), await repository.get_by_origin_id("origin-1")
+
+    first, second = asyncio.run(scenario())
+
+    assert first.metadata is not second.metadata
+    assert first.metadata["client_request"] is second.metadata["client_request"]
+    assert copy.deepcopy(first.metadata["client_request"]) is first.metadata["client_request"]
+    with pytest.raises(TypeError):
+        first.metadata["client_request"]["body"] = {}
+
+    first.metadata["note"] = "local change"
+    assert "note" not in second.metadata
+
+    decoded = frozen_json_loads('{"a": {"b": [1, {"c": 2}]}}')
+    assert isinstance(decoded["a"], FrozenDict)
+    assert decoded["a"]["b"] == (1, {"c": 2})
+
+
+def test_event_buffer_flushes_in_batches_and_on_shutdown(monkeypatch):
+    written = []
+
+    @asynccontextmanager
+    async def fake_tenant_session(tenant):
+        yield tenant
+
+    async def fake_write(self, session, rows):
+        written.append((session, len(rows)))
+
+    monkeypatch.setattr(event_buffer_module, "tenant_session", fake_tenant_session)
+    monkeypatch.setattr(TransferEventBuffer, "_write", fake_write)
+
+    def row(tenant, transfer_id):
+        return TransferEventRow(
+            tenant=tenant,
+            transfer_id=transfer_id,
+            status=PaymentState.AUTHORIZED,
+            message=None,
+            payload={},
+            created_at=datetime.now(timezone.utc),
+        )
+
+    async def scenario():
+        buffer = TransferEventBuffer(batch_size=3, flush_interval=60, max_buffered=5)
+        await buffer.start()
+        for transfer_id in range(5):
+            await buffer.add(row("public", transfer_id))
+        # Bound reached: the next add flushes synchronously before buffering
+        await buffer.add(row("tenant_b", 99))
+        assert written == [("public", 3), ("public", 2)]
+        await buffer.close()
+        return buffer.stats()
+
+    stats = asyncio.run(scenario())
+    assert written[-1] == ("tenant_b", 1)
+    assert stats["pending"] == 0
+    assert stats["flushed"] == 6
+
+
+def test_event_buffer_stays_bounded_while_the_database_fails(monkeypatch):
+    failing = [True]
+    written = []
+
+    @asynccontextmanager
+    async def fake_tenant_session(tenant):
+        yield tenant
+
+    async def fake_write(self, session, rows):
+        if failing[0]:
+            raise RuntimeError("database down")
+        written.append(len(rows))
+
+    monkeypatch.setattr(event_buffer_module, "tenant_session", fake_tenant_session)
+    monkeypatch.setattr(TransferEventBuffer, "_write", fake_write)
+
+    def row(transfer_id):
+        return TransferEventRow(
+            tenant="public",
+            transfer_id=transfer_id,
+            status=PaymentState.AUTHORIZED,
+            message=None,
+            payload={},
+            created_at=datetime.now(timezone.utc),
+        )
+
+    async def scenario():
+        buffer = TransferEventBuffer(batch_size=10, flush_interval=60, max_buffered=2, flush_on_shutdown=False)
+        for transfer_id in range(5):
+            await buffer.add(row(transfer_id))
+        stalled = buffer.stats()
+        failing[0] = False
+        # The database is back: the next add flushes what was kept, then buffers itself
+        await buffer.add(row(5))
+        return stalled, buffer.stats()
+
+    stalled, recovered = asyncio.run(scenario())
+    assert stalled["pending"] == 2
+    assert stalled["dropped"] == 3
+    assert written == [2]
+    assert recovered["pending"] == 1
+
+
+def test_partition_bounds_cover_whole_utc_months():
+    december = datetime(2026, 12, 31, 23, 30, tzinfo=timezone.utc)
+
+    assert partitions.partition_name("transfers", partitions.month_start(december)) == "transfers_p2026_12"
+    assert partitions.add_months(partitions.month_start(december), 1) == datetime(2027, 1, 1, tzinfo=timezone.utc)
+    assert partitions.add_months(datetime(2026, 1, 1, tzinfo=timezone.utc), -13) == datetime(2024, 12, 1, tzinfo=timezone.utc)
+    assert partitions.partition_ddl("transfer_events", december) == (
+        'CREATE TABLE IF NOT EXISTS "transfer_events_p2026_12" PARTITION OF "transfer_events" '
+        "FOR VALUES FROM ('2026-12-01T00:00:00+00:00') TO ('2027-01-01T00:00:00+00:00')"
+    )
+
+
+def test_new_partition_takes_over_rows_caught_by_the_default_partition():
+    class PartitionSession:
+        def __init__(self):
+            self.statements = []
+
+        async def execute(self, statement, params=None):
+            sql = str(statement)
+            self.statements.append(sql)
+            return SimpleNamespace(scalar=lambda: True)
+
+    session = PartitionSession()
+    asyncio.run(partitions.create_partition(session, "transfers", datetime(2026, 12, 5, tzinfo=timezone.utc)))
+
+    assert session.statements[2:] == [
+        'ALTER TABLE "transfers" DETACH PARTITION "transfers_default"',
+        partitions.partition_ddl("transfers", datetime(2026, 12, 1, tzinfo=timezone.utc)),
+        'INSERT INTO "transfers" SELECT * FROM "transfers_default" WHERE created_at >= :start AND created_at < :end',
+        'DELETE FROM "transfers_default" WHERE created_at >= :start AND created_at < :end',
+        'ALTER TABLE "transfers" ATTACH PARTITION "transfers_default" DEFAULT',
+    ]
+    assert partitions.default_partition_ddl("transfer_events") == (
+        'CREATE TABLE IF NOT EXISTS "transfer_events_default" PARTITION OF "transfer_events" DEFAULT'
+    )
@@ -0,0 +1,132 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+
+from app.adapters.db.memory_transfer_repository import InMemoryTransferRepository
+from app.core.connectors.interface import ConnectorIntegration
+from app.core.payments.retry import RetryPolicy, is_retryable
+from app.core.payments.types import ConnectorResponse, PaymentData, PaymentState
+from app.scheduler import dispatch
+from app.scheduler.dispatch import TransferDispatcher
+
+
+class SlowBank(ConnectorIntegration):
+    name = "slow"
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.called = set()
+
+    async def build_request(self, data):
+        return {"originId": data.origin_id}
+
+    async def execute_request(self, request):
+        self.called.add(request["originId"])
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.005)
+            if request["originId"] in ("origin-13", "origin-30"):
+                raise httpx.ConnectTimeout("bank timeout")
+            if request["originId"] == "origin-21":
+                bank_request = httpx.Request("POST", "https://bank.test/transfers")
+                raise httpx.HTTPStatusError("rejected", request=bank_request, response=httpx.Response(400))
+            return {"statusCode": 0}
+        finally:
+            self.active -= 1
+
+    async def handle_response(self, response):
+        return ConnectorResponse(status=PaymentState.AUTHORIZED, raw_response=response)
+
+
+class QueueDispatcher(TransferDispatcher):
+    """Claims from an in-memory queue instead of transfer_outbox."""
+
+    def __init__(self, queue, **kwargs):
+        super().__init__(**kwargs)
+        self.queue = queue
+        self.claims = []
+
+    async def _claim(self, limit):
+        batch, self.queue[:] = self.queue[:limit], self.queue[limit:]
+        self.claims.append(limit)
+        return len(batch), batch
+
+
+def test_dispatcher_keeps_the_connector_saturated_within_its_limit(monkeypatch):
+    repository = InMemoryTransferRepository()
+
+    @asynccontextmanager
+    async def no_session(tenant):
+        yield None
+
+    monkeypatch.setattr(dispatch, "tenant_session", no_session)
+    monkeypatch.setattr(dispatch, "SqlAlchemyTransferRepository", lambda session, payload_store=None: repository)
+
+    transfers = [PaymentData(origin_id=f"origin-{index}") for index in range(40)]
+    repository.outbox.extend(data.payment_id for data in transfers)
+    # Claims carry the attempt they make: origin-30 is on its last allowed one, and every
+    # earlier claim of origin-35 expired without settling it (its worker kept dying)
+    claimed_attempts = {"origin-30": 8, "origin-35": 9}
+    queue = [(data, claimed_attempts.get(data.origin_id, 1)) for data in transfers]
+
+    async def scenario():
+        bank = SlowBank()
+        dispatcher = QueueDispatcher(
+            queue,
+            tenant="public",
+            connector=bank,
+            semaphore=asyncio.Semaphore(4),
+            limit=4,
+            prefetch=4,
+            retry_policy=RetryPolicy(max_attempts=8, base_delay=1.0, max_delay=60.0),
+        )
+        return bank, dispatcher, await dispatcher.drain()
+
+    bank, dispatcher, stats = asyncio.run(scenario())
+
+    assert stats == {"claimed": 40, "sent": 36, "retried": 1, "failed": 3}
+    assert bank.peak == 4
+    # First claim fills limit + prefetch; refills top the backlog back up from `limit`
+    assert dispatcher.claims[0] == 8
+    assert all(4 <= claim <= 8 for claim in dispatcher.claims)
+    assert len(dispatcher.claims) < 40
+    assert asyncio.run(repository.get_by_origin_id("origin-0")).status == PaymentState.AUTHORIZED
+
+    # Timeouts go back to the outbox with backoff; 4xx and exhausted retries are final
+    # The claim already counted the attempt, so the retry does not count it again
+    attempts, due, error = repository.retries[transfers[13].payment_id]
+    assert (attempts, error) == (0, "ConnectTimeout: bank timeout")
+    assert 0 < due - time.monotonic() <= 2.0
+    for origin_id in ("origin-21", "origin-30", "origin-35"):
+        failed = asyncio.run(repository.get_by_origin_id(origin_id))
+        assert failed.status == PaymentState.FAILED
+        assert failed.payment_id not in repository.retries
+    assert "origin-35" not in bank.called
+    assert asyncio.run(repository.get_by_origin_id("origin-35")).metadata["error_message"] == (
+        "Dispatch did not finish within the claim lease"
+    )
+    # Settled transfers end their outbox claims; only the retried one can be claimed again
+    assert repository.outbox == [transfers[13].payment_id]
+
+
+def test_retry_policy_spreads_backoff_and_only_retries_transient_failures():
+    policy = RetryPolicy(max_attempts=5, base_delay=2.0, max_delay=30.0)
+
+    for attempt, ceiling in ((1, 2.0), (2, 4.0), (3, 8.0), (6, 30.0)):
+        delays = [policy.delay(attempt) for _ in range(50)]
+        assert all(2.0 <= delay <= ceiling for delay in delays)
+    # Jitter: a burst of failures does not come back at the same instant
+    assert len({policy.delay(4) for _ in range(20)}) > 1
+    assert not policy.exhausted(4)
+    assert policy.exhausted(5)
+
+    request = httpx.Request("POST", "https://bank.test/transfers")
+    for status, retryable in ((503, True), (429, True), (400, False), (409, False)):
+        error = httpx.HTTPStatusError("bank", request=request, response=httpx.Response(status))
+        assert is_retryable(error) is retryable
+    assert is_retryable(httpx.ReadTimeout("slow", request=request))
+    assert not is_retryable(ValueError("bad payload"))